@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+GameCatalog 与建好索引的 list-of-dicts 基线的内存/查找基准测试
+
+基线与GameCatalog一样按id、分类、标签建了字典索引，查找同为O(1)，
+比较的是同等功能下的内存占用和查找开销。GameCatalog分别测量
+from_records()（全部字段常驻）和load()（长字段留在文件中）两种构建方式。
+
+用法:
+    python benchmarks/bench_catalog.py [--size 50000] [--catalog games_data.json]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generate_game_pages import GameCatalog
+
+
+def replicate(games, size):
+    """把样本目录复制到指定规模，id保持唯一"""
+    result = []
+    for i in range(size):
+        game = dict(games[i % len(games)])
+        game['id'] = str(100000 + i)
+        result.append(game)
+    return result
+
+
+def index_dicts(games):
+    """基线：字典列表加上按id、分类、标签的字典索引"""
+    by_id, by_category, by_tag = {}, {}, {}
+    for game in games:
+        by_id[game['id']] = game
+        by_category.setdefault(game.get('category'), []).append(game)
+        for tag in (t.strip() for t in (game.get('tags') or '').split(',')):
+            if tag:
+                by_tag.setdefault(tag, []).append(game)
+    return games, by_id, by_category, by_tag
+
+
+def measure_memory(build):
+    """返回 (结果, 构建过程中新增的内存字节数)"""
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current
+
+
+def time_lookups(label, lookup, keys, repeat=3):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for key in keys:
+            lookup(key)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"  {label:<28} {best / len(keys) * 1e6:10.2f} µs/次")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='GameCatalog 内存/查找基准测试')
+    parser.add_argument('--catalog', default='games_data.json')
+    parser.add_argument('--size', type=int, default=50000)
+    parser.add_argument('--lookups', type=int, default=200)
+    args = parser.parse_args()
+
+    with open(args.catalog, 'r', encoding='utf-8') as f:
+        sample = json.load(f)
+    raw = json.dumps(replicate(sample, args.size))
+    with tempfile.NamedTemporaryFile('w', suffix='.json', encoding='utf-8', delete=False) as f:
+        f.write(raw)
+    try:
+        (games, by_id, by_category, by_tag), baseline_bytes = measure_memory(lambda: index_dicts(json.loads(raw)))
+        catalog, catalog_bytes = measure_memory(lambda: GameCatalog.from_records(json.loads(raw)))
+        loaded, loaded_bytes = measure_memory(lambda: GameCatalog.load(f.name))
+        ids = [games[i * len(games) // args.lookups]['id'] for i in range(args.lookups)]
+        print(f"=== {args.size} 条记录 ===")
+        print(f"  带索引的list-of-dicts 内存:   {baseline_bytes / 1024 / 1024:8.1f} MB")
+        print(f"  GameCatalog.from_records 内存: {catalog_bytes / 1024 / 1024:8.1f} MB "
+              f"({catalog_bytes / baseline_bytes:.0%}, 分类 {len(catalog.categories)}, 标签 {len(catalog.tags)})")
+        print(f"  GameCatalog.load 内存:         {loaded_bytes / 1024 / 1024:8.1f} MB "
+              f"({loaded_bytes / baseline_bytes:.0%})")
+        # 还原完整记录的开销（页面渲染时每个游戏一次），load()的目录需要读文件
+        print("还原完整记录:")
+        time_lookups('dict (已常驻)', lambda k: by_id[k], ids)
+        time_lookups('from_records.as_feed_record', lambda k: catalog.get(k).as_feed_record(), ids)
+        time_lookups('load.as_feed_record (读文件)', lambda k: loaded.get(k).as_feed_record(), ids)
+    finally:
+        os.remove(f.name)
+
+    categories = [catalog.categories[i % len(catalog.categories)] for i in range(args.lookups)]
+    tags = [catalog.tags[i % len(catalog.tags)] for i in range(args.lookups)]
+
+    print("按id查找:")
+    time_lookups('dict索引', by_id.get, ids)
+    time_lookups('GameCatalog.get', catalog.get, ids)
+    print("按分类查找:")
+    time_lookups('dict索引', by_category.get, categories)
+    time_lookups('GameCatalog.by_category', catalog.by_category, categories)
+    print("按标签查找:")
+    time_lookups('dict索引', by_tag.get, tags)
+    time_lookups('GameCatalog.by_tag', catalog.by_tag, tags)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+相关游戏计算基准测试
+
+用Zipf分布的合成标签构造不同规模的目录，比较逐对计算（仅小规模）、
+倒排索引候选裁剪的全量计算，以及修改少量游戏标签后的增量更新。
+
+用法:
+    python benchmarks/bench_related.py [--sizes 2000 10000 50000] [--changes 10]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from related_games import RelatedGames, compute_related, game_features
+
+
+def synthetic_features(size, vocabulary=3000, categories=25, seed=1):
+    """每个游戏3~8个标签，标签和分类的热度服从Zipf分布"""
+    rng = random.Random(seed)
+    tag_weights = [1 / (rank + 1) for rank in range(vocabulary)]
+    category_weights = [1 / (rank + 1) for rank in range(categories)]
+    features = {}
+    for i in range(size):
+        tags = rng.choices(range(vocabulary), tag_weights, k=rng.randint(3, 8))
+        category = rng.choices(range(categories), category_weights)[0]
+        features[str(100000 + i)] = game_features(', '.join(f'tag{t}' for t in tags), f'category{category}')
+    return features
+
+
+def pairwise_related(features, k=6):
+    """朴素的O(n²)逐对计算，只用于对比耗时（使用相同的TF-IDF权重，不做裁剪）"""
+    import math
+    from collections import Counter
+    total = len(features)
+    df = Counter(term for terms in features.values() for term in terms)
+    vectors = {}
+    for game_id, terms in features.items():
+        weights = {term: math.log(total / df[term]) for term in terms}
+        norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+        vectors[game_id] = {term: w / norm for term, w in weights.items()}
+    related = {}
+    for game_id, vector in vectors.items():
+        scores = []
+        for other, other_vector in vectors.items():
+            if other != game_id:
+                score = sum(w * other_vector.get(term, 0.0) for term, w in vector.items())
+                if score > 0:
+                    scores.append((-score, other))
+        related[game_id] = [other for _, other in sorted(scores)[:k]]
+    return related
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='相关游戏计算基准测试')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[2000, 10000, 50000])
+    parser.add_argument('--changes', type=int, default=10, help='增量测试中修改标签的游戏数')
+    parser.add_argument('--posting-limit', type=int, default=100)
+    parser.add_argument('--pairwise-limit', type=int, default=2000, help='逐对计算的最大规模')
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        features = synthetic_features(size)
+        print(f"规模 {size}:")
+        if size <= args.pairwise_limit:
+            started = time.perf_counter()
+            pairwise_related(features)
+            print(f"  逐对计算:     {time.perf_counter() - started:8.3f}s")
+
+        started = time.perf_counter()
+        compute_related(features, posting_limit=args.posting_limit)
+        print(f"  倒排索引全量: {time.perf_counter() - started:8.3f}s")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'related.json')
+            engine = RelatedGames(path, posting_limit=args.posting_limit)
+            engine.update(features)
+            engine.save()
+
+            changed = dict(features)
+            rng = random.Random(size)
+            for game_id in rng.sample(list(changed), args.changes):
+                changed[game_id] = game_features(f'tag{rng.randrange(3000)}, tag{rng.randrange(3000)}', 'category0')
+            started = time.perf_counter()
+            engine = RelatedGames(path, posting_limit=args.posting_limit)
+            engine.update(changed)
+            elapsed = time.perf_counter() - started
+            print(f"  增量更新:     {elapsed:8.3f}s (修改 {args.changes} 个, 重新计算 {engine.recomputed} 个, 含加载缓存)")
+
+
+if __name__ == '__main__':
+    main()
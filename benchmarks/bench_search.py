@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+静态搜索索引的分片大小/查询开销基准测试
+
+对不同规模的目录和不同的分片前缀长度构建索引，报告构建耗时、分片数量与大小，
+以及一组查询的平均延迟和需要下载的字节数。
+
+用法:
+    python benchmarks/bench_search.py [--sizes 1000 10000] [--prefix-lens 1 2 3]
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generate_game_pages import GameCatalog
+from search_index import SearchIndex, build_search_index
+from bench_catalog import replicate
+
+QUERIES = ['traffic', 'car rac', 'puzzle', 'parking jam', 'moto', 'escape car', 'zz']
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='静态搜索索引基准测试')
+    parser.add_argument('--catalog', default='games_data.json')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--prefix-lens', type=int, nargs='+', default=[1, 2, 3])
+    args = parser.parse_args()
+
+    with open(args.catalog, 'r', encoding='utf-8') as f:
+        sample = json.load(f)
+
+    for size in args.sizes:
+        games = replicate(sample, size)
+        for game in games:
+            # 让标题带上编号，避免所有副本的词项完全相同
+            game['title'] = f"{game['title']} {game['id'][-3:]}"
+        catalog = GameCatalog.from_records(games)
+        filenames = {record.id: f'game-{record.id}' for record in catalog}
+        print(f"=== {size} 条记录 ===")
+        for prefix_len in args.prefix_lens:
+            out_dir = tempfile.mkdtemp(prefix='search-bench-')
+            try:
+                started = time.perf_counter()
+                stats = build_search_index(catalog, filenames, out_dir, prefix_len=prefix_len)
+                build_time = time.perf_counter() - started
+
+                latencies = []
+                loaded = []
+                for query in QUERIES:
+                    index = SearchIndex(out_dir)
+                    started = time.perf_counter()
+                    index.search(query)
+                    latencies.append(time.perf_counter() - started)
+                    loaded.append(index.bytes_loaded)
+                print(f"  prefix_len={prefix_len}: 构建 {build_time:.3f}s, {stats['shards']} 个分片, "
+                      f"平均 {stats['avg_shard_bytes'] / 1024:.1f} KB, 最大 {stats['max_shard_bytes'] / 1024:.1f} KB, "
+                      f"查询平均 {sum(latencies) / len(latencies) * 1000:.2f} ms / "
+                      f"{sum(loaded) / len(loaded) / 1024:.1f} KB")
+            finally:
+                shutil.rmtree(out_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+缩略图镜像基准测试
+
+启动本地桩图片服务器，把目录中的缩略图地址改写到桩服务器，
+分别测量冷缓存（全部下载并生成变体）和热缓存（应当没有任何请求和图片处理）两次运行。
+
+用法:
+    python benchmarks/bench_thumbnails.py [--catalog games_data.json] [--latency 0.05]
+"""
+
+import hashlib
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from thumbnails import Image, ThumbnailMirror
+
+
+def make_image(seed, size=(512, 384)):
+    """按路径生成确定的测试图片；没有Pillow时返回确定的伪图片字节"""
+    digest = hashlib.sha256(seed.encode('utf-8')).digest()
+    if Image is None:
+        return digest * 512
+    buffer = io.BytesIO()
+    Image.new('RGB', size, tuple(digest[:3])).save(buffer, 'JPEG', quality=90)
+    return buffer.getvalue()
+
+
+class StubThumbServer:
+    """对任意路径返回确定的JPEG图片，记录请求数和最大并发数"""
+
+    def __init__(self, latency=0.0, host='127.0.0.1', port=0):
+        self.latency = latency
+        self.requests = 0
+        self.max_concurrent = 0
+        self._active = 0
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                with server._lock:
+                    server.requests += 1
+                    server._active += 1
+                    server.max_concurrent = max(server.max_concurrent, server._active)
+                try:
+                    if server.latency:
+                        time.sleep(server.latency)
+                    body = make_image(self.path)
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'image/jpeg')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                finally:
+                    with server._lock:
+                        server._active -= 1
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    import argparse
+    from urllib.parse import urlsplit
+
+    parser = argparse.ArgumentParser(description='缩略图镜像基准测试')
+    parser.add_argument('--catalog', default='games_data.json')
+    parser.add_argument('--latency', type=float, default=0.05, help='每个请求的模拟延迟（秒）')
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+
+    with open(args.catalog, 'r', encoding='utf-8') as f:
+        paths = [urlsplit(game['thumb']).path for game in json.load(f) if game.get('thumb')]
+
+    with StubThumbServer(latency=args.latency) as server, tempfile.TemporaryDirectory() as tmp:
+        urls = [server.base_url + path for path in paths]
+        cache_dir, out_dir = os.path.join(tmp, 'cache'), os.path.join(tmp, 'thumbs')
+        print(f"缩略图 {len(urls)} 个, 延迟 {args.latency}s, 并发 {args.concurrency}, "
+              f"Pillow {'可用' if Image else '不可用'}")
+        for label in ('冷缓存', '热缓存'):
+            before = server.requests
+            started = time.perf_counter()
+            with ThumbnailMirror(cache_dir, out_dir, concurrency=args.concurrency) as mirror:
+                mirrored = mirror.mirror(urls)
+                mirror.save()
+            elapsed = time.perf_counter() - started
+            print(f"  {label}: {len(mirrored)} 个可用, 请求 {server.requests - before}, "
+                  f"写入变体 {mirror.variants_written}, 失败 {mirror.failed}, "
+                  f"最大并发 {server.max_concurrent}, {elapsed:.3f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+GameMonetize数据源的本地桩服务器
+用于离线测试和基准测试 FeedFetcher 的分页与并发行为
+
+用法:
+    python benchmarks/feed_server.py [--catalog games_data.json] [--latency 0.05]
+"""
+
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class StubFeedServer:
+    """按 feed.php 的 name/num/page 参数分页返回目录中的记录
+
+    name 按标题和标签做不区分大小写的子串匹配。latency 为每个请求的人为延迟（秒），
+    用于模拟网络往返；响应带ETag并支持If-None-Match（304），
+    服务器会记录请求数、304次数和观察到的最大并发数。
+    """
+
+    def __init__(self, catalog, latency=0.0, host='127.0.0.1', port=0):
+        self.catalog = catalog
+        self.latency = latency
+        self.requests = 0
+        self.not_modified = 0
+        self.max_concurrent = 0
+        self._active = 0
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}/feed.php'
+
+    def matching(self, name):
+        name = name.lower()
+        return [g for g in self.catalog
+                if name in g.get('title', '').lower() or name in g.get('tags', '').lower()]
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                with server._lock:
+                    server.requests += 1
+                    server._active += 1
+                    server.max_concurrent = max(server.max_concurrent, server._active)
+                try:
+                    if server.latency:
+                        time.sleep(server.latency)
+                    params = parse_qs(urlparse(self.path).query)
+                    num = int(params.get('num', ['50'])[0])
+                    page = int(params.get('page', ['1'])[0])
+                    games = server.matching(params.get('name', [''])[0])
+                    body = json.dumps(games[(page - 1) * num:page * num]).encode('utf-8')
+                    etag = '"%s"' % hashlib.sha1(body).hexdigest()
+                    if self.headers.get('If-None-Match') == etag:
+                        with server._lock:
+                            server.not_modified += 1
+                        self.send_response(304)
+                        self.send_header('ETag', etag)
+                        self.send_header('Content-Length', '0')
+                        self.end_headers()
+                        return
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('ETag', etag)
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                finally:
+                    with server._lock:
+                        server._active -= 1
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    import argparse
+    from generate_game_pages import FeedFetcher
+
+    parser = argparse.ArgumentParser(description='FeedFetcher 分页/并发基准测试')
+    parser.add_argument('--catalog', default='games_data.json')
+    parser.add_argument('--latency', type=float, default=0.05, help='每个请求的模拟延迟（秒）')
+    parser.add_argument('--per-page', type=int, default=10)
+    parser.add_argument('--query', action='append', help='查询名称，可重复指定')
+    args = parser.parse_args()
+
+    with open(args.catalog, 'r', encoding='utf-8') as f:
+        catalog = json.load(f)
+    queries = args.query or ['traffic', 'car', 'parking']
+
+    print(f"目录 {len(catalog)} 条, 查询 {queries}, 每页 {args.per_page} 条, 延迟 {args.latency}s")
+    for concurrency in (1, 2, 4, 8):
+        with StubFeedServer(catalog, latency=args.latency) as server:
+            started = time.perf_counter()
+            with FeedFetcher(server.base_url, queries, per_page=args.per_page,
+                             concurrency=concurrency) as fetcher:
+                games = list(fetcher.iter_games())
+            elapsed = time.perf_counter() - started
+            print(f"  concurrency={concurrency}: {len(games)} 条, {fetcher.pages_fetched} 页, "
+                  f"去重 {fetcher.duplicates}, 最大并发 {server.max_concurrent}, {elapsed:.3f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流水线各阶段的基准测试
+
+对每个目录规模在临时目录中生成合成目录（见 synthetic_catalog.py），依次运行：
+
+- generate_cold:  首次生成全部页面
+- generate_warm:  目录未变化时的增量生成（应当跳过全部页面）
+- validate:       validate_html.py 校验全部页面（不使用缓存）
+- update_iframe_styles / fix_iframe_centering: 两个批量改写脚本
+
+每个阶段在独立的子进程中运行，记录耗时、吞吐量（页/秒）、峰值内存（子进程及其
+进程池的最大RSS）和写入字节数（新增或修改的文件大小之和），
+并与 benchmarks/baseline.json 中的基线比较，超过回归阈值时返回非零退出码。
+--repeat N 会在N个新的工作目录中重复整个流程，各指标取中位数，以减小文件系统延迟带来的波动。
+全程不访问网络。基线与机器相关，换机器后请用 --update-baseline 重新生成。
+
+用法:
+    python benchmarks/run_benchmarks.py [--sizes 1000 10000 100000] [--stages validate ...]
+                                        [--jobs 1] [--repeat 3] [--baseline benchmarks/baseline.json]
+                                        [--update-baseline] [--output results.json]
+"""
+
+import contextlib
+import io
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+STAGES = ['generate_cold', 'generate_warm', 'validate', 'update_iframe_styles', 'fix_iframe_centering']
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+
+# 指标 → 回归方向（1表示越大越差）；阈值为相对基线允许的变化比例
+METRICS = {'wall_time': 1, 'peak_rss': 1, 'bytes_written': 1, 'pages_per_sec': -1}
+DEFAULT_THRESHOLDS = {
+    'wall_time': 0.3,
+    'pages_per_sec': 0.3,
+    'peak_rss': 0.2,
+    'bytes_written': 0.05,
+    # 耗时差异低于该秒数时不视为回归，避免极短阶段的计时噪声
+    'wall_time_floor': 0.1,
+}
+
+
+def peak_rss():
+    """当前进程及已结束子进程的最大RSS（字节）；不支持时返回0"""
+    if resource is None:
+        return 0
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) * scale
+
+
+def snapshot(root):
+    """目录下所有文件的 (大小, 修改时间)"""
+    files = {}
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            st = os.stat(path)
+            files[path] = (st.st_size, st.st_mtime_ns)
+    return files
+
+
+def count_pages(games_dir='games'):
+    from page_transforms import EXCLUDED_PAGES
+    return sum(1 for name in os.listdir(games_dir) if name.endswith('.html') and name not in EXCLUDED_PAGES)
+
+
+def run_stage(stage, jobs):
+    """在当前目录中运行一个阶段，返回处理的页面数"""
+    if stage in ('generate_cold', 'generate_warm'):
+        from generate_game_pages import GamePageGenerator
+        generator = GamePageGenerator()
+        generator.run_generation(jobs=jobs)
+        with open(os.path.join('games', 'generated_games.json'), 'r', encoding='utf-8') as f:
+            return len(json.load(f))
+    if stage == 'validate':
+        import validate_html
+        validate_html.main(['--no-cache', '--quiet', '--no-metrics', '--jobs', str(jobs)])
+    elif stage == 'update_iframe_styles':
+        from update_iframe_styles import update_iframe_styles
+        update_iframe_styles(jobs=jobs)
+    elif stage == 'fix_iframe_centering':
+        from fix_iframe_centering import fix_iframe_styles
+        fix_iframe_styles(jobs=jobs)
+    else:
+        raise ValueError(f"未知阶段: {stage}")
+    return count_pages()
+
+
+def child_main(stage, workdir, jobs):
+    """子进程入口：运行阶段并把指标以JSON输出到标准输出的最后一行"""
+    os.chdir(workdir)
+    before = snapshot('.')
+    log = io.StringIO()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(log):
+        pages = run_stage(stage, jobs)
+    wall_time = time.perf_counter() - started
+    after = snapshot('.')
+    written = sum(size for path, (size, mtime) in after.items() if before.get(path) != (size, mtime))
+    print(json.dumps({
+        'wall_time': round(wall_time, 4),
+        'pages': pages,
+        'pages_per_sec': round(pages / wall_time, 1) if wall_time else 0.0,
+        'peak_rss': peak_rss(),
+        'bytes_written': written,
+    }))
+
+
+def measure(stage, workdir, jobs):
+    """在新的子进程中运行阶段，避免前一阶段的内存和导入缓存影响测量"""
+    proc = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', stage, '--workdir', workdir,
+                           '--jobs', str(jobs)], capture_output=True, text=True, encoding='utf-8')
+    if proc.returncode != 0:
+        raise RuntimeError(f"阶段 {stage} 失败:\n{proc.stderr[-2000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def prepare_workdir(size, sample, seed):
+    """创建临时工作目录，写入合成目录和页面模板"""
+    from synthetic_catalog import write_catalog
+    workdir = tempfile.mkdtemp(prefix=f'bench-{size}-')
+    os.makedirs(os.path.join(workdir, 'games'))
+    for name in ('game_template.html', 'listing_template.html'):
+        shutil.copy(os.path.join(REPO_DIR, 'games', name), os.path.join(workdir, 'games', name))
+    write_catalog(os.path.join(workdir, 'games_data.json'), size, sample, seed)
+    return workdir
+
+
+def median_metrics(runs):
+    """多次运行的各指标取中位数"""
+    merged = {}
+    for metric in runs[0]:
+        value = statistics.median(run[metric] for run in runs)
+        merged[metric] = round(value, 4) if isinstance(value, float) else value
+    return merged
+
+
+def compare(results, baseline):
+    """返回回归列表 [(规模, 阶段, 指标, 基线值, 当前值)]"""
+    thresholds = dict(DEFAULT_THRESHOLDS, **baseline.get('thresholds', {}))
+    regressions = []
+    for size, stages in results.items():
+        for stage, metrics in stages.items():
+            base = baseline.get('results', {}).get(size, {}).get(stage)
+            if not base:
+                continue
+            for metric, direction in METRICS.items():
+                if metric not in base or not base[metric]:
+                    continue
+                old, new = base[metric], metrics[metric]
+                change = (new - old) / old * direction
+                if change <= thresholds[metric]:
+                    continue
+                if metric == 'wall_time' and new - old < thresholds['wall_time_floor']:
+                    continue
+                if metric == 'pages_per_sec' and metrics['wall_time'] - base['wall_time'] < thresholds['wall_time_floor']:
+                    continue
+                regressions.append((size, stage, metric, old, new))
+    return regressions
+
+
+def format_bytes(value):
+    return f'{value / 1024 / 1024:.1f}MB'
+
+
+def print_results(results, baseline):
+    base_results = baseline.get('results', {})
+    print(f"{'规模':>8} {'阶段':<22} {'耗时':>9} {'页/秒':>10} {'峰值内存':>10} {'写入':>10} {'基线耗时':>10}")
+    for size, stages in results.items():
+        for stage, m in stages.items():
+            base = base_results.get(size, {}).get(stage, {})
+            base_time = f"{base['wall_time']:.3f}s" if 'wall_time' in base else '-'
+            print(f"{size:>8} {stage:<22} {m['wall_time']:8.3f}s {m['pages_per_sec']:10.1f} "
+                  f"{format_bytes(m['peak_rss']):>10} {format_bytes(m['bytes_written']):>10} {base_time:>10}")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='流水线各阶段的基准测试')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES,
+                        help='要运行的阶段 (generate_cold总会先运行以生成页面)')
+    parser.add_argument('--jobs', type=int, default=1, help='各阶段使用的进程数')
+    parser.add_argument('--repeat', type=int, default=1, help='重复次数，各指标取中位数')
+    parser.add_argument('--sample', default=os.path.join(REPO_DIR, 'games_data.json'), help='合成目录的样本')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--update-baseline', action='store_true', help='把本次结果写入基线')
+    parser.add_argument('--output', help='把本次结果写入JSON文件')
+    parser.add_argument('--keep', action='store_true', help='保留临时工作目录')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--workdir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child_main(args.child, args.workdir, args.jobs)
+        return 0
+
+    try:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    except (OSError, ValueError):
+        baseline = {}
+
+    stages = [stage for stage in STAGES if stage in args.stages or stage == 'generate_cold']
+    results = {}
+    for size in args.sizes:
+        runs = {stage: [] for stage in stages}
+        for _ in range(args.repeat):
+            workdir = prepare_workdir(size, args.sample, args.seed)
+            print(f"=== {size} 个游戏 ({workdir}) ===")
+            try:
+                for stage in stages:
+                    metrics = measure(stage, workdir, args.jobs)
+                    runs[stage].append(metrics)
+                    print(f"  {stage:<22} {metrics['wall_time']:8.3f}s, {metrics['pages_per_sec']:10.1f} 页/秒")
+            finally:
+                if not args.keep:
+                    shutil.rmtree(workdir, ignore_errors=True)
+        results[str(size)] = {stage: median_metrics(stage_runs) for stage, stage_runs in runs.items()}
+
+    print()
+    print_results(results, baseline)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'jobs': args.jobs, 'repeat': args.repeat, 'results': results}, f, indent=2)
+
+    if args.update_baseline:
+        merged = baseline.get('results', {})
+        for size, stages_metrics in results.items():
+            merged.setdefault(size, {}).update(stages_metrics)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({'thresholds': baseline.get('thresholds', DEFAULT_THRESHOLDS), 'jobs': args.jobs,
+                       'repeat': args.repeat, 'results': merged}, f, indent=2)
+            f.write('\n')
+        print(f"\n基线已更新: {args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline)
+    if not baseline:
+        print(f"\n没有基线文件 {args.baseline}，使用 --update-baseline 生成")
+    elif regressions:
+        print(f"\n⚠️  发现 {len(regressions)} 项性能回归:")
+        for size, stage, metric, old, new in regressions:
+            print(f"  - {size} {stage} {metric}: {old} → {new} ({(new - old) / old:+.0%})")
+        return 1
+    else:
+        print("\n🎉 没有超过阈值的性能回归")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+合成游戏目录生成器
+
+以现有的 games_data.json 为样本，生成与真实数据源结构相同、任意规模的目录：
+
+- 分类和游戏尺寸按样本中的频率抽取；
+- 标题、描述、标签的词语按样本词频抽取，并混入按Zipf分布的长尾新词，
+  词汇量随目录规模增长，与真实目录相似；
+- 描述长度从样本描述长度中抽取并加入随机扰动；标题由少量热门词组成，
+  大目录中会自然出现重名游戏。
+
+相同的种子总是生成相同的目录，基准测试的输出字节数因此可以直接比较。
+
+用法:
+    python benchmarks/synthetic_catalog.py --size 10000 [--out games_data.json] [--seed 1] [--jsonl]
+"""
+
+import hashlib
+import json
+import os
+import random
+import re
+from collections import Counter
+
+WORD_RE = re.compile(r"[A-Za-z][A-Za-z0-9']*")
+
+# 长尾新词的比例和词汇规模
+TAIL_RATE = 0.08
+TAIL_WORDS = 50000
+
+
+class SampleModel:
+    """从样本目录统计出的字段分布"""
+
+    def __init__(self, games):
+        self.categories = Counter(game.get('category') or 'Arcade' for game in games)
+        self.sizes = Counter((str(game.get('width', '800')), str(game.get('height', '600'))) for game in games)
+        self.title_words = Counter(word for game in games for word in WORD_RE.findall(game.get('title', '')))
+        self.description_words = Counter(word for game in games for word in WORD_RE.findall(game.get('description', '')))
+        self.tags = Counter(tag.strip() for game in games for tag in (game.get('tags') or '').split(',') if tag.strip())
+        self.description_lengths = [len(WORD_RE.findall(game.get('description', ''))) or 20 for game in games]
+        self.tag_counts = [len([t for t in (game.get('tags') or '').split(',') if t.strip()]) or 1 for game in games]
+        self.title_lengths = [len(WORD_RE.findall(game.get('title', ''))) or 2 for game in games]
+        # random.choices 需要的序列和累积权重，预先计算一次
+        self._tables = {}
+        for name in ('categories', 'sizes', 'title_words', 'description_words', 'tags'):
+            counter = getattr(self, name)
+            values = list(counter)
+            total = 0
+            cumulative = []
+            for value in values:
+                total += counter[value]
+                cumulative.append(total)
+            self._tables[name] = (values, cumulative)
+        tail_weights = [1 / (rank + 1) for rank in range(TAIL_WORDS)]
+        total = 0
+        self._tail = []
+        for weight in tail_weights:
+            total += weight
+            self._tail.append(total)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def pick(self, rng, name, k=1):
+        values, cumulative = self._tables[name]
+        return rng.choices(values, cum_weights=cumulative, k=k)
+
+    def words(self, rng, name, k, prefix):
+        """k个词：大部分按样本词频抽取，TAIL_RATE比例替换为长尾新词"""
+        words = self.pick(rng, name, k)
+        for i in range(k):
+            if rng.random() < TAIL_RATE:
+                rank = rng.choices(range(TAIL_WORDS), cum_weights=self._tail)[0]
+                words[i] = f'{prefix}{rank}'
+        return words
+
+
+def synthetic_game(model, rng, index):
+    token = hashlib.sha1(f'synthetic-{index}'.encode('ascii')).hexdigest()[:32]
+    title_words = model.words(rng, 'title_words', rng.choice(model.title_lengths), 'Zor')
+    title = ' '.join(word[:1].upper() + word[1:] for word in title_words)
+
+    length = max(8, int(rng.choice(model.description_lengths) * rng.uniform(0.6, 1.8)))
+    sentences = []
+    words = model.words(rng, 'description_words', length, 'vel')
+    while words:
+        size = rng.randint(8, 20)
+        sentence, words = words[:size], words[size:]
+        sentences.append(' '.join(sentence).capitalize() + '.')
+    instructions = ' '.join(model.words(rng, 'description_words', rng.randint(6, 14), 'vel')).capitalize()
+
+    tags = []
+    for tag in model.words(rng, 'tags', rng.choice(model.tag_counts) + rng.randint(0, 3), 'Tag'):
+        if tag not in tags:
+            tags.append(tag)
+    width, height = model.pick(rng, 'sizes')[0]
+    return {
+        'id': str(100000 + index),
+        'title': title,
+        'description': ' '.join(sentences),
+        'instructions': instructions,
+        'url': f'https://html5.gamemonetize.com/{token}/',
+        'category': model.pick(rng, 'categories')[0],
+        'tags': ', '.join(tags),
+        'thumb': f'https://img.gamemonetize.com/{token}/512x384.jpg',
+        'width': width,
+        'height': height,
+    }
+
+
+def synthetic_catalog(size, sample='games_data.json', seed=1):
+    """逐条生成size个合成游戏记录"""
+    model = sample if isinstance(sample, SampleModel) else SampleModel.load(sample)
+    rng = random.Random(seed)
+    for index in range(size):
+        yield synthetic_game(model, rng, index)
+
+
+def write_catalog(path, size, sample='games_data.json', seed=1):
+    """写出合成目录（.jsonl 为每行一条，否则为JSON数组），返回写入的字节数"""
+    games = synthetic_catalog(size, sample, seed)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        if path.endswith('.jsonl'):
+            for game in games:
+                f.write(json.dumps(game, ensure_ascii=False) + '\n')
+        else:
+            json.dump(list(games), f, ensure_ascii=False, indent=2)
+    return os.path.getsize(path)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='生成合成游戏目录')
+    parser.add_argument('--size', type=int, default=10000)
+    parser.add_argument('--sample', default='games_data.json', help='用于统计字段分布的样本目录')
+    parser.add_argument('--out', help='输出文件 (默认 games_data.synthetic-<size>.json)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--jsonl', action='store_true', help='输出JSON Lines格式')
+    args = parser.parse_args()
+
+    out = args.out or f"games_data.synthetic-{args.size}.{'jsonl' if args.jsonl else 'json'}"
+    written = write_catalog(out, args.size, args.sample, args.seed)
+    print(f"已生成 {args.size} 个游戏: {out} ({written} 字节)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+构建脚本共用的轻量计时与计数
+
+- stage(name): 可嵌套的阶段计时器，按 "外层/内层" 路径累计耗时和调用次数；
+- record(name, seconds): 在当前阶段下记录分散在循环中、另行累计的耗时；
+- count(name, value): 累加计数器（渲染/跳过/失败的页面数、读写字节数、编码回退次数等）；
+- session(...): 包住一次脚本运行，结束时把指标写成一个JSON文件，可选用cProfile采样。
+
+进程池中的工作进程有各自的指标，任务函数用 take() 取出增量随结果返回，
+主进程用 merge() 合并到当前阶段之下；子阶段的耗时因此是各工作进程的累加值。
+没有开启会话时所有调用照常累计，只是不会写出文件。
+
+用法（在各脚本的命令行中）:
+    --metrics PATH   指标文件 (默认 .build/metrics/<脚本>-<时间>.json)
+    --no-metrics     不写指标文件
+    --profile PATH   用cProfile采样并把统计写到PATH
+"""
+
+import json
+import os
+import platform
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+METRICS_DIR = os.path.join('.build', 'metrics')
+
+# 写入指标文件的cProfile函数条目数
+PROFILE_TOP = 25
+
+
+class _StageTimer:
+    """stage() 返回的上下文管理器（类实现比生成器版本开销更小，适合逐页使用）"""
+
+    __slots__ = ('metrics', 'name', 'started')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.metrics._stack.append(self.name)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.started
+        metrics = self.metrics
+        path = '/'.join(metrics._stack)
+        metrics._stack.pop()
+        metrics.add_time(path, elapsed)
+        return False
+
+
+class BuildMetrics:
+    """一次运行的阶段耗时和计数器"""
+
+    def __init__(self, script=None):
+        self.script = script
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+        self._started = time.perf_counter()
+        self._stack = []
+        self.stages = {}
+        self.counters = {}
+
+    def stage(self, name):
+        return _StageTimer(self, name)
+
+    def add_time(self, path, seconds, calls=1):
+        entry = self.stages.get(path)
+        if entry is None:
+            self.stages[path] = entry = {'seconds': 0.0, 'calls': 0}
+        entry['seconds'] += seconds
+        entry['calls'] += calls
+
+    def record(self, name, seconds):
+        """在当前阶段之下记录一段另行计时的耗时（适合分散在循环中的步骤）"""
+        self.add_time('/'.join(self._stack + [name]), seconds)
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def take(self):
+        """取出并清空已累计的指标（工作进程随任务结果返回）"""
+        delta = {'stages': self.stages, 'counters': self.counters}
+        self.stages = {}
+        self.counters = {}
+        return delta
+
+    def merge(self, delta):
+        """合并工作进程的指标，阶段路径挂在当前阶段之下"""
+        prefix = '/'.join(self._stack)
+        for path, entry in delta['stages'].items():
+            self.add_time(f'{prefix}/{path}' if prefix else path, entry['seconds'], entry['calls'])
+        for name, value in delta['counters'].items():
+            self.count(name, value)
+
+    def to_dict(self):
+        return {
+            'script': self.script,
+            'started_at': self.started_at,
+            'wall_time': round(time.perf_counter() - self._started, 4),
+            'argv': sys.argv[1:],
+            'python': platform.python_version(),
+            'stages': {path: {'seconds': round(entry['seconds'], 4), 'calls': entry['calls']}
+                       for path, entry in sorted(self.stages.items())},
+            'counters': dict(sorted(self.counters.items())),
+        }
+
+
+_metrics = BuildMetrics()
+
+
+def _reset_after_fork():
+    # fork出的工作进程继承了主进程已累计的指标，清空后take()只返回本进程的增量
+    global _metrics
+    _metrics = BuildMetrics(_metrics.script)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_metrics():
+    return _metrics
+
+
+def stage(name):
+    """当前运行的嵌套阶段计时器"""
+    return _metrics.stage(name)
+
+
+def record(name, seconds):
+    _metrics.record(name, seconds)
+
+
+def count(name, value=1):
+    """累加当前运行的计数器"""
+    _metrics.count(name, value)
+
+
+def take():
+    return _metrics.take()
+
+
+def merge(delta):
+    _metrics.merge(delta)
+
+
+def default_metrics_path(script):
+    return os.path.join(METRICS_DIR, f"{script}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+
+
+def profile_summary(profiler, limit=PROFILE_TOP):
+    """按累计耗时排序的前limit个函数"""
+    import pstats
+    stats = pstats.Stats(profiler)
+    rows = []
+    for (filename, line, func), (_, calls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({'function': f'{os.path.basename(filename)}:{line}({func})', 'calls': calls,
+                     'tottime': round(tottime, 4), 'cumtime': round(cumtime, 4)})
+    rows.sort(key=lambda row: -row['cumtime'])
+    return rows[:limit]
+
+
+@contextmanager
+def session(script, metrics_file=None, profile_file=None):
+    """一次脚本运行：重置指标，结束时写出JSON指标文件（metrics_file为False时不写）"""
+    global _metrics
+    _metrics = BuildMetrics(script)
+    profiler = None
+    if profile_file:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        yield _metrics
+    finally:
+        data = _metrics.to_dict()
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(profile_file)
+            data['profile'] = {'file': profile_file, 'top': profile_summary(profiler)}
+        if metrics_file is not False:
+            path = metrics_file or default_metrics_path(script)
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            print(f"构建指标已写入: {path}")
+
+
+def add_arguments(parser):
+    """为脚本的argparse解析器添加 --metrics/--no-metrics/--profile 选项"""
+    parser.add_argument('--metrics', help='指标文件路径 (默认 .build/metrics/<脚本>-<时间>.json)')
+    parser.add_argument('--no-metrics', action='store_true', help='不写出指标文件')
+    parser.add_argument('--profile', help='用cProfile采样并把统计写到该文件')
+
+
+def session_from_args(script, args):
+    return session(script, False if args.no_metrics else args.metrics, args.profile)
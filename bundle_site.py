@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+部署包生成
+
+与上次打包时记录的部署清单（.build/deploy_manifest.json，路径 → 大小/mtime/哈希）比较，
+把新增和修改的文件流式写入 tar/tar.gz/zip 归档，删除的文件列在归档内的 .bundle/deleted.txt
+中（同时写到归档旁的 <归档>.deleted.txt）。--full 模式把全部文件写入归档，
+每个文件只读取一遍，边写入边计算哈希，不在磁盘上复制暂存文件。
+
+清单同时作为stat缓存：大小和mtime都没变的文件直接沿用记录的哈希，不读取内容，
+因此站点很大而变化很少时，打包耗时主要是遍历目录的stat开销。
+stat变化但内容哈希相同的文件（例如被原样重写）不会进入归档。
+
+用法:
+    python bundle_site.py [--root .] [--dist] [--out bundle.tar.gz] [--full] [--dry-run]
+"""
+
+import hashlib
+import io
+import json
+import os
+import sys
+import tarfile
+import time
+import zipfile
+from datetime import datetime
+
+from build_metrics import add_arguments, count, session_from_args, stage
+from compress_site import collect_site_files
+
+MANIFEST_VERSION = 1
+DEFAULT_MANIFEST = os.path.join('.build', 'deploy_manifest.json')
+BUNDLE_DIR = os.path.join('.build', 'bundles')
+
+# 归档内的元数据目录
+META_DIR = '.bundle'
+
+READ_SIZE = 1 << 20
+
+
+def load_manifest(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data.get('files', {}) if data.get('version') == MANIFEST_VERSION else {}
+
+
+def save_manifest(path, files):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    # json.dumps整体编码走C实现，json.dump逐段写入要慢一个数量级
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'version': MANIFEST_VERSION, 'files': files}, separators=(',', ':')))
+    os.replace(tmp_path, path)
+
+
+def collect_files(root, dist=False):
+    """需要部署的文件（相对路径，已排序）；dist=True时root为发布目录，包含其中的全部文件"""
+    if not dist:
+        return collect_site_files(root)
+    files = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+        rel_dir = os.path.relpath(dirpath, root)
+        files += [os.path.normpath(os.path.join(rel_dir, name)) for name in filenames if not name.startswith('.')]
+    return sorted(files)
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(READ_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def scan(root, files, previous, full=False):
+    """比较当前文件与部署清单
+
+    返回 (新清单, 新增列表, 修改列表, 删除列表)。full=True时stat变化的文件不计算哈希
+    （写入归档时再算），先归入修改列表，新清单中对应的哈希留空。
+    """
+    current = {}
+    added, changed = [], []
+    for rel in files:
+        st = os.stat(os.path.join(root, rel))
+        known = previous.get(rel)
+        info = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'hash': None}
+        if known and known['size'] == st.st_size and known['mtime_ns'] == st.st_mtime_ns:
+            info['hash'] = known['hash']
+        elif not full:
+            info['hash'] = file_hash(os.path.join(root, rel))
+            count('hash.reads')
+        current[rel] = info
+        if known is None:
+            added.append(rel)
+        elif info['hash'] is not None and info['hash'] != known['hash']:
+            changed.append(rel)
+        elif full and info['hash'] is None:
+            changed.append(rel)
+    deleted = sorted(rel for rel in previous if rel not in current)
+    return current, added, changed, deleted
+
+
+class _HashingReader:
+    """包装文件对象，读取的同时计算哈希（写入归档与计算哈希共用一次读取）"""
+
+    def __init__(self, f):
+        self.f = f
+        self.digest = hashlib.sha256()
+
+    def read(self, size=-1):
+        data = self.f.read(size)
+        self.digest.update(data)
+        return data
+
+
+def archive_format(out):
+    if out.endswith('.zip'):
+        return 'zip'
+    if out.endswith(('.tar.gz', '.tgz')):
+        return 'tar.gz'
+    return 'tar'
+
+
+class BundleWriter:
+    """流式归档写入器（tar使用流模式，zip在不可seek的输出上使用数据描述符）"""
+
+    def __init__(self, fileobj, fmt):
+        self.fmt = fmt
+        if fmt == 'zip':
+            self.archive = zipfile.ZipFile(fileobj, 'w', compression=zipfile.ZIP_DEFLATED)
+        else:
+            self.archive = tarfile.open(fileobj=fileobj, mode='w|gz' if fmt == 'tar.gz' else 'w|',
+                                        format=tarfile.PAX_FORMAT)
+
+    def add_file(self, path, arcname):
+        """写入一个文件，返回其内容哈希"""
+        st = os.stat(path)
+        with open(path, 'rb') as f:
+            reader = _HashingReader(f)
+            if self.fmt == 'zip':
+                info = zipfile.ZipInfo(arcname, time.localtime(st.st_mtime)[:6])
+                info.compress_type = zipfile.ZIP_DEFLATED
+                info.external_attr = (st.st_mode & 0xFFFF) << 16
+                with self.archive.open(info, 'w', force_zip64=st.st_size > 0x7FFFFFFF) as dest:
+                    for block in iter(lambda: reader.read(READ_SIZE), b''):
+                        dest.write(block)
+            else:
+                info = tarfile.TarInfo(arcname)
+                info.size = st.st_size
+                info.mtime = int(st.st_mtime)
+                info.mode = st.st_mode & 0o777
+                self.archive.addfile(info, reader)
+        count('bytes.in', st.st_size)
+        return reader.digest.hexdigest()
+
+    def add_bytes(self, arcname, data):
+        if self.fmt == 'zip':
+            self.archive.writestr(zipfile.ZipInfo(arcname, time.localtime()[:6]), data)
+        else:
+            info = tarfile.TarInfo(arcname)
+            info.size = len(data)
+            info.mtime = int(time.time())
+            self.archive.addfile(info, io.BytesIO(data))
+
+    def close(self):
+        self.archive.close()
+
+
+def _count_files(stats):
+    for name in ('added', 'changed', 'deleted'):
+        count(f'files.{name}', stats[name])
+
+
+def bundle_site(root='.', out=None, manifest_file=DEFAULT_MANIFEST, full=False, dist=False, dry_run=False):
+    """生成部署包，返回统计字典
+
+    out为None时写到 .build/bundles/<模式>-<时间>.tar.gz，为'-'时写到标准输出。
+    dry_run=True时只比较，不写归档也不更新部署清单。
+    """
+    previous = load_manifest(manifest_file)
+    with stage('scan'):
+        files = collect_files(root, dist)
+        current, added, changed, deleted = scan(root, files, previous, full)
+    mode = 'full' if full else 'delta'
+    members = files if full else sorted(added + changed)
+    stats = {'mode': mode, 'files': len(files), 'added': len(added), 'changed': len(changed),
+             'deleted': len(deleted), 'members': len(members), 'out': None, 'bytes': 0}
+    if dry_run:
+        stats['paths'] = {'added': added, 'changed': changed, 'deleted': deleted}
+        _count_files(stats)
+        return stats
+
+    if out is None:
+        out = os.path.join(BUNDLE_DIR, f"{mode}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.tar.gz")
+    fmt = archive_format(out)
+    deletions = ''.join(f'{rel}\n' for rel in deleted)
+    with stage('archive'):
+        if out == '-':
+            fileobj = sys.stdout.buffer
+        else:
+            os.makedirs(os.path.dirname(out) or '.', exist_ok=True)
+            fileobj = open(out + '.tmp', 'wb')
+        try:
+            writer = BundleWriter(fileobj, fmt)
+            for rel in members:
+                digest = writer.add_file(os.path.join(root, rel), rel.replace(os.sep, '/'))
+                current[rel]['hash'] = digest
+            # 全量模式中stat变化的文件在写入时才得到哈希；哈希与记录相同的不算修改
+            if full:
+                stats['changed'] = sum(1 for rel in changed if current[rel]['hash'] != previous[rel]['hash'])
+            writer.add_bytes(f'{META_DIR}/deleted.txt', deletions.encode('utf-8'))
+            writer.add_bytes(f'{META_DIR}/bundle.json', json.dumps(
+                {k: v for k, v in stats.items() if k not in ('out', 'bytes')}, indent=2).encode('utf-8'))
+            writer.close()
+        finally:
+            if out != '-':
+                fileobj.close()
+    if out != '-':
+        os.replace(out + '.tmp', out)
+        with open(out + '.deleted.txt', 'w', encoding='utf-8') as f:
+            f.write(deletions)
+        stats['bytes'] = os.path.getsize(out)
+        count('bytes.out', stats['bytes'])
+    stats['out'] = out
+    _count_files(stats)
+    if current != previous:
+        save_manifest(manifest_file, current)
+    return stats
+
+
+def print_report(stats, out=sys.stdout):
+    target = '标准输出' if stats['out'] == '-' else stats['out']
+    print(f"部署包({stats['mode']}): {stats['files']} 个文件, 新增 {stats['added']}, 修改 {stats['changed']}, "
+          f"删除 {stats['deleted']}, 写入归档 {stats['members']} 个", file=out)
+    if stats['out']:
+        size = f" ({stats['bytes']} 字节)" if stats['out'] != '-' else ''
+        print(f"已写入: {target}{size}", file=out)
+    for name in ('added', 'changed', 'deleted'):
+        for rel in stats.get('paths', {}).get(name, []):
+            print(f"  {name[0].upper()} {rel}", file=out)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='生成增量或全量的站点部署包')
+    parser.add_argument('--root', default='.', help='站点根目录')
+    parser.add_argument('--dist', action='store_true', help='root为压缩发布目录，包含其中全部文件（含.gz/.br）')
+    parser.add_argument('--out', help='归档路径 (.tar/.tar.gz/.zip，"-"为标准输出；默认 .build/bundles/<模式>-<时间>.tar.gz)')
+    parser.add_argument('--manifest', default=DEFAULT_MANIFEST, help='上次部署的文件清单')
+    parser.add_argument('--full', action='store_true', help='打包全部文件')
+    parser.add_argument('--dry-run', action='store_true', help='只列出变化，不写归档也不更新清单')
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    # 归档写到标准输出时，报告改写到标准错误
+    report_out = sys.stderr if args.out == '-' else sys.stdout
+    with session_from_args('bundle_site', args):
+        stats = bundle_site(args.root, args.out, args.manifest, full=args.full, dist=args.dist, dry_run=args.dry_run)
+    print_report(stats, report_out)
+
+
+if __name__ == '__main__':
+    main()
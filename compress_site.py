@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+站点压缩输出
+
+把站点文件复制到发布目录（默认dist/），同时压缩HTML（含内联CSS、JSON-LD）、CSS和JSON，
+并在每个文本资源旁写入预压缩的 .gz / .br 文件，静态服务器可以直接按Accept-Encoding返回，
+不必在请求时压缩。源文件内容（按哈希）没有变化的文件直接跳过。
+
+brotli为可选依赖，未安装时只生成 .gz 文件。
+
+用法:
+    python compress_site.py [--out dist] [--jobs N] [--force] [--quiet]
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 压缩规则变化时递增，使缓存失效
+MINIFIER_VERSION = 1
+
+# 会被压缩并生成预压缩文件的类型
+TEXT_EXTENSIONS = ('.html', '.css', '.js', '.json', '.xml', '.txt', '.svg')
+
+# 不发布的构建输入
+EXCLUDED_FILES = ('game_template.html', 'listing_template.html')
+EXCLUDED_EXTENSIONS = ('.py', '.pyc', '.md', '.jsonl', '.gz', '.br')
+EXCLUDED_DIRS = ('benchmarks', '__pycache__')
+
+# 前后空白不影响渲染的块级标签
+BLOCK_TAGS = ('html|head|body|meta|link|title|base|div|section|article|aside|header|footer|nav|main|'
+              'ul|ol|li|dl|dt|dd|p|h[1-6]|table|thead|tbody|tfoot|tr|td|th|form|fieldset|hr|br|noscript')
+
+PROTECTED_RE = re.compile(r'<!--.*?-->|<(script|style|pre|textarea)\b[^>]*>(.*?)</\1\s*>',
+                          re.DOTALL | re.IGNORECASE)
+TAG_RE = re.compile(r'<[^>]*>')
+BLOCK_BEFORE_RE = re.compile(rf' (?=<(?:/?(?:{BLOCK_TAGS})\b|!DOCTYPE))', re.IGNORECASE)
+BLOCK_AFTER_RE = re.compile(rf'(<(?:/?(?:{BLOCK_TAGS})\b[^>]*|!DOCTYPE[^>]*)>) ', re.IGNORECASE)
+JSON_SCRIPT_RE = re.compile(r'type=["\']application/(?:ld\+)?json["\']', re.IGNORECASE)
+
+CSS_COMMENT_RE = re.compile(r'/\*.*?\*/', re.DOTALL)
+CSS_SPACE_RE = re.compile(r'\s*([{};,>])\s*')
+
+
+def minify_css(css):
+    """去掉注释和多余空白；不改动选择器中冒号前的空格（`a :hover` 与 `a:hover` 含义不同）"""
+    css = CSS_COMMENT_RE.sub('', css)
+    css = re.sub(r'\s+', ' ', css)
+    css = CSS_SPACE_RE.sub(r'\1', css)
+    css = css.replace(': ', ':').replace(';}', '}')
+    return css.strip()
+
+
+def minify_json(text):
+    return json.dumps(json.loads(text), ensure_ascii=False, separators=(',', ':'))
+
+
+def _trim_lines(text):
+    """去掉每行首尾空白和空行，保留换行（不改变脚本的自动分号插入）"""
+    return '\n'.join(line.strip() for line in text.splitlines() if line.strip())
+
+
+def _minify_text(segment):
+    # 标签内跨行的属性排版折叠为单个空格，文本中的连续空白折叠为一个空格
+    parts = []
+    last = 0
+    for match in TAG_RE.finditer(segment):
+        parts.append(re.sub(r'\s+', ' ', segment[last:match.start()]))
+        parts.append(re.sub(r'\s*\n\s*', ' ', match.group(0)))
+        last = match.end()
+    parts.append(re.sub(r'\s+', ' ', segment[last:]))
+    text = ''.join(parts)
+    text = BLOCK_BEFORE_RE.sub('', text)
+    return BLOCK_AFTER_RE.sub(r'\1', text)
+
+
+def _minify_protected(match):
+    block = match.group(0)
+    tag = (match.group(1) or '').lower()
+    if not tag:
+        # 保留IE条件注释
+        return block if block.startswith('<!--[if') else ''
+    if tag in ('pre', 'textarea'):
+        return block
+    body = match.group(2)
+    start = block[:block.index('>') + 1]
+    end = block[len(start) + len(body):]
+    start = re.sub(r'\s+', ' ', start)
+    if tag == 'style':
+        return f'{start}{minify_css(body)}{end}'
+    if JSON_SCRIPT_RE.search(start):
+        try:
+            return f'{start}{minify_json(body)}{end}'
+        except ValueError:
+            pass
+    return f'{start}{_trim_lines(body)}{end}'
+
+
+def minify_html(text):
+    """压缩HTML：折叠空白、删除注释，压缩内联CSS和JSON-LD；pre/textarea原样保留"""
+    out = []
+    last = 0
+    for match in PROTECTED_RE.finditer(text):
+        segment = _minify_text(text[last:match.start()])
+        inline = (match.group(1) or '').lower() in ('pre', 'textarea')
+        # script/style/注释两侧的空白不影响渲染
+        out.append(segment if inline else segment.rstrip())
+        out.append(_minify_protected(match))
+        last = match.end()
+        if not inline:
+            while last < len(text) and text[last].isspace():
+                last += 1
+    out.append(_minify_text(text[last:]))
+    return ''.join(out).strip() + '\n'
+
+
+def minify_bytes(data, extension):
+    """按文件类型压缩内容；无法解析的文件原样返回"""
+    if extension not in ('.html', '.css', '.json'):
+        return data
+    # 部分页面含有非法UTF-8字节，用surrogateescape保证原样写回
+    text = data.decode('utf-8', errors='surrogateescape')
+    try:
+        if extension == '.html':
+            text = minify_html(text)
+        elif extension == '.css':
+            text = minify_css(text) + '\n'
+        else:
+            text = minify_json(text)
+    except ValueError:
+        return data
+    return text.encode('utf-8', errors='surrogateescape')
+
+
+def collect_site_files(root='.', out_dir='dist', build_dir='.build'):
+    """返回站点中需要发布的文件（相对路径，已排序）"""
+    skip_dirs = {os.path.normpath(out_dir), os.path.normpath(build_dir)}
+    files = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        rel_dir = os.path.relpath(dirpath, root)
+        dirnames[:] = [d for d in dirnames
+                       if not d.startswith('.') and d not in EXCLUDED_DIRS
+                       and os.path.normpath(os.path.join(rel_dir, d)) not in skip_dirs]
+        for name in filenames:
+            if name.startswith('.') or name in EXCLUDED_FILES or name.endswith(EXCLUDED_EXTENSIONS):
+                continue
+            files.append(os.path.normpath(os.path.join(rel_dir, name)))
+    return sorted(files)
+
+
+def _write_sidecar(path, data, compressed):
+    """只有压缩后更小时才写入预压缩文件，否则删除旧文件"""
+    if compressed is not None and len(compressed) < len(data):
+        with open(path, 'wb') as f:
+            f.write(compressed)
+        return len(compressed)
+    if os.path.exists(path):
+        os.remove(path)
+    return None
+
+
+def _compress_job(job):
+    src, dst = job
+    with open(src, 'rb') as f:
+        data = f.read()
+    extension = os.path.splitext(src)[1].lower()
+    os.makedirs(os.path.dirname(dst) or '.', exist_ok=True)
+
+    result = {'size': len(data), 'min_size': len(data), 'gz_size': None, 'br_size': None}
+    if extension not in TEXT_EXTENSIONS:
+        shutil.copyfile(src, dst)
+        return result
+
+    data = minify_bytes(data, extension)
+    with open(dst, 'wb') as f:
+        f.write(data)
+    result['min_size'] = len(data)
+    result['gz_size'] = _write_sidecar(dst + '.gz', data, gzip.compress(data, compresslevel=9, mtime=0))
+    result['br_size'] = _write_sidecar(dst + '.br', data, brotli.compress(data) if brotli else None)
+    return result
+
+
+def _file_hash(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def compress_site(root='.', out_dir='dist', build_dir='.build', jobs=1, force=False):
+    """生成压缩后的发布目录，返回 (每个文件的结果列表, 已删除的文件数)
+
+    结果为 (相对路径, 尺寸字典, 是否重新处理)；尺寸字典包含 size/min_size/gz_size/br_size。
+    """
+    cache_file = os.path.join(build_dir, 'compress_cache.json')
+    cache = {}
+    if not force:
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == MINIFIER_VERSION and data.get('brotli') == bool(brotli):
+                cache = data.get('files', {})
+        except (OSError, ValueError):
+            pass
+
+    files = collect_site_files(root, out_dir, build_dir)
+    results = {}
+    pending = []
+    hashes = {}
+    for rel in files:
+        digest = _file_hash(os.path.join(root, rel))
+        hashes[rel] = digest
+        known = cache.get(rel)
+        if known and known['hash'] == digest and os.path.exists(os.path.join(out_dir, rel)):
+            results[rel] = (known['sizes'], False)
+        else:
+            pending.append(rel)
+
+    jobs_args = [(os.path.join(root, rel), os.path.join(out_dir, rel)) for rel in pending]
+    if jobs > 1 and len(jobs_args) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            outcomes = list(pool.map(_compress_job, jobs_args, chunksize=max(1, len(jobs_args) // (jobs * 4))))
+    else:
+        outcomes = [_compress_job(job) for job in jobs_args]
+    for rel, sizes in zip(pending, outcomes):
+        results[rel] = (sizes, True)
+
+    # 删除源文件已不存在的发布文件
+    removed = 0
+    live = set(files)
+    for rel in cache:
+        if rel not in live:
+            for path in (rel, rel + '.gz', rel + '.br'):
+                path = os.path.join(out_dir, path)
+                if os.path.exists(path):
+                    os.remove(path)
+            removed += 1
+
+    os.makedirs(build_dir, exist_ok=True)
+    with open(cache_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            'version': MINIFIER_VERSION,
+            'brotli': bool(brotli),
+            'files': {rel: {'hash': hashes[rel], 'sizes': results[rel][0]} for rel in files},
+        }, f, ensure_ascii=False)
+
+    return [(rel,) + results[rel] for rel in files], removed
+
+
+def _percent(part, whole):
+    return f"{100 * (1 - part / whole):5.1f}%" if whole else '  0.0%'
+
+
+def print_report(results, removed=0, quiet=False):
+    """打印逐文件及汇总的字节节省情况（逐文件只列出本次重新处理的文件）"""
+    totals = {'size': 0, 'min_size': 0, 'gz_size': 0, 'br_size': 0}
+    processed = 0
+    for rel, sizes, fresh in results:
+        gz = sizes['gz_size'] or sizes['min_size']
+        br = sizes['br_size'] or gz
+        totals['size'] += sizes['size']
+        totals['min_size'] += sizes['min_size']
+        totals['gz_size'] += gz
+        totals['br_size'] += br
+        if fresh:
+            processed += 1
+            if not quiet:
+                print(f"{rel}: {sizes['size']} → {sizes['min_size']} ({_percent(sizes['min_size'], sizes['size'])})"
+                          f", gzip {gz}, brotli {sizes['br_size'] if sizes['br_size'] else '-'}")
+
+    print(f"\n共 {len(results)} 个文件 (处理 {processed}, 跳过 {len(results) - processed}, 删除 {removed})")
+    print(f"原始 {totals['size']} 字节 → 压缩HTML/CSS/JSON后 {totals['min_size']} ({_percent(totals['min_size'], totals['size'])})")
+    print(f"gzip传输 {totals['gz_size']} 字节 ({_percent(totals['gz_size'], totals['size'])})")
+    if brotli:
+        print(f"brotli传输 {totals['br_size']} 字节 ({_percent(totals['br_size'], totals['size'])})")
+    else:
+        print("未安装brotli模块，没有生成 .br 文件")
+    return totals
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='生成压缩并预压缩的站点发布目录')
+    parser.add_argument('--root', default='.', help='站点根目录')
+    parser.add_argument('--out', default='dist', help='发布目录')
+    parser.add_argument('--jobs', type=int, default=1, help='并行处理的进程数')
+    parser.add_argument('--force', action='store_true', help='忽略缓存，重新处理全部文件')
+    parser.add_argument('--quiet', action='store_true', help='只打印汇总')
+    args = parser.parse_args()
+
+    results, removed = compress_site(args.root, args.out, jobs=args.jobs, force=args.force)
+    print_report(results, removed, quiet=args.quiet)
+
+
+if __name__ == '__main__':
+    main()
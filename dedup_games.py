@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+近似重复游戏检测
+
+数据源中有大量换个名字的克隆游戏（例如"Crazy Traffic Racer"和"Crazy Traffic Racer Online"），
+描述几乎相同，各自生成一个内容单薄的页面。本脚本在抓取之后、生成之前找出这些重复：
+
+- 游戏地址、缩略图地址（有缩略图镜像索引时用图片内容哈希）完全相同的直接判为重复；
+- 描述按3词shingle计算MinHash签名，LSH分桶只比较同桶的候选，签名估计的相似度
+  达到阈值即判为近似重复。
+
+签名使用单次哈希分桶（one permutation hashing）加循环补齐，每条记录只需哈希一遍
+shingle，总耗时与目录规模近似线性。每组重复保留目录中最先出现的一条，
+输出去重报告和过滤后的目录。
+
+用法:
+    python dedup_games.py [--catalog games_data.json] [--out games_data.dedup.json]
+                          [--report .build/dedup_report.json] [--threshold 0.7] [--flag-only]
+"""
+
+import hashlib
+import html
+import json
+import os
+import re
+from urllib.parse import urlsplit
+
+SHINGLE_SIZE = 3
+NUM_BINS = 64
+BANDS = 16
+THRESHOLD = 0.7
+
+WORD_RE = re.compile(r'[0-9a-z]+')
+
+# 循环补齐空桶时叠加的偏移，使借来的值与原值不同
+_ROTATION = 1 << 58
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """小写词序列的size词shingle集合；词数不足时整段作为一个shingle"""
+    words = WORD_RE.findall(html.unescape(text or '').lower())
+    if not words:
+        return set()
+    return {' '.join(words[i:i + size]) for i in range(max(1, len(words) - size + 1))}
+
+
+def minhash_signature(items, num_bins=NUM_BINS):
+    """单次哈希分桶的MinHash签名，空桶从后面第一个非空桶循环借值"""
+    bins = [None] * num_bins
+    for item in items:
+        h = int.from_bytes(hashlib.blake2b(item.encode('utf-8'), digest_size=8).digest(), 'little')
+        b, value = h % num_bins, h // num_bins
+        if bins[b] is None or value < bins[b]:
+            bins[b] = value
+    if all(value is None for value in bins):
+        return None
+    signature = list(bins)
+    for i, value in enumerate(bins):
+        if value is None:
+            j, distance = i, 0
+            while bins[j] is None:
+                j = (j + 1) % num_bins
+                distance += 1
+            signature[i] = bins[j] + distance * _ROTATION
+    return tuple(signature)
+
+
+def similarity(a, b):
+    """两个签名估计的Jaccard相似度"""
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+def normalize_url(url):
+    """忽略scheme/主机大小写和末尾斜杠的比较键"""
+    parts = urlsplit((url or '').strip())
+    if not parts.netloc:
+        return (url or '').strip()
+    path = parts.path.rstrip('/') or '/'
+    return f"{parts.netloc.lower()}{path}?{parts.query}" if parts.query else f"{parts.netloc.lower()}{path}"
+
+
+def load_thumb_hashes(index_path):
+    """读取缩略图镜像索引中 地址→图片内容哈希 的映射；没有索引时返回空字典"""
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            return {url: entry['hash'] for url, entry in json.load(f).get('urls', {}).items()}
+    except (OSError, ValueError):
+        return {}
+
+
+class DuplicateFinder:
+    """逐条加入游戏，最后用并查集合并出重复组
+
+    每条记录只保留id、标题和签名，不保留原始记录，可以配合流式读取使用。
+    """
+
+    def __init__(self, threshold=THRESHOLD, num_bins=NUM_BINS, bands=BANDS, thumb_hashes=None):
+        if num_bins % bands:
+            raise ValueError("num_bins必须能被bands整除")
+        self.threshold = threshold
+        self.num_bins = num_bins
+        self.bands = bands
+        self.rows = num_bins // bands
+        self.thumb_hashes = thumb_hashes or {}
+        self.games = []
+        self._parent = []
+        self._reasons = {}
+        self._exact = {}
+        self._buckets = {}
+        self._signatures = []
+        self.comparisons = 0
+
+    def _find(self, i):
+        while self._parent[i] != i:
+            self._parent[i] = self._parent[self._parent[i]]
+            i = self._parent[i]
+        return i
+
+    def _union(self, keep, other, reason):
+        a, b = self._find(keep), self._find(other)
+        if a == b:
+            return
+        # 目录中靠前的记录作为保留项
+        if b < a:
+            a, b = b, a
+        self._parent[b] = a
+        self._reasons.setdefault(other, reason)
+
+    def add(self, game):
+        index = len(self.games)
+        self.games.append((str(game.get('id', index)), game.get('title', '')))
+        self._parent.append(index)
+
+        keys = [('url', normalize_url(game.get('url')))]
+        thumb = game.get('thumb')
+        if thumb:
+            keys.append(('thumb', self.thumb_hashes.get(thumb) or normalize_url(thumb)))
+        for kind, key in keys:
+            if not key:
+                continue
+            first = self._exact.setdefault((kind, key), index)
+            if first != index:
+                self._union(first, index, {'type': kind})
+
+        signature = minhash_signature(shingles(game.get('description')), self.num_bins)
+        self._signatures.append(signature)
+        if signature is None:
+            return
+        # 与同桶中的每个成员比较（与第二个成员相似而与第一个不相似的记录也能找到）；
+        # 已在同一重复组中的成员跳过，同一对记录在多个桶中相遇时只比较一次
+        compared = set()
+        for band in range(self.bands):
+            key = (band, signature[band * self.rows:(band + 1) * self.rows])
+            bucket = self._buckets.setdefault(key, [])
+            for other in bucket:
+                if other in compared or self._find(other) == self._find(index):
+                    continue
+                compared.add(other)
+                self.comparisons += 1
+                score = similarity(signature, self._signatures[other])
+                if score >= self.threshold:
+                    self._union(other, index, {'type': 'description', 'similarity': round(score, 3)})
+            bucket.append(index)
+
+    def clusters(self):
+        """返回重复组列表 [(保留序号, [(重复序号, 原因), ...])]，按保留序号排序"""
+        groups = {}
+        for index in range(len(self.games)):
+            root = self._find(index)
+            if root != index:
+                groups.setdefault(root, []).append((index, self._reasons.get(index, {'type': 'transitive'})))
+        return sorted(groups.items())
+
+    def duplicate_indexes(self):
+        return {index for _, members in self.clusters() for index, _ in members}
+
+    def report(self):
+        clusters = []
+        for keep, members in self.clusters():
+            game_id, title = self.games[keep]
+            clusters.append({
+                'keep': {'id': game_id, 'title': title},
+                'duplicates': [dict(zip(('id', 'title'), self.games[index]), reason=reason)
+                               for index, reason in members],
+            })
+        return {
+            'total': len(self.games),
+            'duplicates': sum(len(c['duplicates']) for c in clusters),
+            'clusters': clusters,
+            'comparisons': self.comparisons,
+            'threshold': self.threshold,
+        }
+
+
+def dedup_catalog(catalog_file, out_file, report_file, threshold=THRESHOLD, flag_only=False,
+                  thumb_index=os.path.join('.build', 'thumbs', 'index.json')):
+    """对目录文件去重，写出过滤后的目录和去重报告，返回报告字典
+
+    JSON Lines目录分两遍流式处理（先计算签名，再过滤写出），不在内存中保留全部记录。
+    flag_only=True时只写报告，过滤后的目录与原目录相同。
+    """
+    from generate_game_pages import iter_catalog, write_if_changed
+
+    finder = DuplicateFinder(threshold, thumb_hashes=load_thumb_hashes(thumb_index))
+    for game in iter_catalog(catalog_file):
+        finder.add(game)
+    report = finder.report()
+    drop = set() if flag_only else finder.duplicate_indexes()
+
+    kept = (game for index, game in enumerate(iter_catalog(catalog_file)) if index not in drop)
+    if out_file.endswith('.jsonl'):
+        tmp_path = out_file + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for game in kept:
+                f.write(json.dumps(game, ensure_ascii=False) + '\n')
+        os.replace(tmp_path, out_file)
+    else:
+        write_if_changed(out_file, json.dumps(list(kept), indent=2, ensure_ascii=False))
+
+    os.makedirs(os.path.dirname(report_file) or '.', exist_ok=True)
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return report
+
+
+def print_report(report, flag_only=False, limit=20):
+    action = '标记' if flag_only else '移除'
+    print(f"去重: {report['total']} 个游戏, {action} {report['duplicates']} 个重复 "
+          f"({len(report['clusters'])} 组, 候选比较 {report['comparisons']} 次)")
+    for cluster in report['clusters'][:limit]:
+        print(f"  保留 {cluster['keep']['title']}")
+        for duplicate in cluster['duplicates']:
+            reason = duplicate['reason']
+            detail = f" {reason['similarity']:.2f}" if 'similarity' in reason else ''
+            print(f"    ✗ {duplicate['title']} ({reason['type']}{detail})")
+    if len(report['clusters']) > limit:
+        print(f"  ... 共 {len(report['clusters'])} 组，完整列表见报告文件")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='检测并移除近似重复的游戏')
+    parser.add_argument('--catalog', default='games_data.json')
+    parser.add_argument('--out', help='过滤后的目录 (默认 games_data.dedup.json/.jsonl)')
+    parser.add_argument('--report', default=os.path.join('.build', 'dedup_report.json'))
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help='描述相似度阈值 (0~1)')
+    parser.add_argument('--flag-only', action='store_true', help='只生成报告，不移除重复')
+    args = parser.parse_args()
+
+    root, ext = os.path.splitext(args.catalog)
+    report = dedup_catalog(args.catalog, args.out or f'{root}.dedup{ext}', args.report,
+                           threshold=args.threshold, flag_only=args.flag_only)
+    print_report(report, args.flag_only)
+
+
+if __name__ == '__main__':
+    main()
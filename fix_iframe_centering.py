@@ -1,13 +1,11 @@
-import os
 import re
 from pathlib import Path
 
-def fix_iframe_styles():
-    """修复所有游戏页面的iframe居中样式问题"""
-    games_dir = Path('games')
-    
-    # 新的清理后的CSS样式
-    new_styles = '''    <style>
+import build_metrics
+from page_transforms import PageTransformPipeline, TransformError, register_transform
+
+# 新的清理后的CSS样式
+NEW_STYLES = '''    <style>
         /* Override main styles for better game display */
         .game-container {
             padding: 1.5rem !important;
@@ -22,7 +20,6 @@ def fix_iframe_styles():
         .game-iframe {
             width: 100% !important;
             max-width: 1000px !important;
-            height: 700px !important;
             border: none !important;
             border-radius: 20px !important;
             box-shadow: 0 12px 35px rgba(0, 0, 0, 0.4) !important;
@@ -30,7 +27,19 @@ def fix_iframe_styles():
             background: #000 !important;
             transition: all 0.3s ease !important;
             display: block !important;
-            aspect-ratio: unset !important;
+        }
+        
+        /* Match the template: height comes from each game's inline aspect-ratio */
+        .game-frame {
+            width: 100%;
+            max-width: 1000px;
+            margin: 1.5rem auto 3rem auto;
+        }
+        
+        .game-frame .game-iframe {
+            max-width: none !important;
+            height: auto !important;
+            margin: 0 !important;
         }
         
         .game-iframe:hover {
@@ -79,13 +88,11 @@ def fix_iframe_styles():
         @media (max-width: 1024px) {
             .game-iframe {
                 max-width: 900px !important;
-                height: 600px !important;
             }
         }
         
         @media (max-width: 768px) {
             .game-iframe {
-                height: 450px !important;
                 margin: 1rem auto 2rem auto !important;
                 border-radius: 15px !important;
             }
@@ -96,53 +103,48 @@ def fix_iframe_styles():
         
         @media (max-width: 480px) {
             .game-iframe {
-                height: 350px !important;
                 border-radius: 12px !important;
             }
         }
     </style>'''
+
+# 使用正则表达式匹配从<style>到</style>的所有内容
+STYLE_PATTERN = re.compile(r'<style>.*?</style>', re.DOTALL)
+
+# 匹配不含<style>前的缩进，替换内容也去掉行首缩进，否则每运行一次缩进就多一层，
+# 页面永远不会停止变化（模式前加[ \t]*会让搜索在每段缩进上反复回溯，明显变慢）
+REPLACEMENT_STYLES = NEW_STYLES.lstrip()
+
+# generate_game_pages.py 提取出的共享样式表，样式改在模板中维护
+SHARED_STYLESHEET_PATTERN = re.compile(r'<link rel="stylesheet" href="assets/game\.[0-9a-f]+\.css">')
+
+
+@register_transform('fix_iframe_centering')
+def fix_iframe_centering_transform(content):
+    """用清理后的样式替换页面中的<style>标签内容"""
+    if not STYLE_PATTERN.search(content):
+        if SHARED_STYLESHEET_PATTERN.search(content):
+            return content
+        raise TransformError("未找到<style>标签")
+    return STYLE_PATTERN.sub(lambda m: REPLACEMENT_STYLES, content)
+
+
+def fix_iframe_styles(games_dir='games', dry_run=False, jobs=1):
+    """修复所有游戏页面的iframe居中样式问题"""
+    pipeline = PageTransformPipeline(['fix_iframe_centering'])
+    with build_metrics.stage('transform'):
+        results = pipeline.run(games_dir, dry_run=dry_run, jobs=jobs)
     
     updated_files = []
     error_files = []
-    
-    # 遍历所有HTML文件
-    for html_file in games_dir.glob('*.html'):
-        if html_file.name in ['index.html', 'play.html', 'game_template.html']:
-            continue
-            
-        try:
-            # 尝试多种编码方式读取文件
-            content = None
-            for encoding in ['utf-8', 'utf-8-sig', 'latin-1', 'cp1252']:
-                try:
-                    with open(html_file, 'r', encoding=encoding) as f:
-                        content = f.read()
-                    break
-                except UnicodeDecodeError:
-                    continue
-            
-            if content is None:
-                error_files.append(f"{html_file.name} - 无法读取文件")
-                continue
-            
-            # 查找并替换<style>标签内容
-            # 使用正则表达式匹配从<style>到</style>的所有内容
-            style_pattern = r'<style>.*?</style>'
-            
-            if re.search(style_pattern, content, re.DOTALL):
-                # 替换样式内容
-                new_content = re.sub(style_pattern, new_styles, content, flags=re.DOTALL)
-                
-                # 写入文件
-                with open(html_file, 'w', encoding='utf-8', errors='ignore') as f:
-                    f.write(new_content)
-                
-                updated_files.append(html_file.name)
-            else:
-                error_files.append(f"{html_file.name} - 未找到<style>标签")
-                
-        except Exception as e:
-            error_files.append(f"{html_file.name} - {str(e)}")
+    for result in results:
+        name = Path(result['file']).name
+        for error in result['errors']:
+            error_files.append(f"{name} - {error.split(': ', 1)[-1]}")
+        if result['changed']:
+            updated_files.append(name)
+            if dry_run:
+                print(result['diff'])
     
     print(f"成功更新 {len(updated_files)} 个文件:")
     for file in updated_files:
@@ -156,5 +158,13 @@ def fix_iframe_styles():
     return len(updated_files), len(error_files)
 
 if __name__ == '__main__':
-    updated, errors = fix_iframe_styles()
-    print(f"\n总计: 更新 {updated} 个文件, 失败 {errors} 个文件")
\ No newline at end of file
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='修复所有游戏页面的iframe居中样式问题')
+    parser.add_argument('--dry-run', action='store_true', help='只显示差异，不写入文件')
+    parser.add_argument('--jobs', type=int, default=1, help='并行处理的进程数')
+    build_metrics.add_arguments(parser)
+    args = parser.parse_args()
+    with build_metrics.session_from_args('fix_iframe_centering', args):
+        updated, errors = fix_iframe_styles(dry_run=args.dry_run, jobs=args.jobs)
+    print(f"\n总计: 更新 {updated} 个文件, 失败 {errors} 个文件")
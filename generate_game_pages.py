@@ -6,44 +6,1013 @@
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import codecs
 import json
 import os
 import re
-from urllib.parse import quote
-from datetime import datetime
+import hashlib
+import html
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import quote, urlsplit
+
+from search_index import build_search_index
+import build_metrics
+from build_metrics import count, stage
+from compress_site import compress_site, print_report
+import bundle_site
+from page_transforms import EXCLUDED_PAGES
+from thumbnails import ThumbnailMirror
+from related_games import RelatedGames, game_features
+from dedup_games import dedup_catalog, print_report as print_dedup_report
+from sitemap import MAX_URLS as SITEMAP_MAX_URLS, PageLastmod, write_atom_feed, write_sitemaps
+from watch_site import CATALOG, LISTINGS, PAGES, DependencyGraph, PreviewServer, watch
+from datetime import datetime, timezone
+
+
+def utc_timestamp(seconds=None):
+    """W3C格式的UTC时间（sitemap的lastmod与Atom的时间字段），默认为当前时间"""
+    moment = datetime.now(timezone.utc) if seconds is None else datetime.fromtimestamp(seconds, timezone.utc)
+    return moment.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def content_hash(data):
+    """计算内容的sha256哈希（接受str或bytes）"""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
+
+
+def record_hash(game):
+    """计算单条游戏记录的稳定哈希（键排序后序列化）"""
+    return content_hash(json.dumps(game, sort_keys=True, ensure_ascii=False))
+
+
+def write_if_changed(path, data):
+    """内容与磁盘上的文件不同时才写入，返回是否写入"""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == data:
+                count('writes.unchanged')
+                return False
+    except OSError:
+        pass
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    count('writes.written')
+    count('bytes.out', len(data))
+    return True
+
+
+def iter_catalog(path, chunk_size=1 << 16, with_source=False):
+    """逐条读取游戏目录
+
+    支持JSON数组（games_data.json）和JSON Lines（*.jsonl）两种格式。
+    JSON数组按固定大小分块读取并用raw_decode逐个解析元素，
+    峰值内存只与单条记录和块大小有关，与目录总大小无关。
+    with_source=True时产出 (记录, 源文本哈希, 字节偏移, 字节数)：哈希直接对记录在文件中的
+    原文计算，比把解析后的记录重新序列化再计算哈希便宜得多；偏移和字节数可用于之后重新读取该记录。
+    """
+    if path.endswith('.jsonl'):
+        with open(path, 'rb') as f:
+            offset = 0
+            for raw in f:
+                line = raw.strip()
+                if line:
+                    game = json.loads(line)
+                    if with_source:
+                        start = offset + len(raw) - len(raw.lstrip())
+                        yield game, content_hash(line), start, len(line)
+                    else:
+                        yield game
+                offset += len(raw)
+        return
+    
+    with open(path, 'rb') as f:
+        # utf-8-sig解码会去掉BOM，字节偏移需要把它算上
+        cursor = 3 if f.read(3) == codecs.BOM_UTF8 else 0
+    decoder = json.JSONDecoder()
+    # newline=''：不转换换行符，字符数与字节数的对应才不会被\r\n打乱
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        buffer = ''
+        pos = 0
+        eof = False
+        opened = False
+        while True:
+            # 跳过空白、数组起始符和元素分隔符（都是单字节字符）
+            while True:
+                start = pos
+                while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                    pos += 1
+                cursor += pos - start
+                if pos < len(buffer) or eof:
+                    break
+                chunk = f.read(chunk_size)
+                buffer, pos, eof = buffer[pos:] + chunk, 0, not chunk
+            if pos >= len(buffer):
+                raise ValueError(f"{path}: JSON数组未闭合")
+            if not opened:
+                if buffer[pos] != '[':
+                    raise ValueError(f"{path}: 游戏目录必须是JSON数组")
+                opened = True
+                pos += 1
+                cursor += 1
+                continue
+            if buffer[pos] == ']':
+                return
+            try:
+                game, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                chunk = f.read(chunk_size)
+                buffer, pos, eof = buffer[pos:] + chunk, 0, not chunk
+                continue
+            # 记录恰好在块末尾结束时，数字等值可能被截断，需要再读一块确认
+            if end == len(buffer) and not eof:
+                chunk = f.read(chunk_size)
+                buffer, pos, eof = buffer[pos:] + chunk, 0, not chunk
+                continue
+            if with_source:
+                source = buffer[pos:end].encode('utf-8')
+                yield game, content_hash(source), cursor, len(source)
+                cursor += len(source)
+            else:
+                yield game
+            pos = end
+            if pos > chunk_size:
+                buffer, pos = buffer[pos:], 0
+
+
+def iter_batches(iterable, size):
+    """把可迭代对象切分为最多size条的列表"""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class GameRecord:
+    """紧凑的游戏记录
+
+    分类、标签和URL前缀都保存为所属GameCatalog词表中的整数id，宽高保存为int；
+    数据源中的其余字段放在extra中。紧凑形式无法原样还原的值（非整数的宽高、非规范写法的标签、
+    null等）也以原值放在extra中，as_feed_record()还原的字典与数据源记录相等。
+
+    GameCatalog.load()从文件加载的记录只保留LISTING_FIELDS（列表页、搜索和相关推荐用到的字段），
+    描述、说明、游戏地址和宽高不常驻内存（描述约占目录文本的一半以上），只记下记录在文件中的
+    字节偏移和字节数，as_feed_record()重新读取原文；source_hash为该原文的哈希，增量生成据此
+    判断记录是否变化。
+    """
+
+    __slots__ = ('catalog', 'index', 'id', 'title', 'description', 'instructions',
+                 'url_prefix', 'url_rest', 'thumb_prefix', 'thumb_rest',
+                 'category_id', 'tag_ids', 'width', 'height', 'extra',
+                 'source_hash', 'source_offset', 'source_size')
+
+    FIELDS = ('id', 'title', 'description', 'instructions', 'url', 'category', 'tags',
+              'thumb', 'width', 'height')
+    LISTING_FIELDS = ('id', 'title', 'thumb', 'category', 'tags')
+
+    @property
+    def url(self):
+        return '' if self.url_prefix is None else self.catalog.prefixes[self.url_prefix] + self.url_rest
+
+    @property
+    def thumb(self):
+        return '' if self.thumb_prefix is None else self.catalog.prefixes[self.thumb_prefix] + self.thumb_rest
+
+    @property
+    def category(self):
+        return None if self.category_id is None else self.catalog.categories[self.category_id]
+
+    @property
+    def tag_list(self):
+        tags = self.catalog.tags
+        return [tags[t] for t in self.tag_ids]
+
+    @property
+    def tags(self):
+        return ', '.join(self.tag_list)
+
+    def as_feed_record(self):
+        """还原为数据源格式的字典；数据源中没有的字段不会出现"""
+        if self.source_offset is not None:
+            return self.catalog.read_source(self.source_offset, self.source_size)
+        game = {}
+        extra = self.extra or {}
+        for field in self.FIELDS:
+            if field in extra:
+                game[field] = extra[field]
+                continue
+            if field == 'id':
+                value = None if self.index in self.catalog.missing_ids else self.id
+            elif field == 'category':
+                value = self.category
+            elif field == 'tags':
+                value = self.tags if self.tag_ids is not None else None
+            elif field in ('width', 'height'):
+                value = getattr(self, field)
+                value = None if value is None else str(value)
+            elif field in ('url', 'thumb'):
+                value = None if getattr(self, f'{field}_prefix') is None else getattr(self, field)
+            else:
+                value = getattr(self, field)
+            if value is not None:
+                game[field] = value
+        game.update(extra)
+        return game
+
+
+class GameCatalog:
+    """紧凑的内存游戏目录，供页面生成、列表页和相关推荐共用
+
+    分类和标签被驻留为整数id，URL按 scheme://host/ 前缀驻留；
+    按id、分类、标签的查找都是O(1)的字典访问。
+    内存上真正的节省来自load()：长字段留在文件中，需要时按偏移重新读取。
+    from_records()/add()构建的目录保留全部字段，只比同样建了索引的字典列表小10%左右，
+    它的价值在于驻留的分类/标签索引，而不是内存。
+    """
+
+    def __init__(self):
+        self.records = []
+        self.categories = []
+        self.tags = []
+        self.prefixes = []
+        self._category_ids = {}
+        self._tag_ids = {}
+        self._prefix_ids = {}
+        self._by_id = {}
+        # 数据源中没有id的记录序号（id由序号代替，还原时不输出）
+        self.missing_ids = set()
+        # load()时记录所在的目录文件，as_feed_record()从中重新读取长字段
+        self.source_path = None
+        self._by_category = {}
+        self._by_tag = {}
+
+    @classmethod
+    def from_records(cls, games):
+        catalog = cls()
+        for game in games:
+            catalog.add(game)
+        return catalog
+
+    @classmethod
+    def load(cls, path):
+        """从文件加载，只保留LISTING_FIELDS，其余字段按需从文件读取"""
+        catalog = cls()
+        catalog.source_path = path
+        for game, source_hash, offset, size in iter_catalog(path, with_source=True):
+            record = catalog.add({k: game[k] for k in GameRecord.LISTING_FIELDS if k in game}, source_hash)
+            record.source_offset, record.source_size = offset, size
+        return catalog
+
+    def read_source(self, offset, size):
+        """重新读取并解析目录文件中的一条记录"""
+        with open(self.source_path, 'rb') as f:
+            f.seek(offset)
+            return json.loads(f.read(size))
+
+    @staticmethod
+    def _intern(value, table, ids):
+        key = ids.get(value)
+        if key is None:
+            key = ids[value] = len(table)
+            table.append(sys.intern(value))
+        return key
+
+    def _split_url(self, url):
+        scheme_end = url.find('://')
+        cut = url.find('/', scheme_end + 3) + 1 if scheme_end >= 0 else 0
+        if cut <= 0:
+            cut = len(url)
+        return self._intern(url[:cut], self.prefixes, self._prefix_ids), url[cut:]
+
+    @staticmethod
+    def _to_int(value):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+
+    def add(self, game, source_hash=None):
+        record = GameRecord()
+        record.catalog = self
+        record.index = len(self.records)
+        record.source_hash = source_hash
+        record.source_offset = record.source_size = None
+        # 数据源字段以外的键，以及紧凑形式无法原样还原的值（包括显式的null）
+        extra = {k: v for k, v in game.items() if k not in GameRecord.FIELDS or v is None}
+        record.id = str(game.get('id', record.index))
+        if 'id' not in game:
+            self.missing_ids.add(record.index)
+        record.title = game.get('title')
+        record.description = game.get('description')
+        record.instructions = game.get('instructions')
+        for field in ('url', 'thumb'):
+            value = game.get(field)
+            prefix, rest = self._split_url(value) if isinstance(value, str) else (None, '')
+            if value is not None and prefix is None:
+                extra[field] = value
+            setattr(record, f'{field}_prefix', prefix)
+            setattr(record, f'{field}_rest', rest)
+        category = game.get('category')
+        record.category_id = None if category is None else self._intern(category, self.categories, self._category_ids)
+        tags = game.get('tags')
+        if not isinstance(tags, str):
+            record.tag_ids = None
+            if tags is not None:
+                extra['tags'] = tags
+        else:
+            record.tag_ids = tuple(self._intern(tag, self.tags, self._tag_ids)
+                                   for tag in (t.strip() for t in tags.split(',')) if tag)
+            if record.tags != tags:
+                extra['tags'] = tags
+        for field in ('width', 'height'):
+            value = game.get(field)
+            number = self._to_int(value) if isinstance(value, str) else None
+            if number is None or str(number) != value:
+                number = None
+                if value is not None:
+                    extra[field] = value
+            setattr(record, field, number)
+        record.extra = extra or None
+        
+        self.records.append(record)
+        self._by_id[record.id] = record
+        if record.category_id is not None:
+            self._by_category.setdefault(record.category_id, []).append(record)
+        for tag_id in record.tag_ids or ():
+            self._by_tag.setdefault(tag_id, []).append(record)
+        return record
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def get(self, game_id):
+        return self._by_id.get(str(game_id))
+
+    def by_category(self, name):
+        category_id = self._category_ids.get(name)
+        return self._by_category.get(category_id, []) if category_id is not None else []
+
+    def by_tag(self, name):
+        tag_id = self._tag_ids.get(name)
+        return self._by_tag.get(tag_id, []) if tag_id is not None else []
+
+    def category_counts(self):
+        return {self.categories[c]: len(records) for c, records in self._by_category.items()}
+
+    def tag_counts(self):
+        return {self.tags[t]: len(records) for t, records in self._by_tag.items()}
+
+
+class TemplateError(ValueError):
+    """模板编译或渲染错误（未知占位符、缺少占位符或缺少变量）"""
+
+
+def escape_text(value):
+    """HTML文本节点转义"""
+    return html.escape(value, quote=False)
+
+
+def escape_attr(value):
+    """HTML属性值转义"""
+    return html.escape(value, quote=True)
+
+
+def escape_json_string(value):
+    """JSON字符串内容转义，并防止提前闭合<script>"""
+    return json.dumps(value, ensure_ascii=False)[1:-1].replace('</', '<\\/')
+
+
+def escape_raw(value):
+    """不转义，用于生成器自己拼好的HTML片段"""
+    return value
+
+
+ESCAPERS = {
+    'text': escape_text,
+    'attr': escape_attr,
+    'json': escape_json_string,
+    'raw': escape_raw,
+}
+
+
+class CompiledTemplate:
+    """预编译模板
+
+    编译时把模板源码切分成字面量片段和占位符槽位，每页渲染只需一次join。
+    槽位的转义方式可以在schema中显式指定，未指定时按占位符所在位置推断：
+    JSON-LD脚本内为json，标签内（属性值）为attr，其余为text。
+    """
+
+    PLACEHOLDER_RE = re.compile(r'\{([a-z_][a-z0-9_]*)\}')
+    JSONLD_OPEN_RE = re.compile(r'<script[^>]*type=["\']application/ld\+json["\'][^>]*>', re.IGNORECASE)
+
+    def __init__(self, source, schema, required=()):
+        self.parts = []
+        self.slots = []
+        
+        unknown = []
+        used = set()
+        jsonld_opens = [m.end() for m in self.JSONLD_OPEN_RE.finditer(source)]
+        position = 0
+        for match in self.PLACEHOLDER_RE.finditer(source):
+            name = match.group(1)
+            if name not in schema:
+                unknown.append(name)
+                continue
+            escape = schema[name] or self.detect_context(source, match.start(), jsonld_opens)
+            self.parts.append(source[position:match.start()])
+            self.slots.append((len(self.parts), name, ESCAPERS[escape]))
+            self.parts.append('')
+            used.add(name)
+            position = match.end()
+        self.parts.append(source[position:])
+        
+        if unknown:
+            raise TemplateError(f"模板包含未知占位符: {', '.join(sorted(set(unknown)))}")
+        missing = set(required) - used
+        if missing:
+            raise TemplateError(f"模板缺少必需占位符: {', '.join(sorted(missing))}")
+        self.names = used
+
+    @staticmethod
+    def detect_context(source, pos, jsonld_opens):
+        """推断占位符所在位置的转义方式"""
+        last_open = max((end for end in jsonld_opens if end <= pos), default=-1)
+        if last_open >= 0 and source.find('</script', last_open, pos) == -1:
+            if source[pos - 1:pos] != '"':
+                raise TemplateError("JSON-LD中的占位符必须位于字符串引号内")
+            return 'json'
+        if source.rfind('<', 0, pos) > source.rfind('>', 0, pos):
+            return 'attr'
+        return 'text'
+
+    def render(self, values):
+        out = list(self.parts)
+        for index, name, escape in self.slots:
+            try:
+                value = values[name]
+            except KeyError:
+                raise TemplateError(f"缺少模板变量: {name}") from None
+            out[index] = escape(str(value))
+        return ''.join(out)
+
+
+class BuildManifest:
+    """增量构建清单
+
+    记录模板哈希以及每个游戏的记录哈希、输出文件名和输出哈希，
+    用于跳过输入未变化的页面并清理已从数据源中移除的页面。
+    feed_hash为上次成功完成的构建所用目录的哈希，构建模式据此判断数据源是否变化。
+    """
+
+    VERSION = 1
+
+    def __init__(self, path):
+        self.path = path
+        self.template_hash = None
+        self.feed_hash = None
+        self.entries = {}
+
+    @classmethod
+    def load(cls, path):
+        manifest = cls(path)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return manifest
+        if data.get('version') != cls.VERSION:
+            return manifest
+        manifest.template_hash = data.get('template_hash')
+        manifest.feed_hash = data.get('feed_hash')
+        manifest.entries = data.get('games', {})
+        return manifest
+
+    def save(self):
+        """清单没有变化时不重写（无变化的增量构建不写任何文件）"""
+        # 紧凑格式：带缩进的json.dumps会退回纯Python编码器，一万个条目要多花近一秒
+        write_if_changed(self.path, json.dumps({
+            'version': self.VERSION,
+            'template_hash': self.template_hash,
+            'feed_hash': self.feed_hash,
+            'games': self.entries,
+        }, ensure_ascii=False, separators=(',', ':'), sort_keys=True))
+
+    @staticmethod
+    def timestamps(entry):
+        """已有条目的 (首次加入时间, 内容最近变化时间)；旧清单没有记录时取输出文件的修改时间"""
+        fallback = utc_timestamp(entry.get('output_mtime_ns', 0) / 1e9)
+        lastmod = entry.get('lastmod') or fallback
+        return entry.get('added') or lastmod, lastmod
+
+    @staticmethod
+    def output_intact(filepath, entry):
+        """检查输出文件是否仍与清单中记录的一致"""
+        try:
+            stat = os.stat(filepath)
+        except OSError:
+            return False
+        if stat.st_size != entry.get('output_size'):
+            return False
+        if stat.st_mtime_ns == entry.get('output_mtime_ns'):
+            return True
+        # mtime变化但大小相同时，回退到比较内容哈希
+        with open(filepath, 'rb') as f:
+            return content_hash(f.read()) == entry.get('output_hash')
+
+
+class SlugRegistry:
+    """持久化的 游戏id ↔ 页面文件名 对照表
+
+    每个游戏的文件名只在第一次出现时分配，之后即使标题变化也保持不变；
+    与已有文件名（或保留名）冲突时追加由游戏id得到的后缀。同一次构建中新出现的游戏
+    由assign_all按id排序后分配，标题相同的新游戏谁得到不带后缀的文件名只取决于id，与数据源中的顺序无关。
+    两个方向的查找都是字典访问。对照表文件不存在时从 generated_games.json 恢复已发布的文件名。
+    """
+
+    VERSION = 1
+
+    def __init__(self, path, slugify, reserved=()):
+        self.path = path
+        self.slugify = slugify
+        self.reserved = set(reserved)
+        self._by_id = {}
+        self._by_slug = {}
+        self.assigned = 0
+
+    @classmethod
+    def load(cls, path, slugify, reserved=(), seed_file=None):
+        registry = cls(path, slugify, reserved)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == cls.VERSION:
+                pairs = data.get('slugs', {}).items()
+            else:
+                pairs = ()
+        except (OSError, ValueError):
+            pairs = ()
+            if seed_file:
+                try:
+                    with open(seed_file, 'r', encoding='utf-8') as f:
+                        pairs = [(str(g['id']), g['filename']) for g in json.load(f)]
+                except (OSError, ValueError, KeyError, TypeError):
+                    pairs = ()
+        for game_id, slug in pairs:
+            if slug not in registry._by_slug and slug not in registry.reserved:
+                registry._by_id[game_id] = slug
+                registry._by_slug[slug] = game_id
+        return registry
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def slug(self, game_id):
+        return self._by_id.get(str(game_id))
+
+    def game_id(self, slug):
+        return self._by_slug.get(slug)
+
+    def assign(self, game_id, title):
+        """返回游戏的文件名，首次出现时分配"""
+        game_id = str(game_id)
+        slug = self._by_id.get(game_id)
+        if slug is not None:
+            return slug
+        base = self.slugify(title or '') or 'game'
+        slug = base
+        if slug in self._by_slug or slug in self.reserved:
+            suffix = re.sub(r'[^0-9a-z_-]', '', game_id.lower()) or content_hash(game_id)[:8]
+            slug = f'{base}-{suffix}'
+            counter = 2
+            while slug in self._by_slug or slug in self.reserved:
+                slug = f'{base}-{suffix}-{counter}'
+                counter += 1
+        self._by_id[game_id] = slug
+        self._by_slug[slug] = game_id
+        self.assigned += 1
+        return slug
+
+    def assign_all(self, records):
+        """为一批 (游戏id, 标题) 中尚未分配的游戏按id顺序分配文件名"""
+        new = {}
+        for game_id, title in records:
+            game_id = str(game_id)
+            if game_id not in self._by_id:
+                new.setdefault(game_id, title)
+        # 数字id按数值排序，其余按字符串排序
+        for game_id in sorted(new, key=lambda value: (0, int(value), '') if value.isdigit() else (1, 0, value)):
+            self.assign(game_id, new[game_id])
+
+    def save(self):
+        write_if_changed(self.path, json.dumps({'version': self.VERSION, 'slugs': self._by_id},
+                                               ensure_ascii=False, indent=1))
+
+
+class FeedCache:
+    """数据源响应的磁盘缓存
+
+    以URL为键保存响应体以及ETag/Last-Modified，刷新时发送条件请求；
+    ttl秒内的缓存直接使用，离线或请求失败时可以回退到过期缓存。
+    """
+
+    def __init__(self, cache_dir, ttl=3600):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, url):
+        return os.path.join(self.cache_dir, content_hash(url)[:32] + '.json')
+
+    def get(self, url):
+        try:
+            with open(self._path(url), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def is_fresh(self, entry):
+        return time.time() - entry.get('fetched_at', 0) < self.ttl
+
+    @staticmethod
+    def conditional_headers(entry):
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def put(self, url, body, etag=None, last_modified=None):
+        entry = {
+            'url': url,
+            'body': body,
+            'etag': etag,
+            'last_modified': last_modified,
+            'fetched_at': time.time(),
+        }
+        path = self._path(url)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        return entry
+
+    def touch(self, url, entry):
+        """304响应：内容未变，只刷新获取时间"""
+        return self.put(url, entry['body'], entry.get('etag'), entry.get('last_modified'))
+
+
+class FeedFetcher:
+    """GameMonetize数据源的并发分页抓取器
+
+    对每个查询从第1页开始向后翻页，直到遇到空页（或不足一页的最后一页）。
+    所有请求共享一个带连接池的Session（keep-alive），同时在途的请求数不超过
+    concurrency；连接错误和5xx/429响应按指数退避重试。记录按(查询, 页码)顺序
+    流式产出并按id去重，结果与请求完成的先后无关。
+
+    传入cache时使用条件请求；offline=True时只读缓存，不访问网络。
+    抓取结束后changed表示是否有任何分页内容与缓存不同；truncated为翻到max_pages页仍是满页、
+    因达到页数上限而停止的查询（数据源中可能还有更多游戏）。
+    """
+
+    HEADERS = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+        'Accept': 'application/json, text/plain, */*',
+        'Accept-Language': 'en-US,en;q=0.9',
+        'Accept-Encoding': 'gzip, deflate, br',
+        'Connection': 'keep-alive',
+        'Referer': 'https://gamemonetize.com/'
+    }
+
+    def __init__(self, base_url, queries, per_page=50, concurrency=4, max_pages=100,
+                 retries=3, backoff=0.5, timeout=10, cache=None, offline=False):
+        self.base_url = base_url
+        self.queries = list(queries)
+        self.per_page = per_page
+        self.concurrency = max(1, concurrency)
+        self.max_pages = max_pages
+        self.timeout = timeout
+        self.cache = cache
+        self.offline = offline
+        self.pages_fetched = 0
+        self.duplicates = 0
+        self.page_status = {}
+        self.truncated = []
+        
+        retry = Retry(total=retries, backoff_factor=backoff,
+                      status_forcelist=(429, 500, 502, 503, 504), allowed_methods=['GET'])
+        adapter = HTTPAdapter(pool_connections=self.concurrency, pool_maxsize=self.concurrency,
+                              max_retries=retry)
+        self.session = requests.Session()
+        self.session.headers.update(self.HEADERS)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.session.close()
+
+    def page_url(self, query, page):
+        return f'{self.base_url}?format=0&name={quote(query)}&num={self.per_page}&page={page}'
+
+    @property
+    def changed(self):
+        return any(status == 'changed' for status in self.page_status.values())
+
+    def fetch_page(self, query, page):
+        """抓取单页，返回 (记录列表, 状态)
+
+        状态: cached(缓存未过期) / not_modified(304) / changed(新内容) /
+        unchanged(200但内容与缓存相同) / stale(离线或请求失败时使用过期缓存)
+        """
+        url = self.page_url(query, page)
+        entry = self.cache.get(url) if self.cache else None
+        if entry is not None and self.cache.is_fresh(entry):
+            return self._parse(entry['body']), 'cached'
+        if self.offline:
+            if entry is None:
+                raise RuntimeError(f"离线模式下缺少缓存: {url}")
+            return self._parse(entry['body']), 'stale'
+        
+        headers = self.cache.conditional_headers(entry) if entry else {}
+        try:
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+            if entry is not None and response.status_code == 304:
+                self.cache.touch(url, entry)
+                return self._parse(entry['body']), 'not_modified'
+            response.raise_for_status()
+        except requests.RequestException:
+            if entry is None:
+                raise
+            return self._parse(entry['body']), 'stale'
+        
+        body = response.text
+        status = 'unchanged' if entry is not None and entry['body'] == body else 'changed'
+        if self.cache:
+            self.cache.put(url, body, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        return self._parse(body), status
+
+    @staticmethod
+    def _parse(body):
+        games = json.loads(body)
+        return games if isinstance(games, list) else []
+
+    def iter_games(self):
+        """按(查询, 页码)顺序产出去重后的游戏记录"""
+        seen_ids = set()
+        next_page = {q: 1 for q in self.queries}
+        last_page = {}          # 查询 -> 已知的最后一页（空页的前一页）
+        done = {}               # (查询, 页码) -> 记录列表
+        emit_query = 0
+        emit_page = 1
+        in_flight = {}
+        
+        def schedulable():
+            for query in self.queries:
+                page = next_page[query]
+                if page <= self.max_pages and page <= last_page.get(query, self.max_pages):
+                    return query
+            return None
+        
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            while True:
+                while len(in_flight) < self.concurrency:
+                    query = schedulable()
+                    if query is None:
+                        break
+                    page = next_page[query]
+                    next_page[query] = page + 1
+                    in_flight[pool.submit(self.fetch_page, query, page)] = (query, page)
+                
+                # 按顺序产出已就绪的分页
+                while emit_query < len(self.queries):
+                    query = self.queries[emit_query]
+                    if emit_page > last_page.get(query, self.max_pages):
+                        emit_query += 1
+                        emit_page = 1
+                        continue
+                    games = done.pop((query, emit_page), None)
+                    if games is None:
+                        break
+                    for game in games:
+                        game_id = game.get('id')
+                        if game_id is not None and game_id in seen_ids:
+                            self.duplicates += 1
+                            continue
+                        seen_ids.add(game_id)
+                        yield game
+                    emit_page += 1
+                
+                if not in_flight:
+                    break
+                
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    query, page = in_flight.pop(future)
+                    games, status = future.result()
+                    self.page_status[(query, page)] = status
+                    self.pages_fetched += 1
+                    if not games:
+                        last_page[query] = min(last_page.get(query, self.max_pages), page - 1)
+                        continue
+                    if len(games) < self.per_page:
+                        last_page[query] = min(last_page.get(query, self.max_pages), page)
+                    done[(query, page)] = games
+        
+        # 没有遇到空页或不足一页的查询是被max_pages截断的
+        self.truncated = [query for query in self.queries if query not in last_page]
+        if self.truncated:
+            count('feed.truncated_queries', len(self.truncated))
+
 
 class GamePageGenerator:
+    # 流式生成时为列表页保留的字段
+    CARD_FIELDS = ('id', 'title', 'thumb', 'category', 'tags')
+    # 分页导航在当前页两侧各显示的页码数
+    PAGINATION_WINDOW = 2
+
     def __init__(self):
-        self.feed_url = 'https://gamemonetize.com/feed.php?format=0&name=traffic&num=50&page=1'
+        self.feed_base = 'https://gamemonetize.com/feed.php'
+        self.feed_queries = ['traffic']
+        self.feed_per_page = 50
+        self.feed_concurrency = 4
+        self.feed_max_pages = 100
+        self.use_http_cache = True
+        self.http_cache_dir = os.path.join('.build', 'http_cache')
+        self.feed_ttl = 3600
+        self.offline = False
+        self.feed_changed = True
+        self.feed_hash = None
+        # 上次获取数据源失败时的异常（与“数据源未变化”区分）
+        self.fetch_error = None
         self.games_dir = 'games'
         self.template_file = 'games/game_template.html'
+        self.build_dir = '.build'
+        # 游戏页面模板的槽位schema：None表示按位置自动推断转义方式
+        self.page_slots = {
+            'title': None,
+            'description': None,
+            'keywords': None,
+            'thumb': None,
+            'page_url': None,
+            'game_url': None,
+            'category': None,
+            'category_info': 'raw',
+            'resource_hints': 'raw',
+            'game_frame': 'raw',
+            'related_games': 'raw',
+        }
+        self.required_slots = ('title', 'game_frame')
+        self.manifest_file = os.path.join(self.build_dir, 'manifest.json')
+        self.slug_registry_file = os.path.join(self.build_dir, 'slugs.json')
+        self.catalog_file = 'games_data.json'
+        self.batch_size = 500
+        self.listing_template_file = 'games/listing_template.html'
+        self.listing_page_size = 48
+        # 列表卡片的显示宽度（与listing_template.html中的网格一致）
+        self.card_sizes = '(max-width: 600px) 100vw, 300px'
+        self.search_index_dir = 'games/search'
+        self.snapshot_dir = 'games/data'
+        self.extract_styles = True
+        # 点击播放模式：先显示缩略图，点击后才加载游戏iframe
+        self.facade = False
+        self.base_url = 'https://yourdomain.com/'  # 需要替换为实际域名
+        # sitemap.xml（超过单文件上限时拆分为分片和索引）与新游戏Atom订阅源
+        self.sitemap_state_file = os.path.join(self.build_dir, 'sitemap.json')
+        self.lastmod_file = os.path.join(self.build_dir, 'lastmod.json')
+        # 根目录中不进入sitemap的页面（首页index.html以站点根地址列出）
+        self.sitemap_excluded_pages = ('play.html', '404.html')
+        self.sitemap_limit = SITEMAP_MAX_URLS
+        self.feed_file = 'feed.xml'
+        self.feed_size = 50
+        self.site_title = 'Traffic Jam 3D Games'
+        # 缩略图本地镜像（需要联网下载，默认关闭）
+        self.mirror_thumbs = False
+        self.thumb_cache_dir = os.path.join(self.build_dir, 'thumbs')
+        self.thumb_dir = 'games/thumbs'
+        self.thumb_concurrency = 8
+        # 每个页面显示的相关游戏数量，0表示不生成
+        self.related_count = 6
+        self.related_posting_limit = 100
+        self.related_cache_file = os.path.join(self.build_dir, 'related.json')
+        # 摄取阶段的近似重复检测（默认关闭）
+        self.dedup = False
+        self.dedup_threshold = 0.7
+        self.dedup_flag_only = False
+        self.dedup_report_file = os.path.join(self.build_dir, 'dedup_report.json')
+        self.dist_dir = 'dist'
+        self.search_prefix_len = 2
+        # 列表页模板的槽位：HTML片段由生成器拼好并自行转义
+        self.listing_slots = {
+            'page_title': None,
+            'heading': None,
+            'games_root': None,
+            'category_nav': 'raw',
+            'game_cards': 'raw',
+            'pagination': 'raw',
+        }
         
-    def fetch_games_data(self):
-        """获取游戏数据"""
+    def fetch_games_data(self, queries=None, jsonl=False):
+        """获取游戏数据（并发抓取每个查询的全部分页，按id去重）
+
+        使用磁盘缓存和条件请求。合并后目录（连同去重选项）的哈希与上次成功构建
+        记录的相同且目录文件已存在时不替换文件，并把self.feed_changed置为False，供后续步骤短路。
+        只看分页缓存状态不够：去掉某个查询时剩下的分页全部命中缓存，
+        上次构建在去重或生成阶段失败时上游也没有变化，这两种情况都需要重新生成。
+        jsonl=True时边抓取边写入games_data.jsonl，不在内存中保留全部记录，
+        此时只返回第一条记录作为分析样本。
+        """
+        catalog_file = 'games_data.jsonl' if jsonl else 'games_data.json'
+        tmp_path = catalog_file + '.tmp'
+        self.fetch_error = None
         try:
             print("正在获取游戏数据...")
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                'Accept': 'application/json, text/plain, */*',
-                'Accept-Language': 'en-US,en;q=0.9',
-                'Accept-Encoding': 'gzip, deflate, br',
-                'Connection': 'keep-alive',
-                'Referer': 'https://gamemonetize.com/'
-            }
-            response = requests.get(self.feed_url, headers=headers, timeout=10)
-            response.raise_for_status()
+            cache = FeedCache(self.http_cache_dir, self.feed_ttl) if self.use_http_cache else None
+            fetcher = FeedFetcher(
+                self.feed_base,
+                queries or self.feed_queries,
+                per_page=self.feed_per_page,
+                concurrency=self.feed_concurrency,
+                max_pages=self.feed_max_pages,
+                cache=cache,
+                offline=self.offline,
+            )
+            digest = hashlib.sha256()
+            with fetcher:
+                if jsonl:
+                    games_data = []
+                    count = 0
+                    with open(tmp_path, 'w', encoding='utf-8') as f:
+                        for game in fetcher.iter_games():
+                            line = json.dumps(game, ensure_ascii=False) + '\n'
+                            f.write(line)
+                            digest.update(line.encode('utf-8'))
+                            if not games_data:
+                                games_data.append(game)
+                            count += 1
+                else:
+                    games_data = list(fetcher.iter_games())
+                    count = len(games_data)
+                    catalog_text = json.dumps(games_data, indent=2, ensure_ascii=False)
+                    digest.update(catalog_text.encode('utf-8'))
+            statuses = list(fetcher.page_status.values())
+            print(f"成功获取 {count} 个游戏数据 (请求 {fetcher.pages_fetched} 页, 去重 {fetcher.duplicates} 条)")
+            for query in fetcher.truncated:
+                print(f"⚠️ 查询 {query!r} 达到页数上限 {self.feed_max_pages} 页后停止，数据源中可能还有更多游戏"
+                      f"（用 --max-pages 提高上限）")
+            if cache:
+                print("缓存命中: " + ', '.join(f"{name} {statuses.count(name)}" for name in
+                                               ('cached', 'not_modified', 'unchanged', 'changed', 'stale')))
             
-            games_data = response.json()
-            print(f"成功获取 {len(games_data)} 个游戏数据")
+            self.feed_hash = content_hash(digest.hexdigest() + json.dumps(
+                {'dedup': self.dedup, 'threshold': self.dedup_threshold, 'flag_only': self.dedup_flag_only},
+                sort_keys=True))
+            manifest = BuildManifest.load(self.manifest_file)
+            self.feed_changed = self.feed_hash != manifest.feed_hash or not os.path.exists(catalog_file)
+            if not self.feed_changed:
+                print(f"数据源内容未变化，保留现有 {catalog_file}")
+                if jsonl:
+                    os.remove(tmp_path)
+                return games_data
             
             # 保存原始数据用于分析
-            with open('games_data.json', 'w', encoding='utf-8') as f:
-                json.dump(games_data, f, indent=2, ensure_ascii=False)
+            if jsonl:
+                os.replace(tmp_path, catalog_file)
+            else:
+                write_if_changed(catalog_file, catalog_text)
             
             return games_data
             
         except Exception as e:
             print(f"获取游戏数据失败: {e}")
+            self.feed_changed = False
+            self.fetch_error = e
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
             return []
     
     def analyze_game_structure(self, games_data):
@@ -67,6 +1036,98 @@ class GamePageGenerator:
             else:
                 print(f"✗ {field}: 字段不存在")
     
+    def run_analysis(self, queries=None):
+        """运行分析模式：获取游戏数据、分析数据结构，并在模板不存在时创建模板"""
+        games_data = self.fetch_games_data(queries, jsonl=self.catalog_file.endswith('.jsonl'))
+        self.analyze_game_structure(games_data)
+        if not os.path.exists(self.template_file):
+            self.create_game_template()
+    
+    def run_dedup(self):
+        """摄取阶段：检测目录中的近似重复游戏，之后的生成改用过滤后的目录"""
+        if not os.path.exists(self.catalog_file):
+            print(f"游戏数据文件不存在: {self.catalog_file}")
+            return
+        root, ext = os.path.splitext(self.catalog_file)
+        out_file = f'{root}.dedup{ext}'
+        with stage('dedup'):
+            report = dedup_catalog(self.catalog_file, out_file, self.dedup_report_file,
+                                   threshold=self.dedup_threshold, flag_only=self.dedup_flag_only,
+                                   thumb_index=os.path.join(self.thumb_cache_dir, 'index.json'))
+        count('dedup.duplicates', report['duplicates'])
+        print_dedup_report(report, self.dedup_flag_only)
+        print(f"去重报告已保存到: {self.dedup_report_file}")
+        self.catalog_file = out_file
+    
+    def run_build(self, queries=None, force=False, jobs=1, stream=False):
+        """运行完整构建：获取数据、去重后生成页面；数据源未变化时直接结束
+
+        构建成功（包括数据源未变化）时返回True；数据源获取失败或有页面生成失败时返回False。
+        """
+        with stage('fetch'):
+            self.fetch_games_data(queries, jsonl=self.catalog_file.endswith('.jsonl'))
+        if self.fetch_error is not None:
+            print("数据源获取失败，构建中止（现有页面保持不变）")
+            return False
+        if not self.feed_changed and not force:
+            print("数据源未变化，跳过页面生成")
+            return True
+        if self.dedup:
+            self.run_dedup()
+        with stage('generate'):
+            completed = self.run_generation(force=force, jobs=jobs, stream=stream)
+        # 全部页面生成成功后才记录目录哈希，失败或中断的构建下次即使数据源未变化也会重试
+        if completed and self.feed_hash:
+            manifest = BuildManifest.load(self.manifest_file)
+            manifest.feed_hash = self.feed_hash
+            manifest.save()
+        return bool(completed)
+    
+    def rebuild_listing_pages(self):
+        """只重建列表页（列表页模板变化时使用），游戏文件名取自上次生成的游戏列表"""
+        catalog = GameCatalog()
+        for game in iter_catalog(self.catalog_file):
+            catalog.add({k: game[k] for k in self.CARD_FIELDS if k in game})
+        with open(os.path.join(self.games_dir, 'generated_games.json'), 'r', encoding='utf-8') as f:
+            filenames = {str(g['id']): g['filename'] for g in json.load(f)}
+        thumbs = {}
+        if self.mirror_thumbs:
+            # 镜像缓存已完整时不会发出任何请求
+            with ThumbnailMirror(self.thumb_cache_dir, self.thumb_dir, concurrency=self.thumb_concurrency) as mirror:
+                thumbs = mirror.mirror([record.thumb for record in catalog])
+        with stage('listing'):
+            written, unchanged, removed = self.write_listing_pages(catalog, filenames, thumbs)
+        print(f"列表页: 写入 {written}, 未变 {unchanged}, 删除 {removed}")
+    
+    def run_watch(self, host='127.0.0.1', port=8000, interval=0.2, jobs=1, stream=False):
+        """监视模式：先增量生成一次，之后按依赖图只重建受输入变化影响的部分，并启动本地预览服务器"""
+        source_catalog = self.catalog_file
+        graph = DependencyGraph()
+        graph.add(self.template_file, PAGES)
+        graph.add(source_catalog, CATALOG)
+        graph.add(self.listing_template_file, LISTINGS)
+        graph.add('style.css')
+        
+        def rebuild(changed, targets):
+            if CATALOG in targets and self.dedup:
+                self.catalog_file = source_catalog
+                self.run_dedup()
+            if PAGES in targets or CATALOG in targets:
+                # 构建清单按模板哈希和记录哈希决定重新渲染哪些页面
+                with stage('generate'):
+                    self.run_generation(jobs=jobs, stream=stream)
+            elif LISTINGS in targets:
+                self.rebuild_listing_pages()
+        
+        rebuild(set(), {CATALOG} if os.path.exists(source_catalog) else set())
+        with PreviewServer('.', host, port) as server:
+            print(f"\n预览地址: {server.url}games/index.html")
+            print(f"正在监视: {', '.join(graph.inputs)} (Ctrl+C 退出)")
+            try:
+                watch(graph, rebuild, interval)
+            except KeyboardInterrupt:
+                print("\n已停止监视")
+    
     def sanitize_filename(self, title):
         """清理文件名，移除特殊字符"""
         # 移除或替换特殊字符
@@ -85,6 +1146,7 @@ class GamePageGenerator:
     <title>{title} - Traffic Jam 3D Games</title>
     <meta name="description" content="{description}">
     <meta name="keywords" content="{keywords}">
+    {resource_hints}
     
     <!-- Open Graph Meta Tags -->
     <meta property="og:title" content="{title} - Traffic Jam 3D Games">
@@ -166,11 +1228,87 @@ class GamePageGenerator:
                 padding: 1rem;
             }
         }
+        .game-frame {
+            width: 100%;
+            max-width: 1000px;
+            margin: 1.5rem auto 3rem auto;
+        }
+        .game-frame .game-iframe,
+        .game-facade {
+            display: block;
+            width: 100%;
+            max-width: none;
+            height: auto;
+            margin: 0;
+        }
+        .game-facade {
+            position: relative;
+            overflow: hidden;
+            border-radius: 20px;
+            background: #000;
+            box-shadow: 0 12px 35px rgba(0, 0, 0, 0.4);
+        }
+        .game-facade img {
+            width: 100%;
+            height: 100%;
+            object-fit: cover;
+            opacity: 0.8;
+        }
+        .game-facade-play {
+            position: absolute;
+            top: 50%;
+            left: 50%;
+            width: 88px;
+            height: 88px;
+            margin: -44px 0 0 -44px;
+            border-radius: 50%;
+            background: linear-gradient(135deg, #FFD700, #FFA500);
+            color: #1a1a1a;
+            font-size: 40px;
+            line-height: 88px;
+            text-align: center;
+        }
+        .related-games {
+            margin: 2rem 0;
+            text-align: left;
+        }
+        .related-games h2 {
+            color: #FFD700;
+            margin-bottom: 1rem;
+        }
+        .related-grid {
+            display: grid;
+            grid-template-columns: repeat(auto-fill, minmax(160px, 1fr));
+            gap: 1rem;
+        }
+        .related-item {
+            display: block;
+            color: #c0c0c0;
+            text-decoration: none;
+            background: rgba(26, 26, 26, 0.8);
+            border: 2px solid rgba(255, 215, 0, 0.3);
+            border-radius: 10px;
+            overflow: hidden;
+        }
+        .related-item:hover {
+            border-color: #FFD700;
+        }
+        .related-item img {
+            display: block;
+            width: 100%;
+            aspect-ratio: 4 / 3;
+            object-fit: cover;
+        }
+        .related-item span {
+            display: block;
+            padding: 0.5rem;
+            font-size: 0.9rem;
+        }
     </style>
     
     <!-- JSON-LD Structured Data -->
     <script type="application/ld+json">
-    {{
+    {
         "@context": "https://schema.org",
         "@type": "Game",
         "name": "{title}",
@@ -181,12 +1319,12 @@ class GamePageGenerator:
         "gamePlatform": "Web Browser",
         "operatingSystem": "Any",
         "applicationCategory": "Game",
-        "offers": {{
-             "@type": "Offer",
-             "price": "0",
-             "priceCurrency": "USD"
-         }}
-     }}
+        "offers": {
+            "@type": "Offer",
+            "price": "0",
+            "priceCurrency": "USD"
+        }
+    }
     </script>
 </head>
 <body>
@@ -208,7 +1346,7 @@ class GamePageGenerator:
         <div class="container">
             <div class="game-container">
                 <h1>{title}</h1>
-                <iframe class="game-iframe" src="{game_url}" allowfullscreen></iframe>
+                {game_frame}
                 
                 <div class="game-info">
                     <h2>About This Game</h2>
@@ -216,9 +1354,25 @@ class GamePageGenerator:
                     {category_info}
                     <a href="index.html" class="back-link">← Back to Games</a>
                 </div>
+                {related_games}
             </div>
         </div>
     </main>
+    <script>
+        // 点击占位图后才插入游戏iframe
+        document.querySelectorAll('.game-facade').forEach(function (facade) {
+            facade.addEventListener('click', function (event) {
+                event.preventDefault();
+                var iframe = document.createElement('iframe');
+                iframe.className = 'game-iframe';
+                iframe.src = facade.dataset.src;
+                iframe.allow = 'autoplay; fullscreen';
+                iframe.setAttribute('allowfullscreen', '');
+                iframe.style.aspectRatio = facade.style.aspectRatio;
+                facade.replaceWith(iframe);
+            });
+        });
+    </script>
 </body>
 </html>'''
         
@@ -228,10 +1382,409 @@ class GamePageGenerator:
         
         print(f"游戏页面模板已创建: {self.template_file}")
     
-    def run_generation(self):
-        """运行生成模式"""
-        if not os.path.exists('games_data.json'):
-            print(f"游戏数据文件不存在: games_data.json")
+    def build_template_vars(self, game, filename, context=None):
+        """准备单个游戏页面的模板变量
+
+        数据源中的文本字段可能带有HTML实体（如&rsquo;），这里先还原成纯文本，
+        再由模板按槽位所在上下文统一转义。context为页面的附加输入：
+        thumb为本地镜像的缩略图信息（有镜像时OG标签和JSON-LD使用本站的原尺寸版本），
+        related为相关游戏卡片列表。
+        """
+        context = context or {}
+        thumb = context.get('thumb')
+        title = html.unescape(game['title'])
+        description = html.unescape(game['description'])
+        category = html.unescape(game.get('category', 'Game'))
+        return {
+            'title': title,
+            'description': description[:160] + '...' if len(description) > 160 else description,
+            'keywords': html.unescape(game.get('tags', '')) + ', traffic games, html5 games',
+            'thumb': f"{self.base_url}games/{thumb['full']}" if thumb else game['thumb'],
+            'page_url': f'{self.base_url}games/{filename}.html',
+            'game_url': game['url'],
+            'category': category,
+            'category_info': f'<p><strong>Category:</strong> {escape_text(category)}</p>' if game.get('category') else '',
+            'resource_hints': self.render_resource_hints(game, thumb),
+            'game_frame': self.render_game_frame(game, title, thumb),
+            'related_games': self.render_related_games(context.get('related')),
+        }
+
+    @staticmethod
+    def frame_size(game):
+        """数据源中的游戏宽高，缺失或无效时返回None"""
+        try:
+            width, height = int(game.get('width')), int(game.get('height'))
+        except (TypeError, ValueError):
+            return None
+        return (width, height) if width > 0 and height > 0 else None
+
+    @staticmethod
+    def render_thumb_attrs(game_thumb, thumb, root='', sizes=None):
+        """<img>的src/srcset属性；没有本地镜像时直接引用数据源地址"""
+        if not thumb:
+            return f'src="{escape_attr(game_thumb)}"'
+        attrs = f'src="{escape_attr(root + thumb["src"])}"'
+        if thumb['srcset']:
+            srcset = ', '.join(root + candidate for candidate in thumb['srcset'].split(', '))
+            attrs += f' srcset="{escape_attr(srcset)}"'
+            if sizes:
+                attrs += f' sizes="{sizes}"'
+        return attrs
+
+    def render_game_frame(self, game, title, thumb=None):
+        """游戏区域HTML：按数据源宽高固定比例，避免加载时页面跳动"""
+        url = escape_attr(game['url'])
+        size = self.frame_size(game)
+        size_attrs = f' width="{size[0]}" height="{size[1]}"' if size else ''
+        ratio = f' style="aspect-ratio: {size[0]} / {size[1]}"' if size else ''
+        if not self.facade:
+            return (f'<div class="game-frame"><iframe class="game-iframe" src="{url}"{size_attrs}{ratio} '
+                    f'allowfullscreen></iframe></div>')
+        # 没有JavaScript时链接直接打开游戏
+        image = (f'<img {self.render_thumb_attrs(game["thumb"], thumb, sizes="(max-width: 1000px) 100vw, 1000px")} '
+                 f'alt="{escape_attr(title)}"{size_attrs} loading="lazy">'
+                 if game.get('thumb') else '')
+        return (f'<div class="game-frame"><a class="game-facade" href="{url}" data-src="{url}"{ratio} '
+                f'aria-label="Play {escape_attr(title)}">{image}'
+                f'<span class="game-facade-play" aria-hidden="true">&#9654;</span></a></div>')
+
+    def related_card(self, record, filename, thumbs):
+        """相关游戏卡片的数据（同时计入页面输入哈希）"""
+        return {
+            'title': html.unescape(record.title or ''),
+            'filename': filename,
+            'thumb': record.thumb,
+            'image': thumbs.get(record.thumb),
+        }
+
+    def render_related_games(self, cards):
+        if not cards:
+            return ''
+        items = [f'<a href="{escape_attr(card["filename"])}.html" class="related-item">'
+                 f'<img {self.render_thumb_attrs(card["thumb"], card["image"], sizes="(max-width: 600px) 50vw, 200px")} '
+                 f'alt="{escape_attr(card["title"])}" loading="lazy"><span>{escape_text(card["title"])}</span></a>'
+                 for card in cards]
+        return ('<section class="related-games">\n'
+                '                    <h2>Related Games</h2>\n'
+                '                    <div class="related-grid">\n'
+                + ''.join(f'                        {item}\n' for item in items)
+                + '                    </div>\n'
+                '                </section>')
+
+    def render_resource_hints(self, game, thumb=None):
+        """为游戏和缩略图所在主机生成preconnect/dns-prefetch提示
+
+        直接嵌入时页面加载就会请求游戏主机；点击播放模式下先加载的是缩略图，
+        游戏主机只做DNS预解析。
+        """
+        hints = {}
+        game_origin = self.origin(game.get('url'))
+        if self.facade:
+            # 本地镜像的缩略图与页面同源，不需要提示
+            thumb_origin = None if thumb else self.origin(game.get('thumb'))
+            if thumb_origin:
+                hints[thumb_origin] = 'preconnect'
+            if game_origin:
+                hints.setdefault(game_origin, 'dns-prefetch')
+        elif game_origin:
+            hints[game_origin] = 'preconnect'
+        return '\n    '.join(f'<link rel="{rel}" href="{escape_attr(origin)}">' for origin, rel in hints.items())
+
+    @staticmethod
+    def origin(url):
+        parts = urlsplit(url or '')
+        if parts.scheme not in ('http', 'https') or not parts.netloc:
+            return None
+        return f'{parts.scheme}://{parts.netloc}'
+
+    STYLE_BLOCK_RE = re.compile(r'[ \t]*<style[^>]*>(.*?)</style>[ \t]*\n?', re.DOTALL | re.IGNORECASE)
+
+    def stylesheet_link(self, stylesheet):
+        return f'    <link rel="stylesheet" href="{stylesheet}">\n'
+
+    def extract_stylesheet(self, source):
+        """把模板中的<style>块移到 games/assets/game.<哈希>.css
+
+        样式表文件名带内容哈希，可以长期缓存；旧版本在生成完成后由prune_stylesheets清理。
+        返回 (替换为<link>后的模板, 样式表相对games目录的路径, 每页节省的内联样式字节数)。
+        """
+        blocks = list(self.STYLE_BLOCK_RE.finditer(source))
+        if not blocks:
+            return source, None, 0
+        css = ''.join(match.group(1).strip('\n') + '\n' for match in blocks)
+        name = f'game.{content_hash(css)[:10]}.css'
+        assets_dir = os.path.join(self.games_dir, 'assets')
+        write_if_changed(os.path.join(assets_dir, name), css)
+        
+        stylesheet = f'assets/{name}'
+        inline_bytes = sum(len(match.group(0).encode('utf-8')) for match in blocks)
+        # 第一个<style>块替换为<link>，其余的直接删除
+        source = (source[:blocks[0].start()] + self.stylesheet_link(stylesheet)
+                  + ''.join(source[a.end():b.start()] for a, b in zip(blocks, blocks[1:]))
+                  + source[blocks[-1].end():])
+        return source, stylesheet, inline_bytes
+
+    def prune_stylesheets(self, entries):
+        """删除清单中没有任何页面引用的旧版样式表，返回删除的文件数
+
+        没有重新生成的页面（渲染失败、旧的清单条目）仍然链接旧样式表，因此只在生成完成后
+        按清单中记录的引用清理；有条目没有记录样式表时无法确定引用，不删除任何文件。
+        """
+        assets_dir = os.path.join(self.games_dir, 'assets')
+        if not os.path.isdir(assets_dir) or any('stylesheet' not in entry for entry in entries.values()):
+            return 0
+        referenced = {entry['stylesheet'] for entry in entries.values()}
+        removed = 0
+        for name in os.listdir(assets_dir):
+            if name.startswith('game.') and name.endswith('.css') and f'assets/{name}' not in referenced:
+                os.remove(os.path.join(assets_dir, name))
+                removed += 1
+        return removed
+
+    def compile_template(self, source):
+        """把游戏页面模板编译为CompiledTemplate"""
+        return CompiledTemplate(source, self.page_slots, self.required_slots)
+
+    def render_page(self, template, game, filename, context=None):
+        """渲染单个游戏页面，返回UTF-8编码的字节"""
+        template_vars = self.build_template_vars(game, filename, context)
+        return template.render(template_vars).encode('utf-8')
+
+    def write_generated_games(self, generated_games):
+        """保存生成的游戏列表，内容未变化时不重写文件"""
+        path = os.path.join(self.games_dir, 'generated_games.json')
+        content = json.dumps(generated_games, ensure_ascii=False, indent=2)
+        return write_if_changed(path, content)
+
+    def listing_href(self, category_slug=None, page=1):
+        """列表页相对于games目录的路径"""
+        if category_slug is None:
+            return 'index.html' if page == 1 else f'list/{page}.html'
+        return f'category/{category_slug}/' + ('index.html' if page == 1 else f'{page}.html')
+
+    def render_game_card(self, record, filenames, games_root, thumbs=None):
+        """渲染单个游戏卡片；没有独立页面的游戏回退到动态页面"""
+        filename = filenames.get(record.id)
+        href = f'{games_root}{filename}.html' if filename else f'{games_root}play.html?id={quote(record.id)}'
+        title = html.unescape(record.title or '')
+        return (f'                <div class="game-item"><a href="{escape_attr(href)}" target="_self">'
+                f'<img {self.render_thumb_attrs(record.thumb, (thumbs or {}).get(record.thumb), games_root, self.card_sizes)} '
+                f'alt="{escape_attr(title)}" loading="lazy">'
+                f'<h3>{escape_text(title)}</h3></a></div>')
+
+    def pagination_numbers(self, page, page_count):
+        """分页导航中显示的页码：首页、末页和当前页前后PAGINATION_WINDOW页，中间的空缺用None表示
+
+        链接数与总页数无关，每个列表页的大小保持固定。
+        """
+        window = self.PAGINATION_WINDOW
+        shown = sorted({1, page_count, *range(max(1, page - window), min(page_count, page + window) + 1)})
+        numbers = []
+        for number in shown:
+            if numbers and number - numbers[-1] > 1:
+                # 只空一页时直接显示该页，不用省略号
+                numbers.append(numbers[-1] + 1 if number - numbers[-1] == 2 else None)
+            numbers.append(number)
+        return numbers
+
+    def render_pagination(self, category_slug, page, page_count, games_root):
+        if page_count <= 1:
+            return ''
+        links = []
+        if page > 1:
+            links.append(f'<a href="{games_root}{self.listing_href(category_slug, page - 1)}" rel="prev">← Prev</a>')
+        for number in self.pagination_numbers(page, page_count):
+            if number is None:
+                links.append('<span class="gap">…</span>')
+            elif number == page:
+                links.append(f'<span class="current">{number}</span>')
+            else:
+                links.append(f'<a href="{games_root}{self.listing_href(category_slug, number)}">{number}</a>')
+        if page < page_count:
+            links.append(f'<a href="{games_root}{self.listing_href(category_slug, page + 1)}" rel="next">Next →</a>')
+        return '\n'.join('                ' + link for link in links)
+
+    def render_category_nav(self, categories, current_slug, games_root):
+        links = [f'<a href="{games_root}index.html"' + (' class="active"' if current_slug is None else '') + '>All</a>']
+        for name, slug, count in categories:
+            active = ' class="active"' if slug == current_slug else ''
+            links.append(f'<a href="{games_root}{self.listing_href(slug)}"{active}>'
+                         f'{escape_text(html.unescape(name))} ({count})</a>')
+        return '\n'.join('                ' + link for link in links)
+
+    def write_listing_pages(self, catalog, filenames, thumbs=None):
+        """在构建时生成分页的游戏列表页和分类列表页
+
+        卡片HTML和id→文件名的对应关系都在构建时处理完毕，浏览器首屏不需要请求任何JSON。
+        内容未变化的列表页不重写，不再需要的列表页会被删除。返回 (写入数, 未变数, 删除数)。
+        thumbs为缩略图地址到本地镜像信息的映射，卡片据此使用srcset。
+        """
+        if not os.path.exists(self.listing_template_file):
+            print(f"列表页模板不存在，跳过列表页生成: {self.listing_template_file}")
+            return 0, 0, 0
+        with open(self.listing_template_file, 'r', encoding='utf-8') as f:
+            template = CompiledTemplate(f.read(), self.listing_slots, ('game_cards',))
+        
+        categories = sorted(
+            (name, self.sanitize_filename(html.unescape(name)), count)
+            for name, count in catalog.category_counts().items()
+        )
+        listings = [(None, 'More Games', catalog.records)]
+        listings += [(slug, html.unescape(name), catalog.by_category(name)) for name, slug, _ in categories]
+        
+        written = unchanged = 0
+        outputs = set()
+        size = self.listing_page_size
+        for category_slug, heading, records in listings:
+            page_count = max(1, -(-len(records) // size))
+            for page in range(1, page_count + 1):
+                href = self.listing_href(category_slug, page)
+                games_root = '../' * href.count('/')
+                page_records = records[(page - 1) * size:page * size]
+                title = heading if page == 1 else f'{heading} - Page {page}'
+                content = template.render({
+                    'page_title': title,
+                    'heading': title,
+                    'games_root': games_root,
+                    'category_nav': self.render_category_nav(categories, category_slug, games_root),
+                    'game_cards': '\n'.join(self.render_game_card(r, filenames, games_root, thumbs) for r in page_records),
+                    'pagination': self.render_pagination(category_slug, page, page_count, games_root),
+                })
+                path = os.path.join(self.games_dir, *href.split('/'))
+                outputs.add(os.path.normpath(path))
+                if write_if_changed(path, content):
+                    written += 1
+                else:
+                    unchanged += 1
+        
+        # 删除不再需要的分页和分类页
+        removed = 0
+        for subdir in ('list', 'category'):
+            root_dir = os.path.join(self.games_dir, subdir)
+            for dirpath, _, files in os.walk(root_dir, topdown=False):
+                for name in files:
+                    path = os.path.normpath(os.path.join(dirpath, name))
+                    if name.endswith('.html') and path not in outputs:
+                        os.remove(path)
+                        removed += 1
+                if dirpath != root_dir and not os.listdir(dirpath):
+                    os.rmdir(dirpath)
+        return written, unchanged, removed
+
+    def site_urls(self, entries, build_time):
+        """sitemap中的全部地址 [(地址, lastmod)]
+
+        游戏页面的lastmod取自构建清单；根目录静态页面和列表页按内容哈希记录，
+        内容变化时才更新为build_time（文件修改时间在检出或部署后会被重置）。
+        """
+        def file_url(path):
+            url = self.base_url + path.replace(os.sep, '/')
+            return url[:-len('index.html')] if url.endswith('/index.html') else url
+
+        lastmods = PageLastmod(self.lastmod_file)
+        urls = []
+        for name in sorted(os.listdir('.')):
+            if name.endswith('.html') and name not in self.sitemap_excluded_pages:
+                urls.append((file_url(name), lastmods.lastmod(name, build_time)))
+        listing_pages = [os.path.join(self.games_dir, 'index.html')]
+        for subdir in ('list', 'category'):
+            for dirpath, _, files in os.walk(os.path.join(self.games_dir, subdir)):
+                listing_pages += [os.path.join(dirpath, name) for name in files if name.endswith('.html')]
+        for path in sorted(listing_pages):
+            if os.path.exists(path):
+                urls.append((file_url(path), lastmods.lastmod(path, build_time)))
+        lastmods.save()
+        for entry in entries.values():
+            urls.append((f"{self.base_url}games/{entry['filename']}.html", entry['lastmod']))
+        return urls
+
+    def feed_entries(self, entries):
+        """最近加入的feed_size个游戏，标题和描述取自游戏数据快照"""
+        newest = sorted(entries.items(), key=lambda item: (item[1]['added'], item[0]), reverse=True)
+        feed = []
+        for game_id, entry in newest[:self.feed_size]:
+            try:
+                with open(self.snapshot_path(game_id), 'r', encoding='utf-8') as f:
+                    game = json.load(f)
+            except (OSError, ValueError):
+                continue
+            feed.append({
+                'title': html.unescape(game.get('title') or ''),
+                'url': f"{self.base_url}games/{entry['filename']}.html",
+                'added': entry['added'],
+                'updated': entry['lastmod'],
+                'category': html.unescape(game.get('category') or ''),
+                'summary': html.unescape(game.get('description') or ''),
+            })
+        return feed
+
+    def snapshot_path(self, game_id):
+        """单个游戏数据快照的路径（以稳定的游戏id命名）"""
+        safe_id = re.sub(r'[^0-9A-Za-z_-]', '_', str(game_id))
+        return os.path.join(self.snapshot_dir, f'{safe_id}.json')
+
+    def write_snapshot(self, game, game_id, filename):
+        """写入play.html使用的单个游戏数据快照，内容未变化时不重写"""
+        snapshot = dict(game)
+        snapshot['id'] = game_id
+        snapshot['slug'] = filename
+        data = json.dumps(snapshot, ensure_ascii=False, separators=(',', ':'))
+        return write_if_changed(self.snapshot_path(game_id), data)
+
+    def write_page(self, template, game, game_id, filename, filepath, context=None):
+        """写入单个游戏的数据快照并渲染写入页面，返回清单中的输出信息"""
+        # 先写快照：即使页面渲染失败，列表页回退到的play.html也能加载到数据
+        with stage('snapshot'):
+            self.write_snapshot(game, game_id, filename)
+        with stage('render'):
+            data = self.render_page(template, game, filename, context)
+        
+        # 写入文件
+        with stage('write'):
+            with open(filepath, 'wb') as f:
+                f.write(data)
+        count('writes.written')
+        count('bytes.out', len(data))
+        
+        stat = os.stat(filepath)
+        return {
+            'filename': filename,
+            'output_hash': content_hash(data),
+            'output_size': stat.st_size,
+            'output_mtime_ns': stat.st_mtime_ns,
+        }
+
+    def render_pages(self, template, tasks, pool=None, jobs=1):
+        """渲染一组页面任务 (game, game_id, filename, filepath, context)
+
+        按任务顺序返回 (entry, error) 列表。传入进程池时把任务切分成块
+        交给工作进程渲染和写入，结果按原顺序合并，与串行路径输出完全一致。
+        """
+        if pool is None or len(tasks) <= 1:
+            return _render_tasks(self, template, tasks)
+        
+        chunk_size = max(1, -(-len(tasks) // (jobs * 4)))
+        chunks = [tasks[i:i + chunk_size] for i in range(0, len(tasks), chunk_size)]
+        results = []
+        for chunk_results, delta in pool.map(_render_chunk, chunks):
+            results.extend(chunk_results)
+            build_metrics.merge(delta)
+        return results
+
+    def run_generation(self, force=False, jobs=1, stream=False):
+        """运行生成模式
+
+        基于构建清单进行增量生成：模板和游戏记录均未变化且输出文件完好的页面
+        会被跳过；已从数据源中移除的游戏页面会被删除。force=True时全部重新生成，
+        jobs>1时使用进程池并行渲染。stream=True时逐条读取目录并按批渲染，完整的游戏记录
+        （描述、说明等长字段）不会同时留在内存中；但列表页卡片字段、相关游戏特征、
+        文件名对照表和构建清单条目仍按游戏数线性增长（O(n)），峰值内存并不是恒定的。
+        流式模式还要多扫描一遍目录，对一般规模的目录反而更慢（1万个游戏时峰值内存
+        只降低约7%，耗时增加约20%），只在长字段占目录大部分时才值得使用，因此默认关闭，
+        JSON Lines目录默认也整体加载。全部页面生成成功时返回True。
+        """
+        if not os.path.exists(self.catalog_file):
+            print(f"游戏数据文件不存在: {self.catalog_file}")
             print("请先运行分析模式")
             return
         
@@ -241,70 +1794,428 @@ class GamePageGenerator:
             return
         
         # 加载游戏数据
-        with open('games_data.json', 'r', encoding='utf-8') as f:
-            games_data = json.load(f)
+        count('bytes.in', os.path.getsize(self.catalog_file))
+        if stream:
+            games_data = iter_catalog(self.catalog_file, with_source=True)
+        else:
+            with stage('load_catalog'):
+                games_data = GameCatalog.load(self.catalog_file)
         
         # 加载模板
         with open(self.template_file, 'r', encoding='utf-8') as f:
-            template = f.read()
+            template_source = f.read()
+        
+        # 把模板中的内联样式提取为共享的带哈希样式表
+        inline_style_bytes = 0
+        stylesheet = None
+        if self.extract_styles:
+            template_source, stylesheet, inline_style_bytes = self.extract_stylesheet(template_source)
+        
+        try:
+            template = self.compile_template(template_source)
+        except TemplateError as e:
+            print(f"模板编译失败: {e}")
+            return
         
-        print(f"=== 开始生成 {len(games_data)} 个游戏页面 ===")
+        manifest = BuildManifest.load(self.manifest_file)
+        # 影响页面输出的生成选项也计入模板哈希
+        template_hash = content_hash(template_source + '\0' + json.dumps(
+            {'facade': self.facade, 'base_url': self.base_url}, sort_keys=True))
+        full_rebuild = force or manifest.template_hash != template_hash
+        build_time = utc_timestamp()
+        
+        if isinstance(games_data, GameCatalog):
+            print(f"=== 开始生成 {len(games_data)} 个游戏页面 ===")
+        else:
+            print(f"=== 开始流式生成游戏页面: {self.catalog_file} ===")
+        if full_rebuild:
+            print("模板已变化或强制重建，将重新生成全部页面")
+        
+        # 列表页使用的目录：非流式模式直接复用已加载的目录，流式模式只保留卡片所需字段。
+        # 相关游戏需要完整目录，流式模式下先单独扫描一遍目录收集卡片字段
+        collect_cards = False
+        if isinstance(games_data, GameCatalog):
+            listing_catalog = games_data
+        elif self.related_count:
+            listing_catalog = GameCatalog()
+            with stage('load_catalog'):
+                for game in iter_catalog(self.catalog_file):
+                    listing_catalog.add({k: game[k] for k in self.CARD_FIELDS if k in game})
+        else:
+            listing_catalog = GameCatalog()
+            collect_cards = True
+        
+        # 文件名统一由对照表分配：生成前按id顺序预先分配全部新游戏，结果与数据源顺序无关，
+        # 相关游戏卡片也能使用。流式模式下没有完整目录时单独扫描一遍，只取id和标题
+        slugs = SlugRegistry.load(self.slug_registry_file, self.sanitize_filename,
+                                  reserved=[os.path.splitext(name)[0] for name in EXCLUDED_PAGES],
+                                  seed_file=os.path.join(self.games_dir, 'generated_games.json'))
+        with stage('slugs'):
+            if collect_cards:
+                slugs.assign_all((game.get('id', i), game.get('title'))
+                                 for i, game in enumerate(iter_catalog(self.catalog_file)))
+            else:
+                slugs.assign_all((record.id if record.id is not None else i, record.title)
+                                 for i, record in enumerate(listing_catalog))
         
         generated_games = []
-        for i, game in enumerate(games_data):
-            try:
-                # 生成文件名
-                filename = self.sanitize_filename(game['title'])
-                filepath = os.path.join('games', f'{filename}.html')
-                
-                # 准备模板变量
-                template_vars = {
-                    'title': game['title'],
-                    'description': game['description'][:160] + '...' if len(game['description']) > 160 else game['description'],
-                    'keywords': game.get('tags', '') + ', traffic games, html5 games',
-                    'thumb': game['thumb'],
-                    'page_url': f'https://yourdomain.com/games/{filename}.html',  # 需要替换为实际域名
-                    'game_url': game['url'],
-                    'category': game.get('category', 'Game'),
-                    'category_info': f'<p><strong>Category:</strong> {game.get("category", "Game")}</p>' if game.get('category') else ''
-                }
-                
-                # 替换模板变量
-                html_content = template
-                for key, value in template_vars.items():
-                    html_content = html_content.replace(f'{{{key}}}', str(value))
-                
-                # 写入文件
-                with open(filepath, 'w', encoding='utf-8') as f:
-                    f.write(html_content)
+        entries = {}
+        # 本次目录中出现过的全部游戏id（含渲染失败的），清理只针对不在其中的游戏
+        seen_ids = set()
+        ok_ids = set()
+        rendered = skipped = failed = 0
+        elapsed = 0.0
+        thumbs = {}
+        mirror = None
+        if self.mirror_thumbs:
+            mirror = ThumbnailMirror(self.thumb_cache_dir, self.thumb_dir, concurrency=self.thumb_concurrency)
+            if not collect_cards:
+                # 目录已完整：一次性镜像全部缩略图，相关游戏卡片也能使用
+                with stage('thumbnails'):
+                    thumbs.update(mirror.mirror([record.thumb for record in listing_catalog]))
+        
+        related = {}
+        related_engine = None
+        if self.related_count:
+            with stage('related'):
+                related_engine = RelatedGames(self.related_cache_file, k=self.related_count, posting_limit=self.related_posting_limit)
+                related = related_engine.update({
+                    record.id: game_features(record.tags, record.category)
+                    for record in listing_catalog if record.id is not None
+                }, force=force)
+                if related_engine.changed:
+                    related_engine.save()
+            count('related.recomputed', related_engine.recomputed)
+        pool = None
+        if jobs > 1:
+            pool = ProcessPoolExecutor(max_workers=jobs, initializer=_init_render_worker,
+                                       initargs=(self, template))
+        try:
+            index = 0
+            for batch in iter_batches(games_data, self.batch_size):
+                # 并发镜像本批的缩略图，已缓存的不做任何工作
+                if mirror is not None and collect_cards:
+                    with stage('thumbnails'):
+                        thumbs.update(mirror.mirror([game.get('thumb') for game, *_ in batch]))
                 
-                generated_games.append({
-                    'title': game['title'],
-                    'filename': filename,
-                    'filepath': filepath,
-                    'id': game.get('id', i)
-                })
+                # 第一遍：确定本批中需要渲染的页面
+                planned = time.perf_counter()
+                tasks = []
+                task_keys = []
+                for game in batch:
+                    i = index
+                    index += 1
+                    # 跳过判断只用紧凑记录的字段和加载时的源文本哈希，需要渲染时才还原完整记录
+                    if isinstance(game, GameRecord):
+                        record, game = game, None
+                        game_id = i if record.index in record.catalog.missing_ids else record.id
+                        title, thumb, game_hash = record.title, record.thumb, record.source_hash
+                    else:
+                        record, (game, game_hash, _, _) = None, game
+                        if collect_cards:
+                            listing_catalog.add({k: game[k] for k in self.CARD_FIELDS if k in game})
+                        game_id = game.get('id', i)
+                        title, thumb = game.get('title'), game.get('thumb')
+                    seen_ids.add(str(game_id))
+                    try:
+                        if title is None:
+                            raise KeyError('title')
+                        # 生成文件名
+                        filename = slugs.assign(game_id, title)
+                        filepath = os.path.join('games', f'{filename}.html')
+                        if game_hash is None:
+                            game = game or record.as_feed_record()
+                            game_hash = record_hash(game)
+                        context = {}
+                        if thumb in thumbs:
+                            context['thumb'] = thumbs[thumb]
+                        related_ids = related.get(str(game_id))
+                        if related_ids:
+                            context['related'] = [self.related_card(listing_catalog.get(other), slugs.slug(other), thumbs)
+                                                  for other in related_ids]
+                        if context:
+                            # 缩略图镜像和相关游戏同样决定页面内容
+                            game_hash = content_hash(game_hash + json.dumps(context, sort_keys=True))
+                        
+                        previous = manifest.entries.get(str(game_id))
+                        if (not full_rebuild and previous
+                                and previous['record_hash'] == game_hash
+                                and previous['filename'] == filename
+                                and BuildManifest.output_intact(filepath, previous)
+                                and os.path.exists(self.snapshot_path(game_id))):
+                            if 'lastmod' not in previous:
+                                previous['added'], previous['lastmod'] = BuildManifest.timestamps(previous)
+                            # 模板未变化的页面引用的就是当前的样式表
+                            previous.setdefault('stylesheet', stylesheet)
+                            entries[str(game_id)] = previous
+                            ok_ids.add(str(game_id))
+                            skipped += 1
+                        else:
+                            tasks.append((game or record.as_feed_record(), game_id, filename, filepath, context))
+                            task_keys.append((str(game_id), game_hash))
+                        
+                        generated_games.append({
+                            'title': title,
+                            'filename': filename,
+                            'filepath': filepath,
+                            'id': game_id
+                        })
+                        
+                    except Exception as e:
+                        failed += 1
+                        print(f"✗ 生成失败 {title}: {e}")
+                        key = str(game_id)
+                        if key in manifest.entries:
+                            entries[key] = dict(manifest.entries[key], record_hash=None)
                 
-                print(f"✓ 已生成: {filepath}")
+                # 第二遍：渲染并写入（串行或进程池）
+                started = time.perf_counter()
+                build_metrics.record('plan', started - planned)
+                with stage('pages'):
+                    results = self.render_pages(template, tasks, pool, jobs)
+                elapsed += time.perf_counter() - started
                 
-            except Exception as e:
-                print(f"✗ 生成失败 {game['title']}: {e}")
+                failed_files = set()
+                for (game, _, filename, filepath, _), (key, game_hash), (entry, error) in zip(tasks, task_keys, results):
+                    if error:
+                        failed += 1
+                        print(f"✗ 生成失败 {game['title']}: {error}")
+                        # 沿用上次的清单条目并清空记录哈希（下次一定重新渲染），保留其快照和页面
+                        previous = manifest.entries.get(key)
+                        if previous:
+                            entries[key] = dict(previous, record_hash=None)
+                        # 上次的页面仍然在线时继续出现在列表页中
+                        if not previous or previous['filename'] != filename:
+                            failed_files.add(filename)
+                        continue
+                    entry['record_hash'] = game_hash
+                    entry['stylesheet'] = stylesheet
+                    # lastmod只在页面内容哈希变化时更新（例如模板改动后内容相同的页面保持原值）
+                    previous = manifest.entries.get(key)
+                    if previous:
+                        entry['added'], lastmod = BuildManifest.timestamps(previous)
+                        entry['lastmod'] = lastmod if previous.get('output_hash') == entry['output_hash'] else build_time
+                    else:
+                        entry['added'] = entry['lastmod'] = build_time
+                    entries[key] = entry
+                    ok_ids.add(key)
+                    rendered += 1
+                    print(f"✓ 已生成: {filepath}")
+                if failed_files:
+                    generated_games = [g for g in generated_games if g['filename'] not in failed_files]
+        finally:
+            if pool is not None:
+                pool.shutdown()
+            if mirror is not None:
+                mirror.close()
+                mirror.save()
+        
+        # 清理已从数据源中移除（或改名）的游戏页面
+        live_filenames = {entry['filename'] for entry in entries.values()}
+        removed = 0
+        for game_id, entry in manifest.entries.items():
+            if game_id not in seen_ids and os.path.exists(self.snapshot_path(game_id)):
+                os.remove(self.snapshot_path(game_id))
+            if entries.get(game_id) is entry or entry['filename'] in live_filenames:
+                continue
+            # 仍在目录中但本次没有成功生成的游戏保留原页面，避免一次临时错误让页面下线
+            if game_id in seen_ids and game_id not in ok_ids:
+                continue
+            filepath = os.path.join('games', f"{entry['filename']}.html")
+            if os.path.exists(filepath):
+                os.remove(filepath)
+                removed += 1
+                print(f"✗ 已删除: {filepath}")
+        
+        count('pages.rendered', rendered)
+        count('pages.skipped', skipped)
+        count('pages.failed', failed)
+        count('pages.removed', removed)
+        
+        with stage('manifest'):
+            manifest.template_hash = template_hash
+            manifest.entries = entries
+            manifest.save()
+            slugs.save()
+            
+            # 保存生成的游戏列表和 id→slug 对照表
+            self.write_generated_games(generated_games)
+            write_if_changed(os.path.join(self.snapshot_dir, 'slugs.json'), json.dumps(
+                {str(g['id']): g['filename'] for g in generated_games}, ensure_ascii=False, separators=(',', ':')))
+        
+        # 清单保存后再清理旧样式表，保留仍被页面引用的版本
+        stylesheets_removed = self.prune_stylesheets(entries)
+        
+        # 生成静态列表页
+        filenames = {str(g['id']): g['filename'] for g in generated_games}
+        with stage('listing'):
+            listing_written, listing_unchanged, listing_removed = self.write_listing_pages(listing_catalog, filenames, thumbs)
         
-        # 保存生成的游戏列表
-        with open('games/generated_games.json', 'w', encoding='utf-8') as f:
-            json.dump(generated_games, f, ensure_ascii=False, indent=2)
+        # 清理不再引用的缩略图变体（有下载失败时保留，避免误删仍在使用的文件）
+        thumbs_removed = 0
+        if mirror is not None and not mirror.failed:
+            thumbs_removed = mirror.prune(thumbs)
+        
+        # 生成分片搜索索引
+        with stage('search_index'):
+            search_stats = build_search_index(listing_catalog, filenames, self.search_index_dir,
+                                              prefix_len=self.search_prefix_len)
+        
+        # sitemap.xml和新游戏订阅源
+        with stage('sitemap'):
+            sitemap_stats = write_sitemaps(self.site_urls(entries, build_time), self.base_url,
+                                           state_file=self.sitemap_state_file, limit=self.sitemap_limit)
+            feed_written = write_atom_feed(self.feed_file, self.feed_entries(entries),
+                                           self.base_url + self.feed_file, self.base_url,
+                                           f'{self.site_title} - New Games')
         
         print(f"\n=== 生成完成 ===")
-        print(f"成功生成 {len(generated_games)} 个游戏页面")
+        print(f"成功生成 {len(generated_games)} 个游戏页面 (渲染 {rendered}, 跳过 {skipped}, 删除 {removed}, 失败 {failed})")
+        if rendered:
+            print(f"渲染耗时 {elapsed:.3f}s, 吞吐量 {rendered / elapsed:.1f} 页/秒 (jobs={jobs})")
+        if self.extract_styles and inline_style_bytes:
+            page_bytes = sum(entry['output_size'] for entry in entries.values())
+            saved = (inline_style_bytes - len(self.stylesheet_link(stylesheet).encode('utf-8'))) * len(entries)
+            css_bytes = os.path.getsize(os.path.join(self.games_dir, stylesheet))
+            print(f"共享样式表: {stylesheet} ({css_bytes} 字节, 删除旧版本 {stylesheets_removed} 个)")
+            if entries:
+                print(f"页面平均大小: {(page_bytes + saved) // len(entries)} → {page_bytes // len(entries)} 字节, "
+                      f"全部页面: {page_bytes + saved} → {page_bytes + css_bytes} 字节 (含样式表)")
+        if mirror is not None:
+            print(f"缩略图: {len(thumbs)} 个本地镜像, 下载 {mirror.downloaded}, 缓存命中 {mirror.cached}, "
+                  f"失败 {mirror.failed}, 写入变体 {mirror.variants_written}, 删除 {thumbs_removed}")
+            for url, error in mirror.errors.items():
+                print(f"✗ 缩略图下载失败 {url}: {error}")
+        if related_engine is not None:
+            print(f"相关游戏: 重新计算 {related_engine.recomputed} / {len(related)} 个")
+        print(f"文件名对照表: {len(slugs)} 个 (新分配 {slugs.assigned})")
         print(f"游戏列表已保存到: games/generated_games.json")
-        print("\n下一步需要更新 games/index.html 中的链接")
+        print(f"列表页: 写入 {listing_written}, 未变 {listing_unchanged}, 删除 {listing_removed}")
+        print(f"sitemap: {sitemap_stats['urls']} 个地址, {sitemap_stats['shards']} 个分片, "
+              f"写入 {sitemap_stats['written']}, 未变 {sitemap_stats['unchanged']}, 删除 {sitemap_stats['removed']}; "
+              f"订阅源{'已更新' if feed_written else '未变'}: {self.feed_file}")
+        print(f"搜索索引: {search_stats['terms']} 个词项, {search_stats['shards']} 个分片 "
+              f"(最大 {search_stats['max_shard_bytes']} 字节), 写入 {search_stats['written']}, 删除 {search_stats['removed']}")
+        return failed == 0
+
+
+# 进程池工作进程的状态，由 _init_render_worker 在每个工作进程中初始化一次
+_worker_state = {}
+
+
+def _init_render_worker(generator, template):
+    _worker_state['generator'] = generator
+    _worker_state['template'] = template
+
+
+def _render_chunk(tasks):
+    results = _render_tasks(_worker_state['generator'], _worker_state['template'], tasks)
+    return results, build_metrics.take()
+
+
+def _render_tasks(generator, template, tasks):
+    results = []
+    for game, game_id, filename, filepath, context in tasks:
+        try:
+            results.append((generator.write_page(template, game, game_id, filename, filepath, context), None))
+        except Exception as e:
+            results.append((None, str(e)))
+    return results
+
 
 if __name__ == '__main__':
-    import sys
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='游戏页面生成脚本')
+    parser.add_argument('mode', nargs='?', default='analyze', choices=['analyze', 'generate', 'build', 'watch'])
+    parser.add_argument('--force', action='store_true', help='忽略构建清单，重新生成全部页面')
+    parser.add_argument('--jobs', type=int, default=1, help='并行渲染的进程数 (默认1，即串行)')
+    parser.add_argument('--query', action='append', help='数据源查询名称，可重复指定 (默认traffic)')
+    parser.add_argument('--feed-base', help='数据源地址 (可指向本地桩服务器)')
+    parser.add_argument('--concurrency', type=int, help='抓取数据时同时在途的请求数')
+    parser.add_argument('--max-pages', type=int, help='每个查询最多抓取的页数')
+    parser.add_argument('--ttl', type=int, help='数据源缓存的有效期（秒），0表示总是发送条件请求')
+    parser.add_argument('--offline', action='store_true', help='只使用缓存的数据源响应，不访问网络')
+    parser.add_argument('--no-cache', action='store_true', help='禁用数据源响应缓存')
+    parser.add_argument('--jsonl', action='store_true', help='使用JSON Lines格式的游戏目录 (games_data.jsonl)')
+    parser.add_argument('--stream', action='store_true', help='流式读取游戏目录并分批渲染（只省去完整记录的内存，内存仍随游戏数线性增长；需多扫描一遍目录，通常更慢）')
+    parser.add_argument('--batch-size', type=int, help='流式生成时每批渲染的记录数')
+    parser.add_argument('--inline-styles', action='store_true', help='保留页面内联样式，不提取共享样式表')
+    parser.add_argument('--facade', action='store_true', help='点击播放模式：先显示缩略图，点击后才加载游戏')
+    parser.add_argument('--thumbs', action='store_true', help='下载缩略图到本地并生成srcset尺寸变体')
+    parser.add_argument('--related', type=int, help='每个页面显示的相关游戏数量，0表示不生成 (默认6)')
+    parser.add_argument('--dedup', action='store_true', help='生成前检测并移除近似重复的游戏')
+    parser.add_argument('--dedup-threshold', type=float, help='近似重复的描述相似度阈值 (默认0.7)')
+    parser.add_argument('--dedup-flag-only', action='store_true', help='只生成去重报告，不移除重复游戏')
+    parser.add_argument('--base-url', help='站点根地址，用于页面和OG图片的绝对地址')
+    parser.add_argument('--compress', action='store_true', help='生成后输出压缩及预压缩(.gz/.br)的发布目录')
+    parser.add_argument('--dist', help='发布目录 (默认dist)')
+    parser.add_argument('--bundle', nargs='?', const='', metavar='PATH',
+                        help='生成后输出相对上次部署的增量部署包 (默认 .build/bundles/<模式>-<时间>.tar.gz)')
+    parser.add_argument('--bundle-full', action='store_true', help='部署包包含全部文件')
+    parser.add_argument('--host', default='127.0.0.1', help='监视模式预览服务器的地址')
+    parser.add_argument('--port', type=int, default=8000, help='监视模式预览服务器的端口')
+    parser.add_argument('--interval', type=float, default=0.2, help='监视模式检查文件变化的间隔（秒）')
+    build_metrics.add_arguments(parser)
+    args = parser.parse_args()
     
     generator = GamePageGenerator()
+    if args.feed_base:
+        generator.feed_base = args.feed_base
+    if args.concurrency:
+        generator.feed_concurrency = args.concurrency
+    if args.max_pages:
+        generator.feed_max_pages = args.max_pages
+    if args.ttl is not None:
+        generator.feed_ttl = args.ttl
+    generator.offline = args.offline
+    generator.use_http_cache = not args.no_cache
+    if args.jsonl:
+        generator.catalog_file = 'games_data.jsonl'
+    if args.batch_size:
+        generator.batch_size = args.batch_size
+    generator.extract_styles = not args.inline_styles
+    generator.facade = args.facade
+    generator.mirror_thumbs = args.thumbs
+    if args.related is not None:
+        generator.related_count = args.related
+    generator.dedup = args.dedup or args.dedup_flag_only
+    generator.dedup_flag_only = args.dedup_flag_only
+    if args.dedup_threshold is not None:
+        generator.dedup_threshold = args.dedup_threshold
+    if args.base_url:
+        generator.base_url = args.base_url.rstrip('/') + '/'
+    if args.dist:
+        generator.dist_dir = args.dist
+    
+    # 构建或生成失败时不再压缩和打包，并以非零状态退出
+    ok = True
+    with build_metrics.session_from_args(f'generate_game_pages-{args.mode}', args):
+        if args.mode == 'generate':
+            if generator.dedup:
+                generator.run_dedup()
+            with stage('generate'):
+                ok = bool(generator.run_generation(force=args.force, jobs=args.jobs, stream=args.stream))
+        elif args.mode == 'build':
+            ok = generator.run_build(args.query, force=args.force, jobs=args.jobs, stream=args.stream)
+        elif args.mode == 'watch':
+            generator.run_watch(args.host, args.port, args.interval, jobs=args.jobs, stream=args.stream)
+        else:
+            generator.run_analysis(args.query)
+        
+        if ok and args.compress and args.mode in ('generate', 'build'):
+            print(f"\n生成压缩发布目录: {generator.dist_dir}")
+            with stage('compress'):
+                results, removed = compress_site('.', generator.dist_dir, generator.build_dir, jobs=args.jobs)
+            print_report(results, removed, quiet=True)
+        
+        if ok and args.bundle is not None and args.mode in ('generate', 'build'):
+            # 有压缩发布目录时打包发布目录（含预压缩文件），否则打包站点根目录
+            root, dist = (generator.dist_dir, True) if args.compress else ('.', False)
+            print(f"\n生成部署包: {root}")
+            with stage('bundle'):
+                stats = bundle_site.bundle_site(root, args.bundle or None, full=args.bundle_full, dist=dist)
+            bundle_site.print_report(stats)
     
-    if len(sys.argv) > 1 and sys.argv[1] == 'generate':
-        generator.run_generation()
-    else:
-        generator.run_analysis()
+    if not ok:
+        sys.exit(1)
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+游戏页面批量转换管道
+
+每个页面只读取、解码一次，在内存中依次应用所有注册的转换，
+只有字节内容真正变化时才写回；支持dry-run差异预览和多进程并行。
+
+用法:
+    python page_transforms.py [转换名 ...] [--dry-run] [--jobs N]
+"""
+
+import difflib
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from build_metrics import add_arguments, count, merge, session_from_args, stage, take
+
+# 依次尝试的文件编码
+ENCODINGS = ['utf-8', 'utf-8-sig', 'latin-1', 'cp1252']
+
+# 不属于单个游戏页面的文件
+EXCLUDED_PAGES = ('index.html', 'play.html', 'game_template.html', 'listing_template.html')
+
+# 已注册的转换: 名称 -> (函数, 排除的文件名)
+TRANSFORMS = {}
+
+# 提供转换的脚本模块，命令行模式下按需导入以完成注册
+TRANSFORM_MODULES = ('update_iframe_styles', 'fix_iframe_centering')
+
+
+class TransformError(Exception):
+    """转换无法应用到某个页面（页面保持不变并记为失败）"""
+
+
+def register_transform(name, exclude=EXCLUDED_PAGES):
+    """注册页面转换的装饰器，转换函数接收并返回页面文本"""
+    def decorator(func):
+        TRANSFORMS[name] = (func, tuple(exclude))
+        return func
+    return decorator
+
+
+def decode_page(data):
+    """按ENCODINGS依次尝试解码，返回 (文本, 编码)；全部失败时返回 (None, None)"""
+    for attempt, encoding in enumerate(ENCODINGS):
+        try:
+            text = data.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+        if attempt:
+            count('encoding.fallbacks')
+            count('encoding.retries', attempt)
+        return text, encoding
+    count('encoding.failed')
+    return None, None
+
+
+class PageTransformPipeline:
+    """按注册顺序对页面应用一组转换"""
+
+    def __init__(self, names=None):
+        if names is None:
+            names = list(TRANSFORMS)
+        unknown = [name for name in names if name not in TRANSFORMS]
+        if unknown:
+            raise KeyError(f"未注册的转换: {', '.join(unknown)}")
+        # 直接保存函数本身，工作进程按模块路径导入，无需重新注册
+        self.transforms = [(name,) + TRANSFORMS[name] for name in names]
+
+    def transforms_for(self, filename):
+        return [(name, func) for name, func, exclude in self.transforms if filename not in exclude]
+
+    def collect_files(self, games_dir='games'):
+        return [path for path in sorted(Path(games_dir).glob('*.html'))
+                if self.transforms_for(path.name)]
+
+    def process_file(self, path, dry_run=False):
+        """处理单个页面，返回结果字典"""
+        path = Path(path)
+        result = {'file': str(path), 'changed': False, 'applied': [], 'errors': [], 'diff': None}
+        count('pages.processed')
+        try:
+            with stage('read'):
+                original = path.read_bytes()
+            count('bytes.in', len(original))
+            with stage('decode'):
+                content, encoding = decode_page(original)
+            if content is None:
+                result['errors'].append("无法读取文件")
+                return result
+
+            text = content
+            for name, func in self.transforms_for(path.name):
+                try:
+                    with stage(f'transform.{name}'):
+                        new_text = func(text)
+                except TransformError as e:
+                    result['errors'].append(f"{name}: {e}")
+                    continue
+                if new_text != text:
+                    result['applied'].append(name)
+                    count(f'transform.{name}.applied')
+                    text = new_text
+
+            if not result['applied']:
+                return result
+            # 按读取时的编码写回，新文本中该编码无法表示的字符写为字符引用
+            data = text.encode(encoding, errors='xmlcharrefreplace')
+            if data == original:
+                return result
+            result['changed'] = True
+            if dry_run:
+                result['diff'] = ''.join(difflib.unified_diff(
+                    content.splitlines(True), text.splitlines(True),
+                    fromfile=str(path), tofile=f'{path} (transformed)'))
+            else:
+                with stage('write'):
+                    path.write_bytes(data)
+                count('bytes.out', len(data))
+        except Exception as e:
+            result['errors'].append(str(e))
+        finally:
+            if result['changed']:
+                count('pages.changed')
+            if result['errors']:
+                count('pages.failed')
+        return result
+
+    def process_batch(self, paths, dry_run=False):
+        """在工作进程中处理一组页面，连同本进程的指标增量一起返回"""
+        return [self.process_file(path, dry_run) for path in paths], take()
+
+    def run(self, games_dir='games', dry_run=False, jobs=1):
+        """对目录中的全部页面执行管道，按文件名顺序返回结果"""
+        files = self.collect_files(games_dir)
+        if jobs <= 1 or len(files) <= 1:
+            return [self.process_file(path, dry_run) for path in files]
+        chunk_size = max(1, len(files) // (jobs * 4))
+        batches = [files[i:i + chunk_size] for i in range(0, len(files), chunk_size)]
+        results = []
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            for batch_results, delta in pool.map(self.process_batch, batches, [dry_run] * len(batches)):
+                results.extend(batch_results)
+                merge(delta)
+        return results
+
+
+def load_transform_modules():
+    """导入提供转换的脚本，使其中的转换完成注册"""
+    import importlib
+    for module in TRANSFORM_MODULES:
+        importlib.import_module(module)
+
+
+def main():
+    import argparse
+
+    load_transform_modules()
+    parser = argparse.ArgumentParser(description='游戏页面批量转换管道')
+    parser.add_argument('transforms', nargs='*', help=f"要应用的转换 (默认全部: {', '.join(TRANSFORMS)})")
+    parser.add_argument('--games-dir', default='games')
+    parser.add_argument('--dry-run', action='store_true', help='只显示差异，不写入文件')
+    parser.add_argument('--jobs', type=int, default=1, help='并行处理的进程数')
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    with session_from_args('page_transforms', args):
+        return _run(args)
+
+
+def _run(args):
+    pipeline = PageTransformPipeline(args.transforms or None)
+    with stage('transform'):
+        results = pipeline.run(args.games_dir, dry_run=args.dry_run, jobs=args.jobs)
+
+    changed = [r for r in results if r['changed']]
+    failed = [r for r in results if r['errors']]
+    for result in changed:
+        if args.dry_run:
+            print(result['diff'])
+        else:
+            print(f"Updated: {result['file']} ({', '.join(result['applied'])})")
+    for result in failed:
+        for error in result['errors']:
+            print(f"Error: {result['file']} - {error}")
+
+    action = '将更新' if args.dry_run else '已更新'
+    print(f"\n共处理 {len(results)} 个文件, {action} {len(changed)} 个, 失败 {len(failed)} 个")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    # 转换脚本注册到的是按模块名导入的page_transforms，而不是__main__
+    from page_transforms import main
+    raise SystemExit(main())
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+相关游戏推荐
+
+每个游戏的特征为其标签和分类，按TF-IDF加权并归一化，两个游戏的相似度为特征向量的点积。
+计算时通过倒排索引只对至少共享一个特征的游戏累加分数；热门特征的倒排列表只保留
+权重最高的posting_limit个游戏，每个游戏的计算量因此有上限，不会随目录规模变成O(n²)。
+
+结果缓存在 .build/related.json 中，下次构建只重新计算特征发生变化的游戏、
+结果中含有变化游戏的游戏，以及与变化游戏共享非热门特征的游戏。
+
+用法:
+    python related_games.py [--catalog games_data.json] [--top 6]
+"""
+
+import heapq
+import json
+import math
+import os
+from collections import Counter
+
+
+def game_features(tags, category):
+    """游戏的特征词：小写去重的标签和分类（按字母排序，便于比较是否变化）"""
+    features = {f"tag:{tag.strip().lower()}" for tag in (tags or '').split(',') if tag.strip()}
+    if category:
+        features.add(f"cat:{category.strip().lower()}")
+    return sorted(features)
+
+
+def compute_related(features, targets=None, k=6, posting_limit=100):
+    """计算targets（默认全部）中每个游戏的前k个相关游戏
+
+    features为 {游戏id: 特征列表}，返回 {游戏id: [相关游戏id, ...]}，按相似度降序，
+    分数相同时按目录顺序。
+    """
+    ids = list(features)
+    total = len(ids)
+    df = Counter(term for terms in features.values() for term in terms)
+
+    # 只在一个游戏中出现（不能产生候选）或出现在所有游戏中（idf为0）的特征不建索引
+    idf = {term: math.log(total / count) for term, count in df.items() if count < total}
+    vectors = []
+    postings = {}
+    for i, game_id in enumerate(ids):
+        weights = [(term, idf[term]) for term in features[game_id] if term in idf]
+        norm = math.sqrt(sum(w * w for _, w in weights)) or 1.0
+        vector = [(term, w / norm) for term, w in weights]
+        vectors.append(vector)
+        for term, w in vector:
+            if df[term] > 1:
+                postings.setdefault(term, []).append((w, i))
+    # 热门特征只保留权重最高（特征少、更专一）的游戏，权重相同按目录顺序
+    for entries in postings.values():
+        if len(entries) > posting_limit:
+            entries.sort(key=lambda entry: (-entry[0], entry[1]))
+            del entries[posting_limit:]
+
+    index = {game_id: i for i, game_id in enumerate(ids)}
+    related = {}
+    for game_id in (ids if targets is None else targets):
+        i = index[game_id]
+        scores = {}
+        get = scores.get
+        for term, w in vectors[i]:
+            for other_w, other in postings.get(term, ()):
+                scores[other] = get(other, 0.0) + w * other_w
+        scores.pop(i, None)
+        top = heapq.nsmallest(k, scores.items(), key=lambda item: (-item[1], item[0]))
+        related[game_id] = [ids[j] for j, _ in top]
+    return related
+
+
+class RelatedGames:
+    """带缓存的相关游戏计算
+
+    缓存保存每个游戏的特征和计算结果。增量结果是近似的：IDF随目录变化的漂移和
+    热门特征截断名单的变化不会传播到其余游戏。目录规模变化超过10%或force=True时全部重新计算。
+    """
+
+    VERSION = 1
+
+    def __init__(self, path, k=6, posting_limit=100):
+        self.path = path
+        self.k = k
+        self.posting_limit = posting_limit
+        self.features = {}
+        self.related = {}
+        self.recomputed = 0
+        # 上次update是否改变了特征或结果（没变时不需要重写缓存）
+        self.changed = False
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == self.VERSION and data.get('k') == k and data.get('posting_limit') == posting_limit:
+                self.features = data.get('features', {})
+                self.related = data.get('related', {})
+        except (OSError, ValueError):
+            pass
+
+    def affected(self, features):
+        """需要重新计算的游戏；需要全部重算时返回None"""
+        cached = len(self.features)
+        if not cached or abs(len(features) - cached) > 0.1 * cached:
+            return None
+        changed = [game_id for game_id in features.keys() | self.features.keys()
+                   if features.get(game_id) != self.features.get(game_id)]
+        if not changed:
+            return set()
+
+        df = Counter(term for terms in features.values() for term in terms)
+        terms = set()
+        for game_id in changed:
+            terms.update(features.get(game_id, ()))
+            terms.update(self.features.get(game_id, ()))
+        terms = {term for term in terms if df.get(term, 0) <= self.posting_limit}
+        changed_set = set(changed)
+        targets = {game_id for game_id in changed if game_id in features}
+        for game_id, game_terms in features.items():
+            if not terms.isdisjoint(game_terms) or not changed_set.isdisjoint(self.related.get(game_id, ())):
+                targets.add(game_id)
+        return None if len(targets) > len(features) // 2 else targets
+
+    def update(self, features, force=False):
+        """根据当前目录的特征更新结果，返回 {游戏id: [相关游戏id, ...]}"""
+        previous = self.related
+        targets = None if force else self.affected(features)
+        if targets is None:
+            self.related = compute_related(features, k=self.k, posting_limit=self.posting_limit)
+            self.recomputed = len(features)
+        else:
+            self.related = {game_id: self.related[game_id] for game_id in features if game_id in self.related}
+            if targets:
+                self.related.update(compute_related(features, targets, k=self.k, posting_limit=self.posting_limit))
+            self.recomputed = len(targets)
+        self.changed = features != self.features or self.related != previous
+        self.features = dict(features)
+        return self.related
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': self.VERSION, 'k': self.k, 'posting_limit': self.posting_limit,
+                       'features': self.features, 'related': self.related},
+                      f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='计算并显示相关游戏')
+    parser.add_argument('--catalog', default='games_data.json')
+    parser.add_argument('--top', type=int, default=6)
+    parser.add_argument('--limit', type=int, default=5, help='显示前几个游戏的结果')
+    args = parser.parse_args()
+
+    with open(args.catalog, 'r', encoding='utf-8') as f:
+        games = json.load(f)
+    titles = {str(game['id']): game['title'] for game in games}
+    features = {str(game['id']): game_features(game.get('tags'), game.get('category')) for game in games}
+    related = compute_related(features, k=args.top)
+    for game_id in list(related)[:args.limit]:
+        print(f"{titles[game_id]}:")
+        for other in related[game_id]:
+            print(f"    {titles[other]}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+静态搜索索引
+
+在构建时对标题分词、tags和category建立倒排索引，按词项前缀分片写成带内容哈希的
+小JSON文件；浏览器搜索框只需下载查询词所在的一两个分片。文档信息（标题、链接、缩略图）
+按id分块存放，只在展示结果时按需下载。
+
+索引目录结构:
+    manifest.json               入口文件（不带哈希，短缓存）
+    t-<前缀>.<哈希>.json         词项分片: {词项: [[文档号, 分数], ...]}
+    d-<块号>.<哈希>.json         文档块: [[标题, 链接, 缩略图], ...]
+
+用法:
+    python search_index.py "traffic racer" [--index-dir games/search]
+"""
+
+import hashlib
+import html
+import json
+import math
+import os
+import re
+
+TOKEN_RE = re.compile(r'[0-9a-z]+')
+
+# 各字段命中时的权重
+FIELD_WEIGHTS = {'title': 3.0, 'tag': 2.0, 'category': 1.0}
+
+MANIFEST_NAME = 'manifest.json'
+
+
+def tokenize(text):
+    """小写并切分为字母数字词项"""
+    return TOKEN_RE.findall(html.unescape(text or '').lower())
+
+
+def _hashed_name(prefix, data):
+    return f'{prefix}.{hashlib.sha256(data).hexdigest()[:10]}.json'
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def build_search_index(catalog, filenames, out_dir, prefix_len=2, doc_block_size=500):
+    """从GameCatalog构建分片搜索索引，耗时与目录大小成线性关系
+
+    filenames为游戏id到页面文件名的映射；没有页面的游戏不进入索引。
+    分片和文档块文件名带内容哈希，未变化的文件不会重写，过期文件会被删除。
+    返回统计信息字典。
+    """
+    docs = []
+    postings = {}
+    for record in catalog:
+        filename = filenames.get(record.id)
+        if not filename:
+            continue
+        doc = len(docs)
+        docs.append([html.unescape(record.title or ''), f'{filename}.html', record.thumb])
+
+        weights = {}
+        for token in tokenize(record.title):
+            weights[token] = weights.get(token, 0.0) + FIELD_WEIGHTS['title']
+        for tag in record.tag_list if record.tag_ids is not None else ():
+            for token in tokenize(tag):
+                weights[token] = weights.get(token, 0.0) + FIELD_WEIGHTS['tag']
+        for token in tokenize(record.category):
+            weights[token] = weights.get(token, 0.0) + FIELD_WEIGHTS['category']
+        for token, weight in weights.items():
+            postings.setdefault(token, []).append((doc, weight))
+
+    # 分数 = 字段权重 × idf，按前缀分片
+    total = max(1, len(docs))
+    shards = {}
+    for token, entries in postings.items():
+        idf = math.log(1 + total / len(entries))
+        shards.setdefault(token[:prefix_len], {})[token] = [
+            [doc, round(weight * idf, 3)] for doc, weight in entries
+        ]
+
+    os.makedirs(out_dir, exist_ok=True)
+    outputs = {}
+    written = 0
+
+    def emit(name_prefix, value):
+        nonlocal written
+        data = _dumps(value)
+        name = _hashed_name(name_prefix, data)
+        path = os.path.join(out_dir, name)
+        if not os.path.exists(path):
+            with open(path, 'wb') as f:
+                f.write(data)
+            written += 1
+        outputs[name] = len(data)
+        return name
+
+    shard_files = {prefix: emit(f't-{prefix}', dict(sorted(terms.items())))
+                   for prefix, terms in sorted(shards.items())}
+    doc_files = [emit(f'd-{i // doc_block_size}', docs[i:i + doc_block_size])
+                 for i in range(0, len(docs), doc_block_size)]
+
+    manifest = {
+        'version': 1,
+        'prefix_len': prefix_len,
+        'doc_block_size': doc_block_size,
+        'doc_count': len(docs),
+        'shards': shard_files,
+        'docs': doc_files,
+    }
+    manifest_data = json.dumps(manifest, ensure_ascii=False, indent=1).encode('utf-8')
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    try:
+        with open(manifest_path, 'rb') as f:
+            manifest_changed = f.read() != manifest_data
+    except OSError:
+        manifest_changed = True
+    if manifest_changed:
+        with open(manifest_path, 'wb') as f:
+            f.write(manifest_data)
+
+    removed = 0
+    for name in os.listdir(out_dir):
+        if name != MANIFEST_NAME and name.endswith('.json') and name not in outputs:
+            os.remove(os.path.join(out_dir, name))
+            removed += 1
+
+    shard_sizes = [outputs[name] for name in shard_files.values()]
+    return {
+        'docs': len(docs),
+        'terms': len(postings),
+        'shards': len(shard_files),
+        'max_shard_bytes': max(shard_sizes, default=0),
+        'avg_shard_bytes': sum(shard_sizes) // max(1, len(shard_sizes)),
+        'total_bytes': sum(outputs.values()),
+        'written': written,
+        'removed': removed,
+    }
+
+
+class SearchIndex:
+    """读取 build_search_index 生成的索引文件并执行查询（与浏览器端逻辑一致）"""
+
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        with open(os.path.join(index_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        self._shards = {}
+        self._doc_blocks = {}
+        self.bytes_loaded = 0
+
+    def _load(self, name):
+        path = os.path.join(self.index_dir, name)
+        with open(path, 'rb') as f:
+            data = f.read()
+        self.bytes_loaded += len(data)
+        return json.loads(data)
+
+    def shard(self, prefix):
+        if prefix not in self._shards:
+            name = self.manifest['shards'].get(prefix)
+            self._shards[prefix] = self._load(name) if name else {}
+        return self._shards[prefix]
+
+    def doc(self, doc_id):
+        block = doc_id // self.manifest['doc_block_size']
+        if block not in self._doc_blocks:
+            self._doc_blocks[block] = self._load(self.manifest['docs'][block])
+        return self._doc_blocks[block][doc_id % self.manifest['doc_block_size']]
+
+    def search(self, query, limit=10):
+        """返回按分数排序的 [(分数, 标题, 链接, 缩略图)]
+
+        每个查询词都必须命中；最后一个词（长度不小于分片前缀时）按前缀匹配，支持边输入边搜索。
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        prefix_len = self.manifest['prefix_len']
+        scores = None
+        for i, token in enumerate(tokens):
+            shard = self.shard(token[:prefix_len])
+            if i == len(tokens) - 1 and len(token) >= prefix_len:
+                terms = [t for t in shard if t.startswith(token)]
+            else:
+                terms = [token] if token in shard else []
+            token_scores = {}
+            for term in terms:
+                for doc, score in shard[term]:
+                    token_scores[doc] = max(token_scores.get(doc, 0.0), score)
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {doc: scores[doc] + s for doc, s in token_scores.items() if doc in scores}
+            if not scores:
+                return []
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        return [(score,) + tuple(self.doc(doc)) for doc, score in ranked]
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='查询静态搜索索引')
+    parser.add_argument('query')
+    parser.add_argument('--index-dir', default=os.path.join('games', 'search'))
+    parser.add_argument('--limit', type=int, default=10)
+    args = parser.parse_args()
+
+    index = SearchIndex(args.index_dir)
+    results = index.search(args.query, args.limit)
+    for score, title, href, _ in results:
+        print(f"{score:8.3f}  {title}  ({href})")
+    print(f"\n共 {len(results)} 个结果, 读取索引 {index.bytes_loaded} 字节")
+
+
+if __name__ == '__main__':
+    main()
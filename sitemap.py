@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+sitemap.xml 与新游戏 Atom 订阅源
+
+- 每个地址的 lastmod 由生成器给出（游戏页面取内容哈希最近一次变化的时间）；
+- 地址数不超过单个文件上限（50000）时只写一个 sitemap.xml，超过后拆分为
+  sitemaps/sitemap-N.xml 分片，sitemap.xml 变为分片索引；
+- 地址所在的分片记录在 .build/sitemap.json 中，新地址填入第一个有空位的分片，
+  已有地址不会移动，因此一个页面变化只会改写它所在的分片（以及索引）；
+- 根目录静态页面和列表页的 lastmod 由 PageLastmod 按内容哈希记录（.build/lastmod.json）；
+- feed.xml 为最近加入的游戏的 Atom 订阅源。
+
+所有文件只在内容变化时才重写。
+"""
+
+import hashlib
+import json
+import os
+from xml.sax.saxutils import escape
+
+SITEMAP_NS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+
+# 单个sitemap文件的地址数上限（协议规定）
+MAX_URLS = 50000
+
+SHARD_DIR = 'sitemaps'
+
+
+def _write_if_changed(path, data):
+    from generate_game_pages import write_if_changed
+    return write_if_changed(path, data)
+
+
+def _attr(value):
+    return escape(value, {'"': '&quot;'})
+
+
+def render_urlset(urls):
+    """urls为 [(地址, lastmod)]"""
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>', f'<urlset xmlns="{SITEMAP_NS}">']
+    for loc, lastmod in urls:
+        lines.append(f'  <url><loc>{escape(loc)}</loc><lastmod>{lastmod}</lastmod></url>')
+    lines.append('</urlset>')
+    return '\n'.join(lines) + '\n'
+
+
+def render_sitemap_index(shards):
+    """shards为 [(分片地址, lastmod)]"""
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>', f'<sitemapindex xmlns="{SITEMAP_NS}">']
+    for loc, lastmod in shards:
+        lines.append(f'  <sitemap><loc>{escape(loc)}</loc><lastmod>{lastmod}</lastmod></sitemap>')
+    lines.append('</sitemapindex>')
+    return '\n'.join(lines) + '\n'
+
+
+class ShardAssignment:
+    """地址 → 分片序号 的持久化分配"""
+
+    VERSION = 1
+
+    def __init__(self, path, limit=MAX_URLS):
+        self.path = path
+        self.limit = limit
+        self.shards = {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == self.VERSION and data.get('limit') == limit:
+                self.shards = data.get('shards', {})
+        except (OSError, ValueError):
+            pass
+
+    def assign(self, locs):
+        """为当前的全部地址分配分片（已移除的地址释放位置），返回 {分片序号: [地址, ...]}"""
+        locs = list(dict.fromkeys(locs))
+        live = set(locs)
+        self.shards = {loc: shard for loc, shard in self.shards.items() if loc in live}
+        sizes = {}
+        for shard in self.shards.values():
+            sizes[shard] = sizes.get(shard, 0) + 1
+        shard = 0
+        for loc in locs:
+            if loc in self.shards:
+                continue
+            while sizes.get(shard, 0) >= self.limit:
+                shard += 1
+            self.shards[loc] = shard
+            sizes[shard] = sizes.get(shard, 0) + 1
+        groups = {}
+        for loc in locs:
+            groups.setdefault(self.shards[loc], []).append(loc)
+        return groups
+
+    def save(self):
+        """分配没有变化时不重写"""
+        _write_if_changed(self.path, json.dumps({'version': self.VERSION, 'limit': self.limit, 'shards': self.shards},
+                                                ensure_ascii=False, separators=(',', ':')))
+
+
+class PageLastmod:
+    """不在构建清单中的页面（根目录静态页面、列表页）的 lastmod
+
+    记录每个文件的 (大小, mtime, 内容哈希, lastmod)：大小和mtime没变时不读文件，
+    哈希没变时沿用原来的lastmod。文件的mtime在检出或部署后会被重置，不能直接使用。
+    """
+
+    VERSION = 1
+
+    def __init__(self, path):
+        self.path = path
+        self.pages = {}
+        self.seen = {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == self.VERSION:
+                self.pages = data.get('pages', {})
+        except (OSError, ValueError):
+            pass
+
+    def lastmod(self, path, now):
+        """文件内容最近一次变化的时间；第一次见到的文件记为now"""
+        key = path.replace(os.sep, '/')
+        st = os.stat(path)
+        known = self.pages.get(key)
+        if known and known['size'] == st.st_size and known['mtime_ns'] == st.st_mtime_ns:
+            entry = known
+        else:
+            with open(path, 'rb') as f:
+                digest = hashlib.sha256(f.read()).hexdigest()
+            lastmod = known['lastmod'] if known and known['hash'] == digest else now
+            entry = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'hash': digest, 'lastmod': lastmod}
+        self.seen[key] = entry
+        return entry['lastmod']
+
+    def save(self):
+        """只保留本次查询过的页面"""
+        _write_if_changed(self.path, json.dumps({'version': self.VERSION, 'pages': self.seen},
+                                                sort_keys=True, separators=(',', ':')))
+
+
+def write_sitemaps(urls, base_url, root='.', state_file=os.path.join('.build', 'sitemap.json'), limit=MAX_URLS):
+    """写出sitemap.xml（以及需要时的分片），urls为 [(地址, lastmod)]
+
+    返回 {'urls', 'shards', 'written', 'unchanged', 'removed'}。
+    """
+    lastmods = dict(urls)
+    assignment = ShardAssignment(state_file, limit)
+    groups = assignment.assign(loc for loc, _ in urls)
+    assignment.save()
+
+    written = unchanged = 0
+    outputs = set()
+    index_path = os.path.join(root, 'sitemap.xml')
+    if len(groups) <= 1:
+        content = render_urlset([(loc, lastmods[loc]) for loc in sorted(lastmods)])
+        documents = [(index_path, content)]
+    else:
+        documents = []
+        shards = []
+        for shard in sorted(groups):
+            locs = sorted(groups[shard])
+            name = f'{SHARD_DIR}/sitemap-{shard + 1}.xml'
+            documents.append((os.path.join(root, *name.split('/')),
+                              render_urlset([(loc, lastmods[loc]) for loc in locs])))
+            shards.append((f'{base_url}{name}', max(lastmods[loc] for loc in locs)))
+        documents.append((index_path, render_sitemap_index(shards)))
+
+    for path, content in documents:
+        outputs.add(os.path.normpath(path))
+        if _write_if_changed(path, content):
+            written += 1
+        else:
+            unchanged += 1
+
+    # 删除不再需要的分片
+    removed = 0
+    shard_dir = os.path.join(root, SHARD_DIR)
+    if os.path.isdir(shard_dir):
+        for name in os.listdir(shard_dir):
+            path = os.path.normpath(os.path.join(shard_dir, name))
+            if name.endswith('.xml') and path not in outputs:
+                os.remove(path)
+                removed += 1
+        if not os.listdir(shard_dir):
+            os.rmdir(shard_dir)
+    return {'urls': len(lastmods), 'shards': len(groups), 'written': written,
+            'unchanged': unchanged, 'removed': removed}
+
+
+def render_atom_feed(entries, feed_url, site_url, title):
+    """entries为按加入时间倒序的字典列表: title, url, added, updated, summary, category"""
+    updated = max((entry['updated'] for entry in entries), default='1970-01-01T00:00:00Z')
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<feed xmlns="http://www.w3.org/2005/Atom">',
+        f'  <title>{escape(title)}</title>',
+        f'  <id>{escape(feed_url)}</id>',
+        f'  <link rel="self" href="{_attr(feed_url)}"/>',
+        f'  <link href="{_attr(site_url)}"/>',
+        f'  <updated>{updated}</updated>',
+    ]
+    for entry in entries:
+        lines += [
+            '  <entry>',
+            f'    <title>{escape(entry["title"])}</title>',
+            f'    <id>{escape(entry["url"])}</id>',
+            f'    <link href="{_attr(entry["url"])}"/>',
+            f'    <published>{entry["added"]}</published>',
+            f'    <updated>{entry["updated"]}</updated>',
+        ]
+        if entry.get('category'):
+            lines.append(f'    <category term="{_attr(entry["category"])}"/>')
+        if entry.get('summary'):
+            lines.append(f'    <summary>{escape(entry["summary"])}</summary>')
+        lines.append('  </entry>')
+    lines.append('</feed>')
+    return '\n'.join(lines) + '\n'
+
+
+def write_atom_feed(path, entries, feed_url, site_url, title):
+    """写出Atom订阅源，内容未变化时不重写，返回是否写入"""
+    return _write_if_changed(path, render_atom_feed(entries, feed_url, site_url, title))
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""分析模式创建的默认游戏页面模板"""
+
+import json
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generate_game_pages import GamePageGenerator
+
+GAME = {
+    'id': '1',
+    'title': 'Traffic &amp; "Jam"',
+    'description': 'Drive <fast> &rsquo;n safe.\nNew line',
+    'instructions': 'Use arrow keys',
+    'url': 'https://html5.gamemonetize.com/abc/',
+    'category': 'Racing',
+    'tags': 'Car, Traffic',
+    'thumb': 'https://img.gamemonetize.com/abc/512x384.jpg',
+    'width': '800',
+    'height': '600',
+}
+
+
+def _render_fallback(tmp_path):
+    generator = GamePageGenerator()
+    generator.games_dir = str(tmp_path)
+    generator.template_file = str(tmp_path / 'game_template.html')
+    generator.create_game_template()
+    with open(generator.template_file, 'r', encoding='utf-8') as f:
+        template = generator.compile_template(f.read())
+    return generator.render_page(template, GAME, 'traffic-jam').decode('utf-8')
+
+
+def test_fallback_template_jsonld_is_valid_json(tmp_path):
+    page = _render_fallback(tmp_path)
+    blocks = re.findall(r'<script type="application/ld\+json">(.*?)</script>', page, re.S)
+    assert len(blocks) == 1
+    data = json.loads(blocks[0])
+    assert data['@type'] == 'Game'
+    assert data['name'] == 'Traffic & "Jam"'
+    assert data['offers']['price'] == '0'
+
+
+def test_fallback_template_has_no_doubled_braces(tmp_path):
+    page = _render_fallback(tmp_path)
+    assert '{{' not in page and '}}' not in page
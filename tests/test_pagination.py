@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""列表页分页导航"""
+
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generate_game_pages import GamePageGenerator
+
+
+def _links(markup):
+    return re.findall(r'<(?:a|span)\b[^>]*>([^<]*)</(?:a|span)>', markup)
+
+
+def test_single_page_has_no_pagination():
+    assert GamePageGenerator().render_pagination(None, 1, 1, '') == ''
+
+
+def test_small_page_count_lists_every_page():
+    assert GamePageGenerator().pagination_numbers(3, 5) == [1, 2, 3, 4, 5]
+
+
+def test_window_around_current_page():
+    assert GamePageGenerator().pagination_numbers(50, 100) == [1, None, 48, 49, 50, 51, 52, None, 100]
+    assert GamePageGenerator().pagination_numbers(1, 100) == [1, 2, 3, None, 100]
+    assert GamePageGenerator().pagination_numbers(100, 100) == [1, None, 98, 99, 100]
+    # 只空一页时显示该页而不是省略号
+    assert GamePageGenerator().pagination_numbers(5, 100) == [1, 2, 3, 4, 5, 6, 7, None, 100]
+
+
+def test_link_count_bounded_for_large_page_count():
+    generator = GamePageGenerator()
+    bound = 2 * generator.PAGINATION_WINDOW + 1 + 2 + 2 + 2  # 窗口 + 首末页 + 省略号 + 上一页/下一页
+    for page_count in (10, 1000, 100000):
+        for page in (1, 2, page_count // 2, page_count - 1, page_count):
+            markup = generator.render_pagination('racing', page, page_count, '../../')
+            links = _links(markup)
+            assert len(links) <= bound
+            assert '<span class="current">%d</span>' % page in markup
+            if page != 1:
+                assert 'href="../../category/racing/index.html"' in markup
+            assert str(page_count) in links
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+缩略图本地镜像
+
+并发下载游戏缩略图到按内容哈希寻址的本地缓存 (.build/thumbs)，再生成缩放、
+重新压缩的尺寸变体写到 games/thumbs/，页面和列表卡片通过srcset按显示尺寸选择。
+已下载过的地址不再请求，已存在的变体不再生成；缓存全部命中时不做任何图片处理。
+
+Pillow为可选依赖：未安装时只发布原图，srcset只有一项。
+
+用法:
+    python thumbnails.py [--catalog games_data.json] [--concurrency 8]
+"""
+
+import hashlib
+import io
+import json
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# 生成的缩小变体宽度（像素），不超过原图宽度；原图尺寸的版本总会发布
+VARIANT_WIDTHS = (256, 384)
+JPEG_QUALITY = 80
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp')
+
+# 变体生成规则变化时递增，使索引中的变体记录失效
+INDEX_VERSION = 1
+
+
+class ThumbnailMirror:
+    """缩略图镜像
+
+    索引 (cache_dir/index.json) 记录 地址 → 内容哈希，以及 内容哈希 → 原图尺寸和已发布的变体。
+    mirror() 只为缺少原图或变体的地址安排工作，下载和缩放在线程池中并发执行。
+    """
+
+    HEADERS = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+        'Accept': 'image/avif,image/webp,image/*,*/*;q=0.8',
+        'Referer': 'https://gamemonetize.com/'
+    }
+
+    def __init__(self, cache_dir='.build/thumbs', out_dir='games/thumbs', concurrency=8,
+                 widths=VARIANT_WIDTHS, retries=2, backoff=0.5, timeout=10):
+        self.cache_dir = cache_dir
+        self.out_dir = out_dir
+        self.concurrency = max(1, concurrency)
+        self.widths = tuple(sorted(widths))
+        self.timeout = timeout
+        self.downloaded = 0
+        self.cached = 0
+        self.failed = 0
+        self.variants_written = 0
+        self.errors = {}
+        self._lock = threading.Lock()
+        self.urls, self.images = self._load_index()
+
+        retry = Retry(total=retries, backoff_factor=backoff,
+                      status_forcelist=(429, 500, 502, 503, 504), allowed_methods=['GET'])
+        adapter = HTTPAdapter(pool_connections=self.concurrency, pool_maxsize=self.concurrency,
+                              max_retries=retry)
+        self.session = requests.Session()
+        self.session.headers.update(self.HEADERS)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.session.close()
+
+    @property
+    def index_path(self):
+        return os.path.join(self.cache_dir, 'index.json')
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}, {}
+        if data.get('version') != INDEX_VERSION or data.get('pillow') != bool(Image):
+            # 变体规则或Pillow可用性变化：保留已下载的原图，变体重新生成
+            return data.get('urls', {}), {}
+        return data.get('urls', {}), data.get('images', {})
+
+    def save(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': INDEX_VERSION, 'pillow': bool(Image),
+                       'urls': self.urls, 'images': self.images}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.index_path)
+
+    @staticmethod
+    def extension(url):
+        ext = os.path.splitext(urlsplit(url).path)[1].lower()
+        return ext if ext in IMAGE_EXTENSIONS else '.jpg'
+
+    def blob_path(self, digest, ext):
+        return os.path.join(self.cache_dir, digest[:2], digest + ext)
+
+    def _is_ready(self, url):
+        """原图已缓存且全部变体文件都在：不需要任何工作"""
+        known = self.urls.get(url)
+        image = self.images.get(known['hash']) if known else None
+        if image is None or not os.path.exists(self.blob_path(known['hash'], known['ext'])):
+            return False
+        return all(os.path.exists(os.path.join(self.out_dir, name)) for _, name in image['variants'])
+
+    def mirror(self, urls):
+        """确保一组缩略图已镜像，返回 {地址: info}；下载失败的地址不在结果中"""
+        urls = list(dict.fromkeys(url for url in urls if url))
+        pending = []
+        for url in urls:
+            if self._is_ready(url):
+                self.cached += 1
+            else:
+                pending.append(url)
+        if pending:
+            os.makedirs(self.out_dir, exist_ok=True)
+            with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                for _ in pool.map(self._mirror_one, pending):
+                    pass
+        return {url: info for url in urls for info in [self.info(url)] if info is not None}
+
+    def _mirror_one(self, url):
+        try:
+            known = self.urls.get(url)
+            if known and os.path.exists(self.blob_path(known['hash'], known['ext'])):
+                digest, ext = known['hash'], known['ext']
+                with open(self.blob_path(digest, ext), 'rb') as f:
+                    data = f.read()
+            else:
+                response = self.session.get(url, timeout=self.timeout)
+                response.raise_for_status()
+                data = response.content
+                if not data:
+                    raise ValueError("空响应")
+                digest, ext = hashlib.sha256(data).hexdigest(), self.extension(url)
+                path = self.blob_path(digest, ext)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, 'wb') as f:
+                    f.write(data)
+                with self._lock:
+                    self.downloaded += 1
+
+            image = self.images.get(digest)
+            if image is None or not all(os.path.exists(os.path.join(self.out_dir, name))
+                                        for _, name in image['variants']):
+                image = self._write_variants(digest, ext, data)
+            with self._lock:
+                self.urls[url] = {'hash': digest, 'ext': ext}
+                self.images[digest] = image
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+                self.errors[url] = str(e)
+
+    def _write_variants(self, digest, ext, data):
+        """生成 <哈希>-<宽>w 变体，返回 {'width', 'height', 'variants': [[宽, 文件名], ...]}"""
+        stem = digest[:16]
+        if Image is None:
+            name = f'{stem}{ext}'
+            shutil.copyfile(self.blob_path(digest, ext), os.path.join(self.out_dir, name))
+            with self._lock:
+                self.variants_written += 1
+            return {'width': None, 'height': None, 'variants': [[None, name]]}
+
+        with Image.open(io.BytesIO(data)) as source:
+            source.load()
+            width, height = source.size
+            rgb = source.convert('RGB')
+        variants = []
+        for target in [w for w in self.widths if w < width] + [width]:
+            name = f'{stem}-{target}w.jpg'
+            if target == width:
+                resized = rgb
+            else:
+                resized = rgb.resize((target, max(1, round(height * target / width))), Image.LANCZOS)
+            buffer = io.BytesIO()
+            resized.save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+            encoded = buffer.getvalue()
+            if target == width and ext in ('.jpg', '.jpeg') and len(data) <= len(encoded):
+                # 重新压缩反而更大时直接发布原图
+                encoded = data
+            with open(os.path.join(self.out_dir, name), 'wb') as f:
+                f.write(encoded)
+            variants.append([target, name])
+        with self._lock:
+            self.variants_written += len(variants)
+        return {'width': width, 'height': height, 'variants': variants}
+
+    def info(self, url):
+        """页面使用的图片信息，路径相对games目录：
+
+        {'src': 默认图片, 'srcset': srcset属性值或'', 'full': 原图尺寸的版本, 'width', 'height'}
+        """
+        known = self.urls.get(url)
+        image = self.images.get(known['hash']) if known else None
+        if image is None:
+            return None
+        prefix = os.path.basename(self.out_dir.rstrip('/\\'))
+        variants = [(width, f'{prefix}/{name}') for width, name in image['variants']]
+        full = variants[-1][1]
+        # 默认src选不超过384px的最大变体，适合列表卡片
+        src = next((path for width, path in reversed(variants) if width and width <= 384), full)
+        srcset = ', '.join(f'{path} {width}w' for width, path in variants) if image['width'] else ''
+        return {'src': src, 'srcset': srcset, 'full': full,
+                'width': image['width'], 'height': image['height']}
+
+    def prune(self, urls):
+        """删除不属于给定地址的已发布变体，返回删除的文件数"""
+        live = set()
+        for url in urls:
+            known = self.urls.get(url)
+            image = self.images.get(known['hash']) if known else None
+            if image:
+                live.update(name for _, name in image['variants'])
+        removed = 0
+        if os.path.isdir(self.out_dir):
+            for name in os.listdir(self.out_dir):
+                if name not in live:
+                    os.remove(os.path.join(self.out_dir, name))
+                    removed += 1
+        return removed
+
+
+def main():
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='下载游戏缩略图并生成尺寸变体')
+    parser.add_argument('--catalog', default='games_data.json')
+    parser.add_argument('--cache-dir', default=os.path.join('.build', 'thumbs'))
+    parser.add_argument('--out-dir', default=os.path.join('games', 'thumbs'))
+    parser.add_argument('--concurrency', type=int, default=8, help='同时下载的请求数')
+    args = parser.parse_args()
+
+    with open(args.catalog, 'r', encoding='utf-8') as f:
+        urls = [game.get('thumb') for game in json.load(f)]
+
+    started = time.perf_counter()
+    with ThumbnailMirror(args.cache_dir, args.out_dir, concurrency=args.concurrency) as mirror:
+        mirrored = mirror.mirror(urls)
+        mirror.save()
+    print(f"缩略图: {len(mirrored)} 个可用, 下载 {mirror.downloaded}, 缓存命中 {mirror.cached}, "
+          f"失败 {mirror.failed}, 写入变体 {mirror.variants_written}, 耗时 {time.perf_counter() - started:.3f}s")
+    for url, error in mirror.errors.items():
+        print(f"✗ {url}: {error}")
+    if Image is None:
+        print("未安装Pillow，只发布原图")
+
+
+if __name__ == '__main__':
+    main()
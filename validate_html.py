@@ -1,48 +1,131 @@
+import codecs
+import hashlib
+import json
 import os
-import re
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from html.parser import HTMLParser
 
+from build_metrics import add_arguments, count, merge, session_from_args, stage, take
+from page_transforms import ENCODINGS, EXCLUDED_PAGES
+
+# 每次喂给解析器的字节数
+CHUNK_SIZE = 64 * 1024
+
+VOID_ELEMENTS = ['area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'param', 'source', 'track', 'wbr']
+
+
 class HTMLValidator(HTMLParser):
+    """单遍流式HTML校验器
+
+    可以分块调用feed()；标签匹配、基本结构、game-iframe（或点击播放占位）以及内联<style>的CSS检查
+    都在解析回调中完成，位置信息取自getpos()，不需要保留或重新扫描整个文档。
+    """
+
     def __init__(self):
         super().__init__()
         self.errors = []
         self.warnings = []
         self.tag_stack = []
-        self.line_num = 1
+        self.has_doctype = False
+        self.seen_tags = set()
+        self.has_game_iframe = False
+        self._style_start = None
+        self._style_chunks = []
+        
+    def handle_decl(self, decl):
+        if decl.lower().split() == ['doctype', 'html']:
+            self.has_doctype = True
+        
+    def _check_start(self, tag, attrs):
+        """开始标签和自闭合标签共用的检查"""
+        self.seen_tags.add(tag)
+        attrs = dict(attrs)
+        classes = (attrs.get('class') or '').split()
+        if tag == 'iframe' and 'game-iframe' in classes:
+            self.has_game_iframe = True
+        # 点击播放模式下iframe由脚本插入，占位链接的data-src就是游戏地址
+        elif 'game-facade' in classes and attrs.get('data-src'):
+            self.has_game_iframe = True
         
     def handle_starttag(self, tag, attrs):
-        if tag not in ['area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'param', 'source', 'track', 'wbr']:
-            self.tag_stack.append((tag, self.line_num))
+        self._check_start(tag, attrs)
+        if tag == 'style':
+            self._style_start = self.getpos()
+            self._style_chunks = []
+        if tag not in VOID_ELEMENTS:
+            self.tag_stack.append((tag, self.getpos()))
             
+    def handle_startendtag(self, tag, attrs):
+        # <tag/> 自闭合写法同样检查，但不入栈
+        self._check_start(tag, attrs)
+        
     def handle_endtag(self, tag):
+        if tag == 'style' and self._style_start is not None:
+            self.check_style(''.join(self._style_chunks), self._style_start)
+            self._style_start = None
+            self._style_chunks = []
         if self.tag_stack and self.tag_stack[-1][0] == tag:
             self.tag_stack.pop()
-        elif tag not in ['area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'param', 'source', 'track', 'wbr']:
-            self.errors.append(f"Line {self.line_num}: Unexpected closing tag </{tag}>")
+        elif tag not in VOID_ELEMENTS:
+            self.errors.append(f"{self.position()}: Unexpected closing tag </{tag}>")
             
     def handle_data(self, data):
-        self.line_num += data.count('\n')
+        if self._style_start is not None:
+            self._style_chunks.append(data)
         
     def error(self, message):
-        self.errors.append(f"Line {self.line_num}: {message}")
+        self.errors.append(f"{self.position()}: {message}")
+        
+    def position(self, pos=None):
+        line, col = pos or self.getpos()
+        return f"Line {line}, Col {col + 1}"
+        
+    def check_style(self, css_content, start):
+        # <style>开始标签所在行就是CSS内容的第一行
+        errors, warnings = validate_css(css_content, first_line=start[0])
+        self.errors.extend(errors)
+        self.warnings.extend(warnings)
         
     def get_unclosed_tags(self):
-        return [(tag, line) for tag, line in self.tag_stack]
+        return [(tag, line) for tag, (line, _) in self.tag_stack]
+        
+    def finish(self):
+        """结束解析并执行文档级检查，返回 (错误, 警告)"""
+        self.close()
+        
+        # 检查未闭合的标签
+        for tag, pos in self.tag_stack:
+            self.errors.append(f"{self.position(pos)}: 未闭合的标签 <{tag}>")
+        
+        # 检查基本HTML结构
+        if not self.has_doctype:
+            self.errors.append("缺少DOCTYPE声明")
+        for tag in ('html', 'head', 'body'):
+            if tag not in self.seen_tags:
+                self.errors.append(f"缺少<{tag}>标签")
+        
+        # 检查iframe标签
+        if not self.has_game_iframe:
+            self.errors.append("缺少game-iframe类的iframe标签或game-facade点击播放占位")
+        
+        return self.errors, self.warnings
 
-def validate_css(css_content):
-    """验证CSS语法"""
+def validate_css(css_content, first_line=1):
+    """验证CSS语法，行号从first_line开始计数"""
     errors = []
     warnings = []
     
     # 检查括号匹配
     brace_count = css_content.count('{') - css_content.count('}')
     if brace_count != 0:
-        errors.append(f"CSS括号不匹配: {brace_count} 个未闭合的括号")
+        errors.append(f"Line {first_line}: CSS括号不匹配: {brace_count} 个未闭合的括号")
     
     # 检查常见CSS错误
     lines = css_content.split('\n')
-    for i, line in enumerate(lines, 1):
+    for i, line in enumerate(lines, first_line):
         line = line.strip()
         if line and not line.startswith('/*') and not line.endswith('*/'):
             # 检查属性声明
@@ -52,102 +135,234 @@ def validate_css(css_content):
     
     return errors, warnings
 
+def _validate_stream(f, encoding):
+    """以给定编码分块解码并校验，编码不匹配时抛出UnicodeDecodeError"""
+    validator = HTMLValidator()
+    decoder = codecs.getincrementaldecoder(encoding)()
+    while True:
+        chunk = f.read(CHUNK_SIZE)
+        text = decoder.decode(chunk, final=not chunk)
+        if text:
+            try:
+                validator.feed(text)
+            except Exception as e:
+                validator.errors.append(f"HTML解析错误: {str(e)}")
+                break
+        if not chunk:
+            break
+    return validator.finish()
+
 def validate_html_file(file_path):
-    """验证单个HTML文件"""
+    """验证单个HTML文件（分块流式解析，内存占用与文件大小无关）"""
     try:
         # 尝试多种编码读取文件
-        content = None
-        for encoding in ['utf-8', 'utf-8-sig', 'latin-1', 'cp1252']:
-            try:
-                with open(file_path, 'r', encoding=encoding) as f:
-                    content = f.read()
-                break
-            except UnicodeDecodeError:
-                continue
-        
-        if content is None:
-            return ["无法读取文件 - 编码错误"], [], []
-        
-        # HTML结构验证
-        validator = HTMLValidator()
-        try:
-            validator.feed(content)
-        except Exception as e:
-            validator.errors.append(f"HTML解析错误: {str(e)}")
-        
-        # 检查未闭合的标签
-        unclosed_tags = validator.get_unclosed_tags()
-        for tag, line in unclosed_tags:
-            validator.errors.append(f"Line {line}: 未闭合的标签 <{tag}>")
-        
-        # CSS验证
-        css_errors = []
-        css_warnings = []
-        
-        # 提取<style>标签中的CSS
-        style_pattern = r'<style[^>]*>(.*?)</style>'
-        style_matches = re.findall(style_pattern, content, re.DOTALL | re.IGNORECASE)
-        
-        for css_content in style_matches:
-            errors, warnings = validate_css(css_content)
-            css_errors.extend(errors)
-            css_warnings.extend(warnings)
+        with open(file_path, 'rb') as f:
+            count('bytes.in', os.fstat(f.fileno()).st_size)
+            for attempt, encoding in enumerate(ENCODINGS):
+                try:
+                    errors, warnings = _validate_stream(f, encoding)
+                    break
+                except UnicodeDecodeError:
+                    f.seek(0)
+                    continue
+            else:
+                count('encoding.failed')
+                return ["无法读取文件 - 编码错误"], [], []
+            if attempt:
+                # 每次回退都要从头重新解析整个文件
+                count('encoding.fallbacks')
+                count('encoding.retries', attempt)
         
-        # 检查基本HTML结构
-        structure_errors = []
-        if '<!DOCTYPE html>' not in content and '<!doctype html>' not in content.lower():
-            structure_errors.append("缺少DOCTYPE声明")
-        
-        if '<html' not in content.lower():
-            structure_errors.append("缺少<html>标签")
-            
-        if '<head>' not in content.lower():
-            structure_errors.append("缺少<head>标签")
-            
-        if '<body>' not in content.lower():
-            structure_errors.append("缺少<body>标签")
-        
-        # 检查iframe标签
-        iframe_pattern = r'<iframe[^>]*class=["\']game-iframe["\'][^>]*>'
-        if not re.search(iframe_pattern, content, re.IGNORECASE):
-            structure_errors.append("缺少game-iframe类的iframe标签")
-        
-        all_errors = validator.errors + css_errors + structure_errors
-        all_warnings = validator.warnings + css_warnings
-        
-        return all_errors, all_warnings, []
+        return errors, warnings, []
         
     except Exception as e:
         return [f"文件处理错误: {str(e)}"], [], []
 
-def main():
-    """主函数 - 验证所有游戏页面"""
-    games_dir = Path('games')
+# 校验规则变化时递增，使旧的缓存结果失效
+VALIDATOR_VERSION = 3
+
+
+class ValidationCache:
+    """按文件内容哈希缓存校验结果
+
+    同时记录每个路径的 (大小, mtime, 哈希)，stat未变化的文件连读取都可以跳过；
+    stat变化但内容哈希相同的文件也不会重新解析。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.files = {}
+        self.results = {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == VALIDATOR_VERSION:
+                self.files = data.get('files', {})
+                self.results = data.get('results', {})
+        except (OSError, ValueError):
+            pass
+
+    def lookup(self, file_path):
+        """返回 (内容哈希, 缓存结果或None)"""
+        stat = os.stat(file_path)
+        known = self.files.get(str(file_path))
+        if known and known['size'] == stat.st_size and known['mtime_ns'] == stat.st_mtime_ns:
+            digest = known['hash']
+        else:
+            with open(file_path, 'rb') as f:
+                digest = hashlib.sha256(f.read()).hexdigest()
+            self.files[str(file_path)] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'hash': digest}
+        return digest, self.results.get(digest)
+
+    def store(self, digest, errors, warnings):
+        self.results[digest] = {'errors': errors, 'warnings': warnings}
+
+    def save(self, live_files):
+        # 只保留仍然存在的文件对应的结果
+        self.files = {path: info for path, info in self.files.items() if path in live_files}
+        live_hashes = {info['hash'] for info in self.files.values()}
+        self.results = {digest: r for digest, r in self.results.items() if digest in live_hashes}
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({'version': VALIDATOR_VERSION, 'files': self.files, 'results': self.results},
+                      f, ensure_ascii=False)
+
+
+def _validate_job(file_path):
+    errors, warnings, _ = validate_html_file(file_path)
+    return errors, warnings
+
+
+def _validate_batch(paths):
+    """工作进程中校验一组文件，连同本进程的指标增量一起返回"""
+    return [_validate_job(path) for path in paths], take()
+
+
+def validate_files(files, jobs=1, cache=None):
+    """校验一组文件，返回 [(文件, 错误, 警告, 是否命中缓存)]，顺序与输入一致"""
+    results = {}
+    pending = []
+    with stage('cache_lookup'):
+        for file_path in files:
+            if cache is None:
+                pending.append((file_path, None))
+                continue
+            try:
+                digest, cached = cache.lookup(file_path)
+            except OSError as e:
+                results[file_path] = ([f"文件处理错误: {str(e)}"], [], False)
+                continue
+            if cached is not None:
+                results[file_path] = (cached['errors'], cached['warnings'], True)
+            else:
+                pending.append((file_path, digest))
+    count('files.cached', len(files) - len(pending))
+    count('files.validated', len(pending))
     
-    total_files = 0
-    files_with_errors = 0
-    files_with_warnings = 0
+    paths = [file_path for file_path, _ in pending]
+    with stage('parse'):
+        if jobs > 1 and len(paths) > 1:
+            chunk_size = max(1, len(paths) // (jobs * 4))
+            batches = [paths[i:i + chunk_size] for i in range(0, len(paths), chunk_size)]
+            outcomes = []
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                for batch_outcomes, delta in pool.map(_validate_batch, batches):
+                    outcomes.extend(batch_outcomes)
+                    merge(delta)
+        else:
+            outcomes = [_validate_job(path) for path in paths]
+    
+    for (file_path, digest), (errors, warnings) in zip(pending, outcomes):
+        if cache is not None and digest is not None:
+            cache.store(digest, errors, warnings)
+        results[file_path] = (errors, warnings, False)
+    return [(file_path,) + results[file_path] for file_path in files]
+
+
+def write_json_report(path, results):
+    report = {
+        'total': len(results),
+        'files_with_errors': sum(1 for _, errors, _, _ in results if errors),
+        'files_with_warnings': sum(1 for _, _, warnings, _ in results if warnings),
+        'files': [
+            {'file': str(file_path), 'errors': errors, 'warnings': warnings, 'cached': cached}
+            for file_path, errors, warnings, cached in results
+        ],
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+def write_junit_report(path, results, elapsed=0.0):
+    """写出JUnit XML报告：每个文件一个testcase，错误记为failure，警告写入system-out"""
+    failures = sum(1 for _, errors, _, _ in results if errors)
+    suite = ET.Element('testsuite', name='validate_html', tests=str(len(results)),
+                       failures=str(failures), errors='0', time=f'{elapsed:.3f}')
+    for file_path, errors, warnings, _ in results:
+        case = ET.SubElement(suite, 'testcase', classname='validate_html', name=str(file_path))
+        if errors:
+            failure = ET.SubElement(case, 'failure', message=f'{len(errors)} 个错误')
+            failure.text = '\n'.join(errors)
+        if warnings:
+            ET.SubElement(case, 'system-out').text = '\n'.join(warnings)
+    ET.ElementTree(suite).write(path, encoding='utf-8', xml_declaration=True)
+
+
+def main(argv=None):
+    """主函数 - 验证所有游戏页面，有错误时返回非零退出码"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='验证游戏页面的HTML/CSS')
+    parser.add_argument('--games-dir', default='games')
+    parser.add_argument('--jobs', type=int, default=1, help='并行验证的进程数')
+    parser.add_argument('--no-cache', action='store_true', help='不使用按内容哈希缓存的校验结果')
+    parser.add_argument('--cache-file', default=os.path.join('.build', 'validation_cache.json'))
+    parser.add_argument('--report-json', help='写出JSON格式报告的路径')
+    parser.add_argument('--junit', help='写出JUnit XML报告的路径')
+    parser.add_argument('--quiet', action='store_true', help='只输出有问题的文件和总结')
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+    
+    with session_from_args('validate_html', args):
+        return _run(args)
+
+
+def _run(args):
+    games_dir = Path(args.games_dir)
+    files = [html_file for html_file in sorted(games_dir.glob('*.html'))
+             if html_file.name not in EXCLUDED_PAGES]
     
     print("开始验证HTML文件...\n")
     
-    # 遍历所有HTML文件
-    for html_file in sorted(games_dir.glob('*.html')):
-        if html_file.name in ['index.html', 'play.html', 'game_template.html']:
+    with stage('validate'):
+        cache = None if args.no_cache else ValidationCache(args.cache_file)
+        started = time.perf_counter()
+        results = validate_files(files, jobs=args.jobs, cache=cache)
+        elapsed = time.perf_counter() - started
+        if cache is not None:
+            with stage('save_cache'):
+                cache.save({str(f) for f in files})
+    
+    total_files = len(results)
+    files_with_errors = 0
+    files_with_warnings = 0
+    
+    for html_file, errors, warnings, cached in results:
+        if errors:
+            files_with_errors += 1
+        if warnings:
+            files_with_warnings += 1
+        if args.quiet and not errors and not warnings:
             continue
-            
-        total_files += 1
-        print(f"验证文件: {html_file.name}")
         
-        errors, warnings, info = validate_html_file(html_file)
+        print(f"验证文件: {html_file.name}")
         
         if errors:
-            files_with_errors += 1
             print(f"  ❌ 发现 {len(errors)} 个错误:")
             for error in errors:
                 print(f"    - {error}")
         
         if warnings:
-            files_with_warnings += 1
             print(f"  ⚠️  发现 {len(warnings)} 个警告:")
             for warning in warnings:
                 print(f"    - {warning}")
@@ -157,6 +372,14 @@ def main():
         
         print()
     
+    count('files.errors', files_with_errors)
+    count('files.warnings', files_with_warnings)
+    with stage('report'):
+        if args.report_json:
+            write_json_report(args.report_json, results)
+        if args.junit:
+            write_junit_report(args.junit, results, elapsed)
+    
     # 总结报告
     print("=" * 50)
     print("验证总结:")
@@ -164,11 +387,15 @@ def main():
     print(f"有错误的文件: {files_with_errors}")
     print(f"有警告的文件: {files_with_warnings}")
     print(f"完全正确的文件: {total_files - files_with_errors - files_with_warnings}")
+    cached_files = sum(1 for *_, cached in results if cached)
+    print(f"缓存命中: {cached_files}, 重新验证: {total_files - cached_files}, 耗时 {elapsed:.3f}s")
     
     if files_with_errors == 0:
         print("\n🎉 所有文件都没有严重错误!")
+        return 0
     else:
         print(f"\n⚠️  需要修复 {files_with_errors} 个文件的错误")
+        return 1
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    raise SystemExit(main())
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+监视模式：输入文件变化时按依赖关系重建，并用本地HTTP服务器预览
+
+依赖图把每个输入文件映射到受影响的产物：
+
+- games/game_template.html → 全部游戏页面（模板哈希变化，清单判定全部重建）
+- games_data.json          → 目录（只重新渲染记录哈希变化的页面，列表页和搜索索引
+                              只重写内容变化的文件，也就是包含该游戏的那几页）
+- games/listing_template.html → 只重建列表页
+- style.css                → 不需要重建，服务器直接提供新文件
+
+文件变化用轮询 (mtime, 大小) 检测，不依赖第三方库；连续两次轮询都没有新变化后才开始重建，
+避免编辑器分多次写入时重复构建。
+
+用法:
+    python generate_game_pages.py watch [--port 8000] [--interval 0.2]
+"""
+
+import os
+import threading
+import time
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+# 依赖图中的产物
+PAGES = 'pages'
+CATALOG = 'catalog'
+LISTINGS = 'listings'
+
+
+class DependencyGraph:
+    """输入文件 → 受影响产物的映射；没有产物的输入（静态文件）只需要被监视"""
+
+    def __init__(self):
+        self.edges = {}
+
+    def add(self, path, *targets):
+        self.edges.setdefault(os.path.normpath(path), set()).update(targets)
+
+    @property
+    def inputs(self):
+        return list(self.edges)
+
+    def affected(self, changed):
+        """一组变化的输入文件影响到的产物集合"""
+        targets = set()
+        for path in changed:
+            targets.update(self.edges.get(os.path.normpath(path), ()))
+        return targets
+
+
+class FileWatcher:
+    """轮询一组文件的 (mtime, 大小)，返回发生变化（包括新建和删除）的文件"""
+
+    def __init__(self, paths):
+        self.paths = list(paths)
+        self.state = {path: self._stat(path) for path in self.paths}
+
+    @staticmethod
+    def _stat(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def poll(self):
+        changed = set()
+        for path in self.paths:
+            current = self._stat(path)
+            if current != self.state[path]:
+                self.state[path] = current
+                changed.add(path)
+        return changed
+
+    def wait(self, interval=0.2, stop=None):
+        """阻塞到有文件变化且已稳定（下一次轮询没有新变化），返回变化的文件集合"""
+        changed = set()
+        while stop is None or not stop.is_set():
+            time.sleep(interval)
+            new = self.poll()
+            if new:
+                changed |= new
+            elif changed:
+                return changed
+        return changed
+
+
+class PreviewRequestHandler(SimpleHTTPRequestHandler):
+    """禁止浏览器缓存的静态文件处理器，刷新总能看到最新的构建结果"""
+
+    def end_headers(self):
+        self.send_header('Cache-Control', 'no-store')
+        super().end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PreviewServer:
+    """在后台线程中提供站点根目录的本地HTTP服务器"""
+
+    def __init__(self, root='.', host='127.0.0.1', port=8000):
+        handler = partial(PreviewRequestHandler, directory=os.path.abspath(root))
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}/'
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def watch(graph, rebuild, interval=0.2, stop=None):
+    """监视依赖图中的输入文件，每批变化调用一次 rebuild(变化的文件, 受影响的产物)"""
+    watcher = FileWatcher(graph.inputs)
+    while stop is None or not stop.is_set():
+        changed = watcher.wait(interval, stop)
+        if not changed:
+            continue
+        started = time.perf_counter()
+        targets = graph.affected(changed)
+        names = ', '.join(sorted(os.path.relpath(path) for path in changed))
+        if not targets:
+            print(f"\n[watch] {names} 变化，无需重建")
+            continue
+        print(f"\n[watch] {names} 变化，重建: {', '.join(sorted(targets))}")
+        try:
+            rebuild(changed, targets)
+        except Exception as e:
+            print(f"[watch] ✗ 重建失败: {e}")
+            continue
+        print(f"[watch] 重建完成，耗时 {time.perf_counter() - started:.3f}s")